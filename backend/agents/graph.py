@@ -1,17 +1,64 @@
-import json
+import os
 import re
+import time
+import uuid
 from typing import Annotated, Sequence, TypedDict, List, Dict, Any
 from langchain_core.messages import BaseMessage, AIMessage, HumanMessage
 from langgraph.graph import StateGraph, END
 from langgraph.graph.message import add_messages
+from langgraph.types import StreamWriter
+from langchain_core.runnables import RunnableConfig
 
 # Internal Imports
 from agents.state import AgentState
 from agents.router import route_request
+from agents.memory import memory_node, conversation_context
 from services.scheme_service import scheme_service
 from services.mimo_service import mimo_service
 from services.tavily_service import tavily_service
-from database import AsyncSessionLocal
+from services.scheme_enrichment_service import scheme_enrichment_service
+from services.startup_profile import startup_profile
+from services.metrics import instrument_node
+from database import ReadSessionLocal
+
+# Cards pehle, LLM ranking baad me (request-level 'two_phase' isse override karta hai)
+SCHEME_TWO_PHASE = os.getenv("SCHEME_TWO_PHASE", "false").lower() == "true"
+
+# --- Helpers ---
+
+async def generate_answer(prompt: str, config: RunnableConfig, writer: StreamWriter,
+                          state: AgentState = None, cache_scope: str = None) -> str:
+    """
+    Runs the LLM for an agent node. Streaming endpoint ke liye (configurable.stream_tokens)
+    har token stream writer se client tak turant jata hai; normal invoke me full completion.
+    cache_scope diya ho to answer semantic cache se aa sakta hai (sirf first turn, kyunki
+    baad ke turns ka answer conversation context pe depend karta hai).
+    """
+    configurable = (config or {}).get("configurable", {})
+    cache_kwargs = {}
+    if cache_scope and state is not None and len(state["messages"]) == 1 and not state.get("summary"):
+        cache_kwargs = {
+            "cache_scope": cache_scope,
+            "cache_query": state["messages"][-1].content,
+            "cache_embedding": state.get("query_embedding"),
+            "bypass_cache": bool(configurable.get("bypass_cache")),
+        }
+
+    if not configurable.get("stream_tokens"):
+        return await mimo_service.generate_text(prompt, **cache_kwargs)
+
+    chunks = []
+    async for token in mimo_service.stream_text(prompt, **cache_kwargs):
+        chunks.append(token)
+        writer({"type": "token", "content": token})
+    return "".join(chunks)
+
+def history_block(state: AgentState) -> str:
+    """Prompt section with the bounded conversation window (empty on the first turn)."""
+    context = conversation_context(state)
+    if not context:
+        return ""
+    return f"\n    Conversation so far (for context only):\n{context}\n"
 
 # --- Node Implementations ---
 
@@ -19,10 +66,10 @@ async def router_node(state: AgentState):
     """Determines which agent should handle the query."""
     return await route_request(state)
 
-async def scheme_agent_node(state: AgentState):
+async def scheme_agent_node(state: AgentState, config: RunnableConfig, writer: StreamWriter):
     """
     MAYA Final Node: Syncs with corrected SchemeService dictionaries.
-    Logic: Processes clean data for AI ranking and Frontend display.
+    Logic: Locally ranked cards for Frontend display, LLM only writes the summary.
     """
     messages = state["messages"]
     last_message = messages[-1].content
@@ -31,94 +78,60 @@ async def scheme_agent_node(state: AgentState):
     match = re.search(r'\b\d+\b', last_message)
     requested_count = int(match.group()) if match else None
     
-    async with AsyncSessionLocal() as db:
+    # Scheme search sirf read hai: replica (DATABASE_READ_URL) configured ho to wahan jaata hai
+    async with ReadSessionLocal() as db:
         # IMPORTANT: Service ab List[dict] return kar raha hai
-        schemes = await scheme_service.search_schemes(db, last_message, limit=3)
+        schemes = await scheme_service.search_schemes(
+            db, last_message, limit=3,
+            query_embedding=state.get("query_embedding"),
+            user_profile=state.get("user_profile")
+        )
     
     if schemes:
-        schemes_data = []
-        for s in schemes:
-            # Helper for JSON parsing (just in case they come as strings)
-            def safe_parse(val):
-                if val is None: return None
-                if isinstance(val, (dict, list)): return val
-                try: return json.loads(val)
-                except: return val
-
-            # --- STEP 2: DATA MAPPING (Synced with Service Keys) ---
-            sd = {
-                "id": str(s.get('id')).strip(),
-                "name": s.get('name'),
-                "category": s.get('category') or "Business",
-                "description": s.get('description'),
-                "benefits": safe_parse(s.get('benefits')) or [],
-                # Keys are now identical to models.py
-                "eligibility_criteria": safe_parse(s.get('eligibility_criteria')), 
-                "required_documents": safe_parse(s.get('required_documents')) or [],
-                "application_mode": str(s.get('application_mode') or "Online/Offline"),
-                "link": s.get('link'),
-                "tags": safe_parse(s.get('tags')) or []
-            }
-            schemes_data.append(sd)
+        # Cards precomputed hain (schemes.card) aur ranker har card ki fresh copy deta hai,
+        # isliye yahan koi re-mapping/JSON parsing nahi
+        schemes_data = schemes
 
-        # --- STEP 3: AI ANALYSIS (REASONING) ---
-        analysis_input = [{"id": x["id"], "name": x["name"], "desc": x["description"]} for x in schemes_data]
-        prompt = f"""
-        Analyze these government schemes for the query: "{last_message}"
-        Data: {json.dumps(analysis_input)}
-        
-        Return ONLY a JSON object:
-        {{
-            "chat_summary": "Friendly 1-2 sentence overview",
-            "schemes_metadata": [
-                {{"id": "...", "relevance_score": 0-100, "explanation": "Why this fits?"}}
-            ]
-        }}
-        """
-        
-        ai_response = await mimo_service.generate_text(prompt)
-        
-        try:
-            # AI JSON Parse karna
-            cleaned_json = ai_response.replace('```json', '').replace('```', '').strip()
-            parsed = json.loads(cleaned_json)
-            chat_text = parsed.get("chat_summary", "I found these relevant schemes for you:")
-            
-            # Metadata mapping
-            metadata_map = {str(item.get('id')).strip(): item for item in parsed.get("schemes_metadata", [])}
-            
-            # --- STEP 4: FINAL MERGE & SORT ---
-            final_schemes = []
-            for sd in schemes_data:
-                sid = sd['id']
-                if sid in metadata_map:
-                    sd.update({
-                        "relevance_score": metadata_map[sid].get("relevance_score", 75),
-                        "explanation": metadata_map[sid].get("explanation", "")
-                    })
-                else:
-                    sd.update({"relevance_score": 50, "explanation": "Matching record found in database."})
-                final_schemes.append(sd)
-
-            # Highest score first
-            final_schemes.sort(key=lambda x: x.get('relevance_score', 0), reverse=True)
-            display_schemes = final_schemes[:requested_count] if requested_count else final_schemes
+        # Cards already ranked hain (SchemeService hybrid ranker)
+        cards = schemes_data[:requested_count] if requested_count else schemes_data
 
+        # Fast mode: koi LLM call nahi, template summary ke saath turant jawab
+        if not scheme_enrichment_service.use_llm:
             return {
-                "messages": [AIMessage(content=chat_text)],
-                "schemes": display_schemes,
+                "messages": [AIMessage(content=scheme_enrichment_service.template_summary(cards))],
+                "schemes": cards,
                 "current_agent": "scheme"
             }
 
-        except Exception as e:
-            print(f"❌ Analysis Error: {e}")
-            fallback = schemes_data[:requested_count] if requested_count else schemes_data
+        # --- PHASE 1: cards turant client tak (streaming endpoint) ---
+        writer({"type": "schemes", "schemes": cards})
+
+        # --- PHASE 2 (two-phase mode): LLM summary background me, follow-up fetch by session ---
+        # Placeholder sirf is turn ka reply hai (interim_response + custom stream). Checkpoint me template
+        # summary jaata hai; enrichment ready hone pe same message id final summary se replace hoti hai
+        configurable = (config or {}).get("configurable", {})
+        if configurable.get("two_phase", SCHEME_TWO_PHASE) and configurable.get("thread_id"):
+            message_id = str(uuid.uuid4())
+            scheme_enrichment_service.start(configurable["thread_id"], last_message, schemes_data, requested_count,
+                                            message_id=message_id)
+            placeholder = "I found these schemes for you. Preparing a quick summary..."
+            writer({"type": "status", "content": placeholder})
             return {
-                "messages": [AIMessage(content="I found these schemes in our database:")], 
-                "schemes": fallback,
+                "messages": [AIMessage(content=scheme_enrichment_service.template_summary(cards), id=message_id,
+                                       response_metadata={"enrichment": "pending"})],
+                "interim_response": placeholder,
+                "schemes": cards,
                 "current_agent": "scheme"
             }
 
+        # --- STEP 3: AI SUMMARY ---
+        enriched = await scheme_enrichment_service.enrich(last_message, schemes_data, requested_count)
+        return {
+            "messages": [AIMessage(content=enriched["chat_summary"])],
+            "schemes": enriched["schemes"],
+            "current_agent": "scheme"
+        }
+
     return {
         "messages": [AIMessage(content="I'm sorry, I couldn't find any specific schemes matching your query.")], 
         "schemes": [],
@@ -132,7 +145,7 @@ async def scheme_agent_node(state: AgentState):
         "current_agent": "scheme"
     }
 
-async def general_agent_node(state: AgentState):
+async def general_agent_node(state: AgentState, config: RunnableConfig, writer: StreamWriter):
     messages = state["messages"]
     last_message = messages[-1].content
     
@@ -146,29 +159,29 @@ async def general_agent_node(state: AgentState):
         # If it's a general query but not just a greeting, use a prompt that forbids repeating the intro
         prompt = f"""
         The user has a general query: "{last_message}"
-        
+        {history_block(state)}        
         Task:
         Provide a helpful and direct answer. 
         CRITICAL: Do NOT include any greetings like "Hello", "Hi", or "I am MAYA". 
         Just answer the question directly.
         """
-        response = await mimo_service.generate_text(prompt)
+        response = await generate_answer(prompt, config, writer, state, cache_scope="general")
         
     return {"messages": [AIMessage(content=response)]}
 
 
 # Placeholder nodes for other agents (to be implemented)
-async def market_agent_node(state: AgentState):
+async def market_agent_node(state: AgentState, config: RunnableConfig, writer: StreamWriter):
     messages = state["messages"]
     last_message = messages[-1].content
     
-    # Perform web search
-    search_results = tavily_service.search(last_message)
+    # Perform web search (async + cached, event loop block nahi hota)
+    search_results = await tavily_service.asearch(last_message)
     
     prompt = f"""
     You are an expert Market Research Analyst for MSMEs in India.
     User Query: {last_message}
-    
+    {history_block(state)}    
     Here is some real-time market data I found:
     {search_results}
     
@@ -179,17 +192,17 @@ async def market_agent_node(state: AgentState):
     
     CRITICAL: Do NOT start with a greeting or self-introduction. Jump straight into the market insights.
     """
-    response = await mimo_service.generate_text(prompt)
+    response = await generate_answer(prompt, config, writer)
     return {"messages": [AIMessage(content=response)]}
 
-async def brand_agent_node(state: AgentState):
+async def brand_agent_node(state: AgentState, config: RunnableConfig, writer: StreamWriter):
     messages = state["messages"]
     last_message = messages[-1].content
     
     prompt = f"""
     You are a creative Brand Consultant for MSMEs.
     User Query: {last_message}
-    
+    {history_block(state)}    
     Task:
     Help the user with branding, business names, taglines, or brand identity.
     Be creative, modern, and culturally relevant to the Indian market if applicable.
@@ -197,17 +210,17 @@ async def brand_agent_node(state: AgentState):
     
     CRITICAL: Do NOT start with a greeting or self-introduction. Jump straight into the branding suggestions.
     """
-    response = await mimo_service.generate_text(prompt)
+    response = await generate_answer(prompt, config, writer, state, cache_scope="brand")
     return {"messages": [AIMessage(content=response)]}
 
-async def finance_agent_node(state: AgentState):
+async def finance_agent_node(state: AgentState, config: RunnableConfig, writer: StreamWriter):
     messages = state["messages"]
     last_message = messages[-1].content
     
     prompt = f"""
     You are a Financial Advisor for MSMEs.
     User Query: {last_message}
-    
+    {history_block(state)}    
     Task:
     Provide advice on financial planning, loan eligibility (general), pricing strategies, or cost management.
     Do NOT give specific legal or tax advice; provide general guidance.
@@ -215,17 +228,17 @@ async def finance_agent_node(state: AgentState):
     
     CRITICAL: Do NOT start with a greeting or self-introduction. Jump straight into the financial advice.
     """
-    response = await mimo_service.generate_text(prompt)
+    response = await generate_answer(prompt, config, writer, state, cache_scope="finance")
     return {"messages": [AIMessage(content=response)]}
 
-async def marketing_agent_node(state: AgentState):
+async def marketing_agent_node(state: AgentState, config: RunnableConfig, writer: StreamWriter):
     messages = state["messages"]
     last_message = messages[-1].content
     
     prompt = f"""
     You are a Marketing Strategist for small businesses.
     User Query: {last_message}
-    
+    {history_block(state)}    
     Task:
     Suggest low-cost, high-impact marketing strategies (Digital Marketing, Social Media, Local SEO, etc.).
     Tailor the advice to the specific business type mentioned in the query.
@@ -233,22 +246,29 @@ async def marketing_agent_node(state: AgentState):
     
     CRITICAL: Do NOT start with a greeting or self-introduction. Jump straight into the marketing strategies.
     """
-    response = await mimo_service.generate_text(prompt)
+    response = await generate_answer(prompt, config, writer, state, cache_scope="marketing")
     return {"messages": [AIMessage(content=response)]}
 
 # --- Graph Construction ---
 
-def create_graph():
+AGENT_NODES = ["scheme", "market", "brand", "finance", "marketing", "general"]
+
+def create_graph(checkpointer=None):
     workflow = StateGraph(AgentState)
 
-    # Nodes registration
-    workflow.add_node("router", router_node)
-    workflow.add_node("scheme", scheme_agent_node)
-    workflow.add_node("market", market_agent_node)
-    workflow.add_node("brand", brand_agent_node)
-    workflow.add_node("finance", finance_agent_node)
-    workflow.add_node("marketing", marketing_agent_node)
-    workflow.add_node("general", general_agent_node)
+    # Nodes registration (har node latency/in-flight/error metrics wrapper ke saath, /metrics)
+    nodes = {
+        "router": router_node,
+        "scheme": scheme_agent_node,
+        "market": market_agent_node,
+        "brand": brand_agent_node,
+        "finance": finance_agent_node,
+        "marketing": marketing_agent_node,
+        "general": general_agent_node,
+        "memory": memory_node,
+    }
+    for name, node in nodes.items():
+        workflow.add_node(name, instrument_node(name, node))
 
      # Set entry point
     workflow.set_entry_point("router")
@@ -257,24 +277,48 @@ def create_graph():
     workflow.add_conditional_edges(
         "router",
         lambda x: x["current_agent"],
-        {
-            "scheme": "scheme",
-            "market": "market",
-            "brand": "brand",
-            "finance": "finance",
-            "marketing": "marketing",
-            "general": "general"
-        }
+        {agent: agent for agent in AGENT_NODES}
     )
 
-    # All agents go to END for now (single turn)
-    workflow.add_edge("scheme", END)
-    workflow.add_edge("market", END)
-    workflow.add_edge("brand", END)
-    workflow.add_edge("finance", END)
-    workflow.add_edge("marketing", END)
-    workflow.add_edge("general", END)
+    # Har agent ke baad memory node history window trim karta hai, phir END
+    for agent in AGENT_NODES:
+        workflow.add_edge(agent, "memory")
+    workflow.add_edge("memory", END)
+
+    return workflow.compile(checkpointer=checkpointer)
+
+# Graph pehli use pe compile hota hai (worker boot me nahi). Checkpointer ke bina = scripts/tests;
+# main.py lifespan enable_persistence() call karta hai
+_app_graph = None
+_stateless_graph = None
+_checkpointer = None
+
+def get_graph(persistent: bool = True):
+    """
+    Compiled graph, built on first use (with the checkpointer set by enable_persistence).
+    persistent=False deta hai bina checkpointer ka graph: one-off runs (batch replays) koi thread nahi chhodte.
+    """
+    global _app_graph, _stateless_graph
+    if not persistent or _checkpointer is None:
+        if _stateless_graph is None:
+            started = time.perf_counter()
+            _stateless_graph = create_graph()
+            startup_profile.record_init("agent_graph", time.perf_counter() - started)
+        return _stateless_graph
+    if _app_graph is None:
+        started = time.perf_counter()
+        _app_graph = create_graph(_checkpointer)
+        startup_profile.record_init("agent_graph", time.perf_counter() - started)
+    return _app_graph
 
-    return workflow.compile()
+def enable_persistence(checkpointer):
+    """Sets the checkpointer so turns of a thread_id build on each other (graph recompiles on next use)."""
+    global _app_graph, _checkpointer
+    _checkpointer = checkpointer
+    _app_graph = None
 
-app_graph = create_graph()
\ No newline at end of file
+def __getattr__(name):
+    # `agent_graph.app_graph` / `from agents.graph import app_graph` purane callers ke liye
+    if name == "app_graph":
+        return get_graph()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
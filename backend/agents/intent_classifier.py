@@ -0,0 +1,186 @@
+import asyncio
+import json
+import os
+import re
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import select
+
+from database import ReadSessionLocal
+from models import ChatHistory
+from services.gemini_service import gemini_service
+
+CATEGORIES = ["scheme", "market", "brand", "finance", "marketing", "general"]
+
+EXAMPLES_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "intent_examples.json")
+
+# Keyword rules: word-prefix match, multi-word phrases count double
+KEYWORD_RULES: Dict[str, List[str]] = {
+    "scheme": ["scheme", "yojana", "subsid", "government", "govt", "loan", "mudra", "pmegp", "cgtmse",
+               "eligib", "grant", "stand-up india", "startup india", "apply for", "documents required"],
+    "market": ["market trend", "market size", "market research", "competitor", "competition", "trend",
+               "industry outlook", "demand for", "outlook"],
+    "brand": ["brand", "business name", "name ideas", "names for", "tagline", "slogan", "logo", "identity"],
+    "finance": ["budget", "pricing", "price my", "profit", "cash flow", "working capital", "reduce cost",
+                "break-even", "break even", "investment", "expenses", "margin"],
+    "marketing": ["marketing", "promot", "instagram", "facebook", "whatsapp", "seo", "advertis",
+                  "more customers", "social media", "campaign"],
+    "general": ["who are you", "what can you do", "thank", "how are you", "fun fact"],
+}
+
+GREETINGS = {"hey", "hi", "hello", "hi there", "hey there", "good morning", "good afternoon", "good evening"}
+
+_KEYWORD_PATTERNS = {
+    category: [(re.compile(r"\b" + re.escape(kw)), 2 if " " in kw else 1) for kw in keywords]
+    for category, keywords in KEYWORD_RULES.items()
+}
+
+
+class IntentClassifier:
+    """
+    Local fast-path classifier: keyword rules + nearest-centroid over query embeddings.
+    Centroids labeled examples (data/intent_examples.json) aur past chat_history rows se bante hain.
+    """
+
+    def __init__(self):
+        self.use_embeddings = os.getenv("ROUTER_USE_EMBEDDINGS", "true").lower() == "true"
+        self.history_limit = int(os.getenv("ROUTER_HISTORY_EXAMPLES", "500"))
+        self.temperature = float(os.getenv("ROUTER_CENTROID_TEMPERATURE", "0.05"))
+        self._sums: Optional[np.ndarray] = None
+        self._counts: Optional[np.ndarray] = None
+        self._centroids: Optional[np.ndarray] = None
+        self._build_task: Optional[asyncio.Task] = None
+
+    @property
+    def ready(self) -> bool:
+        return self._centroids is not None
+
+    def keyword_scores(self, text: str) -> Tuple[str, float]:
+        """Returns (category, confidence) from keyword rules only."""
+        clean = text.strip().lower()
+        if clean.rstrip("?!.") in GREETINGS:
+            return "general", 1.0
+
+        hits = {c: sum(w for p, w in patterns if p.search(clean)) for c, patterns in _KEYWORD_PATTERNS.items()}
+        ranked = sorted(hits.items(), key=lambda kv: kv[1], reverse=True)
+        (top, h1), (_, h2) = ranked[0], ranked[1]
+        if h1 == 0:
+            return "general", 0.0
+        # More hits -> more confident, competing categories pull it down
+        confidence = (1 - 0.4 ** h1) * (h1 / (h1 + h2))
+        return top, round(confidence, 4)
+
+    def centroid_scores(self, embedding: List[float]) -> Tuple[str, float]:
+        """Returns (category, confidence) from the nearest centroid (softmax over cosine sims)."""
+        vec = np.asarray(embedding, dtype=np.float32)
+        vec = vec / (np.linalg.norm(vec) or 1.0)
+        sims = self._centroids @ vec
+        probs = np.exp((sims - sims.max()) / self.temperature)
+        probs /= probs.sum()
+        idx = int(np.argmax(probs))
+        return CATEGORIES[idx], round(float(probs[idx]), 4)
+
+    async def classify(self, text: str, threshold: float) -> Dict:
+        """
+        Classifies a query locally.
+
+        Returns:
+            dict: category, confidence, source ('keyword' | 'centroid') and the query
+            embedding (if one was computed) so downstream nodes can reuse it.
+        """
+        category, confidence = self.keyword_scores(text)
+        result = {"category": category, "confidence": confidence, "source": "keyword", "embedding": None}
+        if confidence >= threshold or not self.use_embeddings:
+            return result
+
+        if not self.ready:
+            self.schedule_build()
+            return result
+
+        embedding = await gemini_service.get_embeddings(text)
+        if not embedding:
+            return result
+
+        c_category, c_confidence = self.centroid_scores(embedding)
+        if c_category == category:
+            c_confidence = 1 - (1 - c_confidence) * (1 - confidence)
+        if c_confidence >= confidence:
+            result.update({"category": c_category, "confidence": round(c_confidence, 4), "source": "centroid"})
+        result["embedding"] = embedding
+        return result
+
+    def learn(self, embedding: Optional[List[float]], category: str):
+        """Folds an LLM-labeled query into its centroid so similar queries take the fast path next time."""
+        if embedding is None or self._sums is None or category not in CATEGORIES:
+            return
+        idx = CATEGORIES.index(category)
+        vec = np.asarray(embedding, dtype=np.float32)
+        self._sums[idx] += vec / (np.linalg.norm(vec) or 1.0)
+        self._counts[idx] += 1
+        self._refresh_centroids()
+
+    def schedule_build(self):
+        if self._build_task is None or (self._build_task.done() and not self.ready):
+            self._build_task = asyncio.create_task(self.build())
+
+    async def build(self):
+        """Embeds labeled examples + confidently keyword-labeled history rows and computes centroids."""
+        try:
+            labeled = self._load_examples() + await self._load_history_examples()
+            texts = [t for t, _ in labeled]
+            embeddings = await gemini_service.get_embeddings_batch(texts)
+            if not embeddings:
+                print("⚠️ Intent classifier: could not embed examples, using keyword rules only.")
+                return
+
+            dim = len(embeddings[0])
+            sums = np.zeros((len(CATEGORIES), dim), dtype=np.float32)
+            counts = np.zeros(len(CATEGORIES), dtype=np.float32)
+            for (_, category), emb in zip(labeled, embeddings):
+                vec = np.asarray(emb, dtype=np.float32)
+                sums[CATEGORIES.index(category)] += vec / (np.linalg.norm(vec) or 1.0)
+                counts[CATEGORIES.index(category)] += 1
+
+            self._sums, self._counts = sums, counts
+            self._refresh_centroids()
+            print(f"✅ Intent classifier ready ({len(labeled)} examples).")
+        except Exception as e:
+            print(f"❌ Intent classifier build error: {e}")
+
+    def _refresh_centroids(self):
+        centroids = self._sums / np.maximum(self._counts, 1)[:, None]
+        norms = np.linalg.norm(centroids, axis=1, keepdims=True)
+        self._centroids = centroids / np.where(norms == 0, 1.0, norms)
+
+    def _load_examples(self) -> List[Tuple[str, str]]:
+        with open(EXAMPLES_PATH, "r") as f:
+            data = json.load(f)
+        return [(text, category) for category, texts in data.items() if category in CATEGORIES for text in texts]
+
+    async def _load_history_examples(self) -> List[Tuple[str, str]]:
+        # chat_history me agent label nahi hai, isliye sirf wahi rows lete hain jinhe keyword rules confidently label karein
+        if self.history_limit <= 0:
+            return []
+        try:
+            async with ReadSessionLocal() as db:
+                stmt = (
+                    select(ChatHistory.content)
+                    .where(ChatHistory.role == "user")
+                    .order_by(ChatHistory.id.desc())
+                    .limit(self.history_limit)
+                )
+                rows = (await db.execute(stmt)).scalars().all()
+        except Exception as e:
+            print(f"⚠️ Intent classifier: chat_history unavailable ({e})")
+            return []
+
+        labeled = []
+        for content in set(rows):
+            category, confidence = self.keyword_scores(content or "")
+            if confidence >= 0.8:
+                labeled.append((content, category))
+        return labeled
+
+
+intent_classifier = IntentClassifier()
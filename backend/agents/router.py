@@ -1,6 +1,9 @@
+import os
+from collections import Counter
 from langchain_core.prompts import ChatPromptTemplate
 from services.mimo_service import mimo_service
 from agents.state import AgentState
+from agents.intent_classifier import intent_classifier, CATEGORIES
 from langchain_core.messages import HumanMessage, SystemMessage
 
 ROUTER_PROMPT = """
@@ -17,20 +20,55 @@ Classify the user's query into one of the following categories:
 Return ONLY the category name (e.g., 'scheme', 'market', 'general'). Do not add any explanation.
 """
 
+# Local classifier ki confidence isse kam ho tabhi LLM router call hota hai
+ROUTER_CONFIDENCE_THRESHOLD = float(os.getenv("ROUTER_CONFIDENCE_THRESHOLD", "0.75"))
+
+_stats = {"total": 0, "fast_path": 0, "llm": 0, "by_source": Counter(), "by_category": Counter()}
+
+def get_routing_stats() -> dict:
+    """Snapshot of routing decisions (how often the local fast path was taken)."""
+    total = _stats["total"]
+    return {
+        "total": total,
+        "fast_path": _stats["fast_path"],
+        "llm": _stats["llm"],
+        "fast_path_rate": round(_stats["fast_path"] / total, 4) if total else 0.0,
+        "threshold": ROUTER_CONFIDENCE_THRESHOLD,
+        "classifier_ready": intent_classifier.ready,
+        "by_source": dict(_stats["by_source"]),
+        "by_category": dict(_stats["by_category"]),
+    }
+
 async def route_request(state: AgentState) -> dict:
     messages = state["messages"]
     last_message = messages[-1]
-    
-    # Simple logic for now, using LLM for classification
-    prompt = f"{ROUTER_PROMPT}\n\nUser Query: {last_message.content}"
-    
-    category = await mimo_service.generate_text(prompt)
-    category = category.strip().lower()
-    
-    # Normalize response
-    valid_categories = ['scheme', 'market', 'brand', 'finance', 'marketing', 'general']
-    if category not in valid_categories:
-        category = 'general'
-        
-    print(f"Routing to: {category}")
-    return {"current_agent": category}
+
+    # 1. Local fast path (keyword rules + nearest centroid)
+    local = await intent_classifier.classify(last_message.content, ROUTER_CONFIDENCE_THRESHOLD)
+    category = local["category"]
+    source = local["source"]
+
+    # 2. LLM fallback only when the local classifier is unsure
+    if local["confidence"] < ROUTER_CONFIDENCE_THRESHOLD:
+        prompt = f"{ROUTER_PROMPT}\n\nUser Query: {last_message.content}"
+
+        category = await mimo_service.generate_text(prompt)
+        category = category.strip().strip("'\".").lower()
+
+        # Normalize response
+        if category not in CATEGORIES:
+            category = 'general'
+        else:
+            intent_classifier.learn(local["embedding"], category)
+        source = "llm"
+        _stats["llm"] += 1
+    else:
+        _stats["fast_path"] += 1
+
+    _stats["total"] += 1
+    _stats["by_source"][source] += 1
+    _stats["by_category"][category] += 1
+
+    print(f"Routing to: {category} (via {source}, confidence {local['confidence']})")
+    # Embedding scheme node me dobara use hota hai (extra Gemini call bachti hai)
+    return {"current_agent": category, "query_embedding": local["embedding"]}
@@ -11,6 +11,9 @@ class AgentState(TypedDict):
     # Annotated + add_messages ensures ki chat history append hoti rahe, delete na ho
     messages: Annotated[Sequence[BaseMessage], add_messages]
     
+    # Purane turns ki rolling summary (recent window ke bahar wale messages)
+    summary: Optional[str]
+    
     # Kaunsa agent abhi active hai (scheme, market, finance, etc.)
     current_agent: Optional[str]
     
@@ -22,5 +25,12 @@ class AgentState(TypedDict):
     # Iske bina data graph se bahar main.py tak nahi pahunch payega.
     schemes: List[Dict[str, Any]] 
     
+    # Two-phase placeholder reply ("summary aa raha hai"); messages me nahi jaata (wahan template
+    # summary hai jo enrichment ke baad final summary ban jaati hai). Har turn reset hota hai.
+    interim_response: Optional[str]
+    
+    # Router ke local classifier ka query embedding (scheme search isse reuse karta hai)
+    query_embedding: Optional[List[float]]
+    
     # Graph flow control ke liye
     next_step: Optional[str]
\ No newline at end of file
@@ -0,0 +1,30 @@
+import asyncio
+from database import engine, Base
+import models  # Important: create_all se pehle saare models register hone chahiye
+from services.pgvector_search import ensure_search_indexes
+from services.scheme_ingestion import ensure_scheme_columns
+from services.chat_history_service import chat_history_service
+
+async def init_database():
+    """
+    Tables + schema upgrades + search indexes (idempotent). Deploy step ke taur pe ek baar chalao;
+    server boot pe sirf DB_INIT_ON_STARTUP=true ho tab chalta hai.
+    """
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        # content_hash/updated_at + upsert key on pre-existing schemes tables
+        await ensure_scheme_columns(conn)
+        # ANN (HNSW/IVFFlat) + full-text indexes on schemes
+        await ensure_search_indexes(conn)
+        # History composite index + chat_sessions backfill (purane installs ke liye)
+        await chat_history_service.ensure_schema(conn)
+
+async def main():
+    try:
+        await init_database()
+        print("✅ Database initialized successfully.")
+    finally:
+        await engine.dispose()
+
+if __name__ == "__main__":
+    asyncio.run(main())
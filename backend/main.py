@@ -1,30 +1,95 @@
-from fastapi import FastAPI, Depends, HTTPException
+# Boot profile sabse pehle, taaki neeche ke saare imports time ho sakein
+from services.startup_profile import startup_profile
+startup_profile.track_imports()
+
+from fastapi import FastAPI, Depends, HTTPException, Query, Response
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
-from contextlib import asynccontextmanager
-from database import engine, Base, get_db
+from contextlib import AsyncExitStack, asynccontextmanager
+from database import get_db, get_read_db, dispose_engines, pool_stats, AsyncSessionLocal
 import models
 from services.scheme_service import scheme_service
 from services.chat_history_service import chat_history_service
-from agents.graph import app_graph
+from services.scheme_enrichment_service import scheme_enrichment_service
+from services.tavily_service import tavily_service
+from services.semantic_cache import semantic_cache
+from services.mimo_service import mimo_service
+from services.gemini_service import gemini_service
+from services.rate_governor import governor_stats
+from services.jina_service import jina_service
+from services.vector_index import vector_index
+from services.embedding_versions import embedding_versions
+import agents.graph as agent_graph
+from init_db import init_database
+from agents.memory import open_checkpointer
+from agents.router import get_routing_stats
+from agents.intent_classifier import intent_classifier
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
 from langchain_core.messages import HumanMessage
+import asyncio
+import os
+import time
 import uuid
 import json
-from fastapi.responses import StreamingResponse
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from services.metrics import metrics, cache_metrics, Gauge
+from services.request_trace import start_trace, trace_span, slow_request_log
+
+startup_profile.stop_tracking()
+
+# create_all + schema upgrades deploy step hain (python init_db.py); boot pe sirf local dev ke liye
+DB_INIT_ON_STARTUP = os.getenv("DB_INIT_ON_STARTUP", "false").lower() == "true"
+# Ready hone ke baad lazy clients + graph background thread me bana do, taaki pehli request slow na ho
+STARTUP_WARMUP = os.getenv("STARTUP_WARMUP", "true").lower() == "true"
+# Bulk evaluation (/api/chat/batch) limits
+CHAT_BATCH_MAX_CONCURRENCY = int(os.getenv("CHAT_BATCH_MAX_CONCURRENCY", "8"))
+CHAT_BATCH_MAX_ITEMS = int(os.getenv("CHAT_BATCH_MAX_ITEMS", "5000"))
+
+def warm_clients():
+    """Builds the lazy SDK clients and the agent graph (runs in a worker thread)."""
+    gemini_service.embeddings_model
+    gemini_service.llm
+    mimo_service.client
+    tavily_service.async_client
+    agent_graph.get_graph()
+
+async def warm_up():
+    try:
+        await asyncio.to_thread(warm_clients)
+    except Exception as e:
+        print(f"⚠️ Warm-up failed (clients will initialize on first use): {e}")
+    # Router centroids background me build hote hain; tab tak keyword rules chalte hain
+    intent_classifier.schedule_build()
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     print("🚀 MAYA AI Backend Starting...")
-    try:
-        async with engine.begin() as conn:
-            await conn.run_sync(Base.metadata.create_all)
-        print("✅ Database initialized successfully.")
-    except Exception as e:
-        print(f"❌ Initialization Error: {e}")
-    yield
+    if DB_INIT_ON_STARTUP:
+        with startup_profile.phase("database_init"):
+            try:
+                await init_database()
+                print("✅ Database initialized successfully.")
+            except Exception as e:
+                print(f"❌ Initialization Error: {e}")
+    async with AsyncExitStack() as stack:
+        # Checkpointer: thread_id (session_id) ke turns ek dusre pe build hote hain
+        with startup_profile.phase("checkpointer"):
+            checkpointer = await stack.enter_async_context(open_checkpointer())
+        agent_graph.enable_persistence(checkpointer)
+        startup_profile.mark_ready()
+        if STARTUP_WARMUP:
+            warmup_task = asyncio.create_task(warm_up())
+        else:
+            intent_classifier.schedule_build()
+        yield
+    # Queued chat history pehle DB me, phir connections band
+    await chat_history_service.stop()
+    await jina_service.aclose()
+    await gemini_service.embedding_cache.aclose()
+    await dispose_engines()
     print("🛑 MAYA AI Backend Shutting Down...")
 
 app = FastAPI(title="MAYA AI - Multi-Agent System", lifespan=lifespan)
@@ -44,12 +109,54 @@ class ChatRequest(BaseModel):
     message: str
     session_id: Optional[str] = None
     user_profile: Optional[Dict[str, Any]] = None
+    two_phase: Optional[bool] = None  # Scheme cards first, LLM summary via /api/chat/enrichment/{session_id}
+    bypass_cache: bool = False  # Fresh LLM answer (semantic cache lookup skip)
+    debug: bool = False  # Response me span timeline (Server-Timing header hamesha aata hai)
 
 class ChatResponse(BaseModel):
     response: str
     agent: str
     session_id: str
     schemes: List[Dict[str, Any]] = [] # For your SchemeCard UI
+    debug: Optional[Dict[str, Any]] = None  # Span timeline, sirf request.debug pe
+
+class BatchChatItem(BaseModel):
+    message: str
+    id: Optional[str] = None  # Caller ka apna reference (QA case id), result me wapas aata hai
+    session_id: Optional[str] = None
+    user_profile: Optional[Dict[str, Any]] = None
+
+class BatchChatRequest(BaseModel):
+    items: List[BatchChatItem]
+    concurrency: Optional[int] = None  # Capped at CHAT_BATCH_MAX_CONCURRENCY
+    user_profile: Optional[Dict[str, Any]] = None  # Default for items without one
+    bypass_cache: bool = False
+    save_history: bool = False  # QA replays by default chat history me nahi jaate
+
+def build_initial_state(request: ChatRequest) -> dict:
+    # 'schemes' key is essential for holding the AI-analyzed cards
+    return {
+        "messages": [HumanMessage(content=request.message)],
+        # Profile sirf caller ka: placeholder default eligibility pre-filter me real filter ban jaata
+        "user_profile": request.user_profile or None,
+        "schemes": [],
+        "interim_response": None
+    }
+
+def reply_text(result: dict) -> str:
+    """Text bubble of a graph run: two-phase placeholder (not part of history) or the last AI message."""
+    return result.get("interim_response") or result["messages"][-1].content
+
+def build_config(request: ChatRequest, session_id: str, **extra) -> dict:
+    # Thread_id allows LangGraph to maintain context across turns
+    configurable = {"thread_id": session_id, "bypass_cache": request.bypass_cache, **extra}
+    if request.two_phase is not None:
+        configurable["two_phase"] = request.two_phase
+    return {"configurable": configurable}
+
+def sse_event(event: str, data: Dict[str, Any]) -> str:
+    """Formats one server-sent event frame."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
 
 # --- Endpoints ---
 
@@ -58,66 +165,312 @@ async def root():
     return {"status": "online", "system": "MAYA Multi-Agent AI"}
 
 @app.post("/api/chat/agent", response_model=ChatResponse)
-async def chat_agent(request: ChatRequest, db: AsyncSession = Depends(get_db)):
+async def chat_agent(request: ChatRequest, response: Response, db: AsyncSession = Depends(get_db)):
     """
     Main Entry Point: Routes query via LangGraph and returns 
     structured response for UI Cards.
+    Timing breakdown Server-Timing header me; slow requests /api/debug/slow pe.
     """
+    trace = start_trace("/api/chat/agent")
+    session_id = request.session_id or str(uuid.uuid4())
     try:
-        session_id = request.session_id or str(uuid.uuid4())
-        
         # 1. Save User Message to DB
-        await chat_history_service.save_message(db, session_id, "user", request.message)
+        with trace_span("history"):
+            await chat_history_service.record(session_id, "user", request.message, db=db)
 
         # 2. Prepare LangGraph Input
-        # 'schemes' key is essential for holding the AI-analyzed cards
-        initial_state = {
-            "messages": [HumanMessage(content=request.message)],
-            "user_profile": request.user_profile or {"location": "Uttar Pradesh"},
-            "schemes": [] 
-        }
+        initial_state = build_initial_state(request)
 
         # 3. Invoke LangGraph (Brain of MAYA)
-        # Thread_id allows LangGraph to maintain context across turns
-        config = {"configurable": {"thread_id": session_id}}
-        result = await app_graph.ainvoke(initial_state, config)
+        config = build_config(request, session_id)
+        result = await agent_graph.get_graph().ainvoke(initial_state, config)
         
         # 4. Extract Output
         # Messages hold the text bubble, 'schemes' holds the analyzed cards
-        last_message = result["messages"][-1].content
+        last_message = reply_text(result)
         agent_name = result.get("current_agent", "MAYA")
         found_schemes = result.get("schemes", [])
         
         # 5. Save Assistant Message to DB
-        await chat_history_service.save_message(db, session_id, "assistant", last_message)
+        # Two-phase: placeholder nahi, checkpointed template summary; enrichment ready hone pe ye row update hoti hai
+        with trace_span("history"):
+            recorded_at = await chat_history_service.record(session_id, "assistant", result["messages"][-1].content, db=db)
+        if result.get("interim_response"):
+            scheme_enrichment_service.attach_history(session_id, recorded_at)
+
+        # 6. Timing breakdown (REQUEST_TRACE_ENABLED=false pe trace None)
+        slow_request_log.finish(trace, session_id=session_id, agent=agent_name)
+        if trace is not None:
+            response.headers["Server-Timing"] = trace.server_timing()
         
         return ChatResponse(
-            response=result["messages"][-1].content,
+            response=last_message,
             agent=result.get("current_agent", "MAYA"),
             session_id=session_id,
-            schemes=result.get("schemes", []) # <--- Ye data pass hona chahiye
+            schemes=result.get("schemes", []), # <--- Ye data pass hona chahiye
+            debug=trace.to_dict() if request.debug and trace is not None else None
         )
     except Exception as e:
         print(f"🔥 Critical Graph Error: {e}")
         raise HTTPException(status_code=500, detail="MAYA agents are out of sync. Please try again.")
+    finally:
+        # Error wali requests bhi slow log me (finish idempotent hai)
+        slow_request_log.finish(trace, session_id=session_id, error=True)
+
+@app.post("/api/chat/agent/stream")
+async def chat_agent_stream(request: ChatRequest, db: AsyncSession = Depends(get_db)):
+    """
+    Streaming variant of /api/chat/agent (Server-Sent Events).
+    Events: session -> route -> schemes (ranked cards) -> schemes_patch (final cards + LLM summary)
+    | token* -> done (or error).
+    """
+    session_id = request.session_id or str(uuid.uuid4())
+    await chat_history_service.record(session_id, "user", request.message, db=db)
+
+    initial_state = build_initial_state(request)
+    config = build_config(request, session_id, stream_tokens=True)
+    # Stream me phase 2 'schemes_patch' event hi hai, background enrichment ki zaroorat nahi
+    config["configurable"]["two_phase"] = False
+
+    async def event_stream():
+        yield sse_event("session", {"session_id": session_id})
+
+        agent_name = "MAYA"
+        response_text = ""
+        schemes = []
+        try:
+            # 'updates' = node outputs (route, cards), 'custom' = tokens from generate_answer
+            async for mode, chunk in agent_graph.get_graph().astream(initial_state, config, stream_mode=["updates", "custom"]):
+                if mode == "custom":
+                    if chunk.get("type") == "token":
+                        yield sse_event("token", {"content": chunk["content"]})
+                    elif chunk.get("type") == "schemes":
+                        schemes = chunk["schemes"]
+                        yield sse_event("schemes", {"schemes": schemes})
+                    continue
+
+                for node, update in chunk.items():
+                    # memory node sirf history trim karta hai, client ko kuch nahi bhejna
+                    if not update or node == "memory":
+                        continue
+                    if node == "router":
+                        agent_name = update.get("current_agent", agent_name)
+                        yield sse_event("route", {"agent": agent_name})
+                        continue
+                    if update.get("messages"):
+                        response_text = update["messages"][-1].content
+                    if update.get("schemes"):
+                        # Cards already bhej chuke hain; ab final cards + summary as a patch
+                        schemes = update["schemes"]
+                        yield sse_event("schemes_patch", {"schemes": schemes, "chat_summary": response_text})
+        except Exception as e:
+            print(f"🔥 Critical Graph Error (stream): {e}")
+            yield sse_event("error", {"detail": "MAYA agents are out of sync. Please try again."})
+            return
+
+        # Request-scoped session already closed ho sakta hai; sync mode me record apna session kholta hai
+        await chat_history_service.record(session_id, "assistant", response_text)
+
+        yield sse_event("done", {
+            "response": response_text,
+            "agent": agent_name,
+            "session_id": session_id,
+            "schemes": schemes
+        })
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/api/chat/batch")
+async def chat_batch(request: BatchChatRequest):
+    """
+    Bulk evaluation: runs many messages through the agent graph with a concurrency cap and
+    streams one NDJSON line per item in completion order (with per-item timing), then a summary line.
+    Embedding micro-batcher, router/semantic caches aur provider governors saare items me shared hain.
+    """
+    if not request.items:
+        raise HTTPException(status_code=400, detail="No items to run.")
+    if len(request.items) > CHAT_BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"At most {CHAT_BATCH_MAX_ITEMS} items per batch.")
+    concurrency = max(1, min(request.concurrency or CHAT_BATCH_MAX_CONCURRENCY, CHAT_BATCH_MAX_CONCURRENCY))
+
+    async def run_item(index: int, item: BatchChatItem, semaphore: asyncio.Semaphore, submitted: float) -> dict:
+        async with semaphore:
+            started = time.perf_counter()
+            chat_request = ChatRequest(
+                message=item.message,
+                session_id=item.session_id,
+                user_profile=item.user_profile or request.user_profile,
+                two_phase=False,
+                bypass_cache=request.bypass_cache
+            )
+            session_id = chat_request.session_id or str(uuid.uuid4())
+            line = {"index": index, "id": item.id, "session_id": session_id,
+                    "queued_ms": round((started - submitted) * 1000, 2)}
+            try:
+                if request.save_history:
+                    await chat_history_service.record(session_id, "user", item.message)
+                # One-off replay (naya session, history save nahi): bina checkpointer ke chalao taaki har item
+                # ka thread na bache. Explicit session_id / save_history wale items normal checkpointed chalte hain.
+                graph = agent_graph.get_graph(persistent=item.session_id is not None or request.save_history)
+                result = await graph.ainvoke(
+                    build_initial_state(chat_request), build_config(chat_request, session_id)
+                )
+                line.update({
+                    "agent": result.get("current_agent", "MAYA"),
+                    "response": reply_text(result),
+                    "schemes": result.get("schemes", [])
+                })
+                if request.save_history:
+                    await chat_history_service.record(session_id, "assistant", line["response"])
+            except Exception as e:
+                print(f"🔥 Batch item {index} failed: {e}")
+                line["error"] = str(e) or type(e).__name__
+            line["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 2)
+            return line
+
+    async def ndjson_stream():
+        batch_started = time.perf_counter()
+        # Embeddings items ke apne get_embeddings calls se aate hain: micro-batcher concurrent items ko bounded
+        # batches me jodta hai, keyword fast path wale items embed nahi hote, aur pehli line turant stream hoti hai
+        semaphore = asyncio.Semaphore(concurrency)
+        submitted = time.perf_counter()
+        tasks = [asyncio.create_task(run_item(i, item, semaphore, submitted)) for i, item in enumerate(request.items)]
+        errors = 0
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                line = await next_done
+                errors += "error" in line
+                yield json.dumps(line, ensure_ascii=False, default=str) + "\n"
+        finally:
+            # Client disconnect pe bache hue items cancel
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+        yield json.dumps({
+            "summary": True,
+            "count": len(tasks),
+            "errors": errors,
+            "concurrency": concurrency,
+            "total_ms": round((time.perf_counter() - batch_started) * 1000, 2)
+        }) + "\n"
+
+    return StreamingResponse(ndjson_stream(), media_type="application/x-ndjson")
+
+@app.get("/api/chat/enrichment/{session_id}")
+async def get_scheme_enrichment(session_id: str):
+    """Follow-up fetch for two-phase scheme responses (LLM chat_summary)."""
+    result = await scheme_enrichment_service.get(session_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail="No scheme enrichment found for this session.")
+    return {"session_id": session_id, **result}
 
 # --- History & Management Endpoints ---
 
 @app.get("/api/history/sessions")
-async def get_sessions(db: AsyncSession = Depends(get_db)):
+async def get_sessions(
+    limit: int = Query(30, ge=1, le=100),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Sidebar sessions by latest activity (keyset pagination via next_cursor)."""
     try:
-        sessions = await chat_history_service.get_user_sessions(db)
-        return {"sessions": sessions}
+        sessions, next_cursor = await chat_history_service.get_user_sessions(db, limit=limit, cursor=cursor)
+        return {"sessions": sessions, "next_cursor": next_cursor}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/history/{session_id}")
-async def get_session_history(session_id: str, db: AsyncSession = Depends(get_db)):
+async def get_session_history(
+    session_id: str,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Newest `limit` messages of a session (chronological); next_cursor pages to older messages."""
     try:
-        messages = await chat_history_service.get_session_history(db, session_id)
-        return {"session_id": session_id, "history": messages}
+        messages, next_cursor = await chat_history_service.get_session_history(db, session_id, limit=limit, cursor=cursor)
+        return {"session_id": session_id, "history": messages, "next_cursor": next_cursor}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# --- Metrics ---
+
+@metrics.collector
+def service_metrics():
+    """Existing service counters (caches, queues) as Prometheus samples, read at scrape time."""
+    embedding_cache = gemini_service.embedding_cache
+    collected = cache_metrics({
+        "semantic": lambda: (semantic_cache.hits, semantic_cache.misses),
+        "tavily": lambda: (tavily_service.cache.hits, tavily_service.cache.misses),
+        "embeddings": lambda: (embedding_cache.memory_hits + embedding_cache.disk_hits, embedding_cache.misses),
+        # Singleflight: coalesced = upstream call bacha (hit), leader = asli call (miss)
+        "mimo_singleflight": lambda: (mimo_service.inflight.coalesced, mimo_service.inflight.leaders),
+        "embedding_singleflight": lambda: (gemini_service.inflight.coalesced, gemini_service.inflight.leaders),
+    })
+    pending = Gauge("maya_queue_pending", "Items waiting in background queues.", ["queue"])
+    pending.set(chat_history_service.stats()["pending"], queue="chat_history")
+    inflight = Gauge("maya_singleflight_inflight", "Distinct upstream calls in flight.", ["group"])
+    inflight.set(mimo_service.inflight.stats()["in_flight"], group="mimo")
+    inflight.set(gemini_service.inflight.stats()["in_flight"], group="gemini_embeddings")
+    return collected + [pending, inflight]
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Prometheus scrape endpoint (per-node/per-service latency, tokens, cache hit ratios, in-flight)."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+# --- Debug ---
+
+@app.get("/api/debug/slow")
+async def get_slow_requests(limit: int = Query(20, ge=1, le=500), persisted: bool = False):
+    """
+    Requests slower than SLOW_REQUEST_MS with their span timelines, newest first.
+    persisted=true reads the slow_requests table (SLOW_REQUEST_PERSIST) instead of this worker's ring buffer.
+    """
+    if not persisted:
+        return {**slow_request_log.stats(), "requests": slow_request_log.recent(limit)}
+    if not slow_request_log.persist:
+        raise HTTPException(status_code=400, detail="Slow request persistence is disabled (SLOW_REQUEST_PERSIST).")
+    async with AsyncSessionLocal() as db:
+        rows = (await db.execute(
+            select(models.SlowRequest).order_by(models.SlowRequest.created_at.desc()).limit(limit)
+        )).scalars().all()
+    return {**slow_request_log.stats(), "requests": [row.timeline for row in rows]}
+
+# --- Stats ---
+
+@app.get("/api/stats")
+async def get_stats():
+    return {
+        "router": get_routing_stats(),
+        "tavily_cache": tavily_service.cache_stats(),
+        "semantic_cache": semantic_cache.stats(),
+        "coalescing": {
+            "mimo": mimo_service.inflight.stats(),
+            "gemini_embeddings": gemini_service.inflight.stats()
+        },
+        "governors": governor_stats(),
+        "llm_pool": mimo_service.pool.stats(),
+        "vector_index": vector_index.stats(),
+        "embedding_versions": embedding_versions.stats(),
+        "startup": startup_profile.stats(),
+        "slow_requests": slow_request_log.stats(),
+        "chat_history": chat_history_service.stats(),
+        "db_pool": pool_stats(),
+        "embeddings": {
+            "cache": gemini_service.embedding_cache.stats(),
+            "batcher": gemini_service.embedding_batcher.stats()
+        }
+    }
+
 if __name__ == "__main__":
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, JSON, DateTime, ForeignKey, Boolean, Float
+from sqlalchemy import Column, Integer, String, Text, JSON, DateTime, ForeignKey, Boolean, Float, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from pgvector.sqlalchemy import Vector
@@ -8,7 +8,7 @@ class Scheme(Base):
     __tablename__ = "schemes"
 
     id = Column(Integer, primary_key=True, index=True)
-    name = Column(String, index=True)
+    name = Column(String)  # uq_schemes_name (neeche) hi lookup index hai
     description = Column(Text)
     
     # UPDATED: String se JSON kar diya taaki list store ho sake
@@ -23,9 +23,54 @@ class Scheme(Base):
     category = Column(String, index=True)
     link = Column(String)
     
+    # Precomputed SchemeCard payload (services/scheme_cards.py); retrieval sirf yahi select karta hai
+    card = Column(JSON)
+
     # Vector embedding (dimension 768 for Gemini)
     embedding = Column(Vector(768))
 
+    # Ingestion bookkeeping: source content + embedding model ka hash (unchanged schemes re-embed nahi hote)
+    content_hash = Column(String(64))
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    # Upsert key for ingestion (INSERT ... ON CONFLICT (name))
+    __table_args__ = (
+        Index("uq_schemes_name", "name", unique=True),
+    )
+
+class SchemeEmbedding(Base):
+    """
+    Versioned scheme embeddings (one row per scheme per embedding model). Naya model yahan background
+    me fill hota hai jabki purana serve karta rehta hai; cutover app_settings flag se hota hai.
+    """
+    __tablename__ = "scheme_embeddings"
+    scheme_id = Column(Integer, ForeignKey("schemes.id", ondelete="CASCADE"), primary_key=True)
+    model_id = Column(String, primary_key=True)
+    embedding = Column(Vector())                 # Dimension model pe depend karta hai
+    source_hash = Column(String(64))             # Scheme.content_hash at embed time (stale detection)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        Index("ix_scheme_embeddings_model", "model_id", "scheme_id"),
+    )
+
+class AppSetting(Base):
+    """Small key/value flags (e.g. active_embedding_model) shared by all workers."""
+    __tablename__ = "app_settings"
+    key = Column(String, primary_key=True)
+    value = Column(String)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class SlowRequest(Base):
+    """Requests slower than SLOW_REQUEST_MS (only with SLOW_REQUEST_PERSIST=true), full span timeline ke saath."""
+    __tablename__ = "slow_requests"
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String)
+    session_id = Column(String, nullable=True)
+    total_ms = Column(Float)
+    timeline = Column(JSON)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+
 class User(Base):
     __tablename__ = "users"
     id = Column(Integer, primary_key=True, index=True)
@@ -46,4 +91,23 @@ class ChatHistory(Base):
     content = Column(Text)
     timestamp = Column(DateTime(timezone=True), server_default=func.now())
 
-    user = relationship("User", back_populates="chats")
\ No newline at end of file
+    user = relationship("User", back_populates="chats")
+
+    # Session ki messages timestamp order me (keyset pagination) bina sort ke
+    __table_args__ = (
+        Index("ix_chat_history_session_timestamp", "session_id", "timestamp", "id"),
+    )
+
+class ChatSession(Base):
+    """Per-session summary, updated on every history write (sidebar isi se banta hai)."""
+    __tablename__ = "chat_sessions"
+    session_id = Column(String, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    title = Column(String)                      # First user message snippet
+    message_count = Column(Integer, default=0, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    last_activity = Column(DateTime(timezone=True), nullable=False)
+
+    __table_args__ = (
+        Index("ix_chat_sessions_last_activity", "last_activity", "session_id"),
+    )
\ No newline at end of file
@@ -0,0 +1,49 @@
+import argparse
+import asyncio
+from database import engine, Base, AsyncSessionLocal
+from services.embedding_versions import embedding_versions
+from services.jina_service import jina_service
+from dotenv import load_dotenv
+
+load_dotenv()
+
+async def main(model_id: str = None, activate: bool = False, force: bool = False):
+    """
+    Zero-downtime embedding model migration (Jina model id = "jina/" + JINA_MODEL):
+      1. python reembed.py --model jina/jina-embeddings-v2-base-en      (fill scheme_embeddings, old model keeps serving)
+      2. python reembed.py --model jina/jina-embeddings-v2-base-en --activate   (atomic cutover once coverage is 100%)
+    Rollback: python reembed.py --model gemini/text-embedding-004 --activate
+    """
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    async with AsyncSessionLocal() as db:
+        active = await embedding_versions.active_model(db)
+        print(f"🔎 Active model: {active}")
+        for known in embedding_versions.models:
+            stats = await embedding_versions.coverage(db, known)
+            print(f"   {known}: {stats['embedded']}/{stats['total']} schemes embedded")
+
+    if model_id is None:
+        return
+
+    if not embedding_versions.is_legacy(model_id):
+        report = await embedding_versions.reembed(model_id)
+        print(f"🔥 Re-embedding finished: {report}")
+
+    if activate:
+        async with AsyncSessionLocal() as db:
+            try:
+                await embedding_versions.activate(db, model_id, force=force)
+            except ValueError as e:
+                print(f"🛑 Cutover refused: {e}")
+
+    await jina_service.aclose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-embed the scheme catalog with another model and cut over atomically.")
+    parser.add_argument("--model", choices=list(embedding_versions.models), help="Embedding model id to fill/activate")
+    parser.add_argument("--activate", action="store_true", help="Switch search to this model after re-embedding")
+    parser.add_argument("--force", action="store_true", help="Activate even if some schemes are not embedded yet")
+    args = parser.parse_args()
+    asyncio.run(main(args.model, args.activate, args.force))
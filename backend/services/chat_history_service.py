@@ -1,36 +1,483 @@
-from sqlalchemy import select, distinct, desc
+import asyncio
+import base64
+import json
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from sqlalchemy import select, distinct, desc, insert, update, tuple_, text, case
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.sql import func
-from sqlalchemy.ext.asyncio import AsyncSession
-from models import ChatHistory
-from datetime import datetime
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+from database import AsyncSessionLocal, engine, read_engine
+from services.request_trace import detach_trace
+from models import ChatHistory, ChatSession
+from datetime import datetime, timezone
+
+TITLE_MAX_CHARS = 80
+
+# 'write_behind' = messages queue hote hain aur batched INSERTs me flush, 'sync' = har message turant commit (tests)
+CHAT_HISTORY_MODE = os.getenv("CHAT_HISTORY_MODE", "write_behind").lower()
 
 class ChatHistoryService:
+    def __init__(self):
+        self.sync = CHAT_HISTORY_MODE == "sync"
+        self.flush_interval = float(os.getenv("CHAT_HISTORY_FLUSH_INTERVAL_MS", "200")) / 1000
+        self.batch_size = int(os.getenv("CHAT_HISTORY_BATCH_SIZE", "100"))
+        self.max_pending = int(os.getenv("CHAT_HISTORY_MAX_PENDING", "10000"))
+        # Ek batch itni baar fail ho (aur DB reachable ho) to use bisect karke kharab rows alag hoti hain
+        self.max_retries = int(os.getenv("CHAT_HISTORY_MAX_RETRIES", "3"))
+        self.dead_letters = deque(maxlen=int(os.getenv("CHAT_HISTORY_DEAD_LETTER_SIZE", "100")))
+        self._head_failures = 0
+        self._retry_at = 0.0
+        # Read replica lag: haal hi me likhe gaye sessions ki history primary se padhi jaati hai
+        self.sticky_seconds = float(os.getenv("DB_REPLICA_STICKY_SECONDS", "5"))
+        self._written_at = {}
+        self._pending = []
+        # Abhi DB me likhe ja rahe batches: (session ids, done event) - read-your-writes inka wait karta hai
+        self._inflight = []
+        self._wake = None
+        self._lock = None
+        self._writer = None
+        self._stopping = False
+        self.flushed = 0
+        self.batches = 0
+        self.failures = 0
+        self.dropped = 0
+        self.dead_lettered = 0
+
+    async def record(self, session_id: str, role: str, content: str, user_id: int = None, db: AsyncSession = None):
+        """
+        Chat request path ka entry point: write-behind mode me message sirf queue hota hai
+        (DB round trip response ke baad background me), sync mode me turant save.
+
+        Returns:
+            datetime: The message timestamp (update_message ke liye key).
+        """
+        if self.sync:
+            if db is not None:
+                message = await self.save_message(db, session_id, role, content, user_id)
+            else:
+                async with AsyncSessionLocal() as own_db:
+                    message = await self.save_message(own_db, session_id, role, content, user_id)
+            return message.timestamp
+        return self.enqueue(session_id, role, content, user_id)["timestamp"]
+
+    def enqueue(self, session_id: str, role: str, content: str, user_id: int = None) -> dict:
+        # Timestamp enqueue time pe, taaki same batch me user/assistant order sahi rahe
+        row = {
+            "session_id": session_id,
+            "role": role,
+            "content": content,
+            "user_id": user_id,
+            "timestamp": datetime.now(timezone.utc),
+        }
+        self._pending.append(row)
+        if len(self._pending) > self.max_pending:
+            overflow = len(self._pending) - self.max_pending
+            del self._pending[:overflow]
+            self.dropped += overflow
+            print(f"⚠️ Chat history queue full, dropped {overflow} oldest messages")
+        self.start()
+        if len(self._pending) >= self.batch_size:
+            self._wake.set()
+        return row
+
+    async def update_message(self, session_id: str, role: str, timestamp: datetime, content: str):
+        """
+        Rewrites the content of one recorded message (two-phase placeholder -> final summary).
+        Flush lock ke andar: row ya to abhi queue me hai (wahi badlo) ya DB me commit ho chuki hai.
+        """
+        lock = self._lock or asyncio.Lock()
+        async with lock:
+            await self._wait_inflight(session_id)
+            for row in self._pending:
+                if row["session_id"] == session_id and row["role"] == role and row["timestamp"] == timestamp:
+                    row["content"] = content
+                    return
+            async with AsyncSessionLocal() as db:
+                await db.execute(
+                    update(ChatHistory)
+                    .where(ChatHistory.session_id == session_id, ChatHistory.role == role,
+                           ChatHistory.timestamp == timestamp)
+                    .values(content=content)
+                )
+                await db.commit()
+
+    def start(self):
+        """Starts the background flusher (idempotent; needs a running event loop)."""
+        if self._writer is None or self._writer.done():
+            self._stopping = False
+            self._wake = asyncio.Event()
+            self._lock = asyncio.Lock()
+            self._writer = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """
+        Stops the flusher and drains everything still queued (lifespan shutdown). Writer cancel
+        nahi hota: uska current flush poora hone dete hain, phir back-off ignore karke final drain.
+        """
+        if self._writer is not None:
+            self._stopping = True
+            self._wake.set()
+            await self._writer
+            self._writer = None
+        await self.flush(final=True)
+        if self._pending:
+            print(f"❌ Chat history shutdown: {len(self._pending)} queued messages could not be written")
+
+    async def _run(self):
+        # Flusher pehli request ke context me banta hai; uski timeline me flushes nahi jaane chahiye
+        detach_trace()
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            if self._stopping:
+                return
+            await self.flush()
+
+    async def flush(self, final: bool = False):
+        """
+        Writes all queued messages as multi-row INSERTs (batch_size rows per statement).
+        Failed batch back-off ke saath retry hota hai; max_retries ke baad (DB reachable ho to)
+        batch bisect hota hai: DB jo rows reject kare wo dead-letter me, baaki likhi jaati hain.
+
+        Args:
+            final: Shutdown drain; back-off window ignore hota hai aur transient failure pe bachi rows queue me rehti hain.
+        """
+        # Back-off ke dauraan history GET bhi inline flush retry nahi karta
+        if not self._pending or (not final and time.monotonic() < self._retry_at):
+            return
+        lock = self._lock or asyncio.Lock()
+        async with lock:
+            while self._pending:
+                batch = self._pending[:self.batch_size]
+                del self._pending[:len(batch)]
+                try:
+                    async with self._writing(batch):
+                        await self._write(batch)
+                except asyncio.CancelledError:
+                    # Beech me cancel: batch commit hua ho ya nahi, pata nahi; message khone se behtar queue me wapas
+                    self._pending[:0] = batch
+                    raise
+                except Exception as e:
+                    self.failures += 1
+                    self._head_failures += 1
+                    if self._head_failures < self.max_retries or not await self._db_reachable():
+                        # Transient (DB down/timeout): batch wapas queue ke aage, back-off ke baad retry
+                        self._pending[:0] = batch
+                        backoff = min(30.0, self.flush_interval * 2 ** self._head_failures)
+                        self._retry_at = time.monotonic() + backoff
+                        print(f"❌ Chat history flush failed ({len(self._pending)} messages pending, "
+                              f"retry in {backoff:.1f}s): {e}")
+                        return
+                    # DB theek hai, batch hi reject ho raha hai: kharab rows alag karo
+                    await self._isolate(batch, e)
+                self._head_failures = 0
+                self._retry_at = 0.0
+
+    async def flush_session(self, session_id: str):
+        """
+        Read-your-writes for one session: writes only that session's queued rows (and waits for a
+        batch already carrying them), poora global queue GET ke andar drain nahi hota.
+        """
+        await self._wait_inflight(session_id)
+        rows = [row for row in self._pending if row["session_id"] == session_id]
+        if not rows:
+            return
+        self._pending[:] = [row for row in self._pending if row["session_id"] != session_id]
+        try:
+            async with self._writing(rows):
+                await self._write(rows)
+        except Exception as e:
+            # GET fail nahi hota; rows queue me wapas, background flusher unhe likhega
+            self._pending[:0] = rows
+            print(f"⚠️ Chat history read-your-writes flush failed for {session_id}: {e}")
+
+    @asynccontextmanager
+    async def _writing(self, rows: list):
+        entry = ({row["session_id"] for row in rows}, asyncio.Event())
+        self._inflight.append(entry)
+        try:
+            yield
+        finally:
+            self._inflight.remove(entry)
+            entry[1].set()
+
+    async def _wait_inflight(self, session_id: str):
+        for sessions, done in list(self._inflight):
+            if session_id in sessions:
+                await done.wait()
+
+    async def _write(self, rows: list):
+        async with AsyncSessionLocal() as db:
+            await db.execute(insert(ChatHistory), rows)
+            await self._touch_sessions(db, rows)
+            await db.commit()
+        self._mark_written(rows)
+        self.flushed += len(rows)
+        self.batches += 1
+
+    async def _isolate(self, rows: list, error: Exception):
+        """Bisects a rejected batch: accepted halves are written, single rejected rows are dead-lettered."""
+        if len(rows) == 1:
+            row = rows[0]
+            self.dead_lettered += 1
+            self.dead_letters.append({**row, "error": str(error)[:500]})
+            print(f"☠️ Chat history message dropped (session {row['session_id']}, {row['role']}): {error}")
+            return
+        middle = len(rows) // 2
+        for half in (rows[:middle], rows[middle:]):
+            try:
+                await self._write(half)
+            except Exception as e:
+                await self._isolate(half, e)
+
+    async def _db_reachable(self) -> bool:
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.execute(text("SELECT 1"))
+            return True
+        except Exception:
+            return False
+
     async def save_message(self, db: AsyncSession, session_id: str, role: str, content: str, user_id: int = None):
+        timestamp = datetime.now(timezone.utc)
         message = ChatHistory(
             session_id=session_id,
             role=role,
             content=content,
-            user_id=user_id
+            user_id=user_id,
+            timestamp=timestamp
         )
         db.add(message)
+        await self._touch_sessions(db, [{
+            "session_id": session_id,
+            "role": role,
+            "content": content,
+            "user_id": user_id,
+            "timestamp": timestamp,
+        }])
         await db.commit()
+        self._mark_written([{"session_id": session_id}])
         await db.refresh(message)
         return message
 
-    async def get_session_history(self, db: AsyncSession, session_id: str):
-        stmt = select(ChatHistory).where(ChatHistory.session_id == session_id).order_by(ChatHistory.timestamp.asc())
-        result = await db.execute(stmt)
-        return result.scalars().all()
-
-    async def get_user_sessions(self, db: AsyncSession, user_id: int = None):
-        # Simplify: Get unique session IDs ordered by their latest activity
-        stmt = (
-            select(ChatHistory.session_id)
-            .group_by(ChatHistory.session_id)
-            .order_by(func.max(ChatHistory.timestamp).desc())
+    def _mark_written(self, rows: list):
+        now = time.monotonic()
+        for row in rows:
+            self._written_at[row["session_id"]] = now
+        if len(self._written_at) > self.max_pending:
+            cutoff = now - self.sticky_seconds
+            self._written_at = {sid: at for sid, at in self._written_at.items() if at >= cutoff}
+
+    def _needs_primary(self, db: AsyncSession, session_id: str) -> bool:
+        """Replica session + session written within sticky_seconds -> read from the primary."""
+        if read_engine is engine or db.bind is not read_engine:
+            return False
+        written_at = self._written_at.get(session_id)
+        return written_at is not None and time.monotonic() - written_at < self.sticky_seconds
+
+    async def _touch_sessions(self, db: AsyncSession, rows: list):
+        """
+        Incrementally updates chat_sessions for the given message rows (same transaction):
+        last_activity, message_count += n, title = first user message (set once).
+        """
+        summaries = {}
+        for row in rows:
+            summary = summaries.setdefault(row["session_id"], {
+                "session_id": row["session_id"],
+                "user_id": row.get("user_id"),
+                "title": None,
+                "message_count": 0,
+                "last_activity": row["timestamp"],
+            })
+            summary["message_count"] += 1
+            summary["last_activity"] = max(summary["last_activity"], row["timestamp"])
+            if summary["title"] is None and row["role"] == "user" and row["content"]:
+                summary["title"] = row["content"][:TITLE_MAX_CHARS]
+        if not summaries:
+            return
+
+        dialect = postgresql if db.bind.dialect.name == "postgresql" else sqlite
+        stmt = dialect.insert(ChatSession).values(list(summaries.values()))
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[ChatSession.session_id],
+            set_={
+                "message_count": ChatSession.message_count + stmt.excluded.message_count,
+                "last_activity": case(
+                    (stmt.excluded.last_activity > ChatSession.last_activity, stmt.excluded.last_activity),
+                    else_=ChatSession.last_activity,
+                ),
+                "title": func.coalesce(ChatSession.title, stmt.excluded.title),
+                "user_id": func.coalesce(ChatSession.user_id, stmt.excluded.user_id),
+            },
         )
-        
-        result = await db.execute(stmt)
-        return result.scalars().all()
+        await db.execute(stmt)
+
+    async def get_session_history(self, db: AsyncSession, session_id: str, limit: int = None, cursor: str = None):
+        """
+        Messages of a session in chronological order. With limit, returns the newest page
+        (or the page older than cursor) and a cursor for the next older page.
+
+        Returns:
+            tuple: (messages, next_cursor or None)
+        """
+        # Read-your-writes: sirf is session ke queued messages DB me (aur replica lag ho to primary se padho)
+        await self.flush_session(session_id)
+        if self._needs_primary(db, session_id):
+            async with AsyncSessionLocal() as primary:
+                return await self._history_page(primary, session_id, limit, cursor)
+        return await self._history_page(db, session_id, limit, cursor)
+
+    async def _history_page(self, db: AsyncSession, session_id: str, limit: int = None, cursor: str = None):
+        stmt = select(ChatHistory).where(ChatHistory.session_id == session_id)
+        if limit is None:
+            result = await db.execute(stmt.order_by(ChatHistory.timestamp.asc(), ChatHistory.id.asc()))
+            return result.scalars().all(), None
+
+        if cursor:
+            timestamp, message_id = decode_cursor(cursor)
+            stmt = stmt.where(tuple_(ChatHistory.timestamp, ChatHistory.id) < tuple_(timestamp, message_id))
+        stmt = stmt.order_by(ChatHistory.timestamp.desc(), ChatHistory.id.desc()).limit(limit + 1)
+        messages = (await db.execute(stmt)).scalars().all()
+
+        next_cursor = None
+        if len(messages) > limit:
+            messages = messages[:limit]
+            next_cursor = encode_cursor(messages[-1].timestamp, messages[-1].id)
+        return list(reversed(messages)), next_cursor
+
+    async def get_user_sessions(self, db: AsyncSession, user_id: int = None, limit: int = 30, cursor: str = None):
+        """
+        Sessions by latest activity from the chat_sessions summary table (index range scan).
+        Queued (write-behind) messages flush nahi hote: unke sessions summary rows ke upar merge hote hain.
+        Replica session pe list kuch seconds (replication lag) purani ho sakti hai.
+
+        Returns:
+            tuple: (list of session dicts, next_cursor or None)
+        """
+        key = None
+        stmt = select(ChatSession)
+        if user_id is not None:
+            stmt = stmt.where(ChatSession.user_id == user_id)
+        if cursor:
+            last_activity, session_id = decode_cursor(cursor)
+            key = (_aware(last_activity), session_id)
+            stmt = stmt.where(tuple_(ChatSession.last_activity, ChatSession.session_id) < tuple_(last_activity, session_id))
+
+        # Queued sessions DB page se bahar, merged version (DB counts + queue) apni sahi jagah pe
+        queued = await self._queued_sessions(db, user_id)
+        if queued:
+            stmt = stmt.where(ChatSession.session_id.notin_(list(queued)))
+        stmt = stmt.order_by(ChatSession.last_activity.desc(), ChatSession.session_id.desc()).limit(limit + 1)
+        rows = (await db.execute(stmt)).scalars().all()
+
+        sessions = [
+            {
+                "id": row.session_id,
+                "title": row.title,
+                "message_count": row.message_count,
+                "last_activity": row.last_activity,
+            }
+            for row in rows
+        ]
+        sessions += [s for s in queued.values() if key is None or (_aware(s["last_activity"]), s["id"]) < key]
+        sessions.sort(key=lambda s: (_aware(s["last_activity"]), s["id"]), reverse=True)
+
+        next_cursor = None
+        if len(sessions) > limit:
+            sessions = sessions[:limit]
+            next_cursor = encode_cursor(sessions[-1]["last_activity"], sessions[-1]["id"])
+        return sessions, next_cursor
+
+    async def _queued_sessions(self, db: AsyncSession, user_id: int = None) -> dict:
+        """Session summaries for queued messages, merged with their chat_sessions rows (if any)."""
+        queued = {}
+        for row in self._pending:
+            if user_id is not None and row.get("user_id") != user_id:
+                continue
+            summary = queued.setdefault(row["session_id"], {
+                "id": row["session_id"],
+                "title": None,
+                "message_count": 0,
+                "last_activity": row["timestamp"],
+            })
+            summary["message_count"] += 1
+            summary["last_activity"] = max(summary["last_activity"], row["timestamp"])
+            if summary["title"] is None and row["role"] == "user" and row["content"]:
+                summary["title"] = row["content"][:TITLE_MAX_CHARS]
+        if not queued:
+            return queued
+
+        stored = (await db.execute(select(ChatSession).where(ChatSession.session_id.in_(list(queued))))).scalars().all()
+        for row in stored:
+            summary = queued[row.session_id]
+            summary["title"] = row.title or summary["title"]
+            summary["message_count"] += row.message_count
+            summary["last_activity"] = max(_aware(row.last_activity), summary["last_activity"])
+        return queued
+
+    async def ensure_schema(self, conn: AsyncConnection):
+        """
+        Composite (session_id, timestamp) index on existing chat_history tables (create_all sirf
+        nayi tables banata hai) + one-time chat_sessions backfill from old history.
+        """
+        for index in ChatHistory.__table__.indexes:
+            await conn.run_sync(lambda sync_conn, index=index: index.create(sync_conn, checkfirst=True))
+
+        has_sessions = (await conn.execute(select(ChatSession.session_id).limit(1))).first()
+        has_history = (await conn.execute(select(ChatHistory.id).limit(1))).first()
+        if has_sessions or not has_history:
+            return
+
+        await conn.execute(text(
+            "INSERT INTO chat_sessions (session_id, user_id, title, message_count, created_at, last_activity) "
+            "SELECT h.session_id, max(h.user_id), NULL, count(*), min(h.timestamp), max(h.timestamp) "
+            "FROM chat_history h WHERE h.session_id IS NOT NULL GROUP BY h.session_id"
+        ))
+        await conn.execute(
+            ChatSession.__table__.update()
+            .values(title=select(func.substr(ChatHistory.content, 1, TITLE_MAX_CHARS))
+                    .where(ChatHistory.session_id == ChatSession.session_id, ChatHistory.role == "user")
+                    .order_by(ChatHistory.timestamp.asc(), ChatHistory.id.asc())
+                    .limit(1)
+                    .scalar_subquery())
+        )
+        print("✅ chat_sessions backfilled from chat_history.")
+
+    def stats(self) -> dict:
+        return {
+            "mode": "sync" if self.sync else "write_behind",
+            "pending": len(self._pending),
+            "flushed": self.flushed,
+            "batches": self.batches,
+            "failures": self.failures,
+            "dropped": self.dropped,
+            "dead_lettered": self.dead_lettered,
+        }
+
+def _aware(timestamp: datetime) -> datetime:
+    # SQLite naive datetimes lautata hai; queued rows UTC-aware hain
+    return timestamp if timestamp.tzinfo is not None else timestamp.replace(tzinfo=timezone.utc)
+
+def encode_cursor(timestamp: datetime, key) -> str:
+    """Opaque keyset cursor for (timestamp, tiebreaker key)."""
+    raw = json.dumps([timestamp.isoformat(), key])
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+def decode_cursor(cursor: str):
+    """
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    try:
+        timestamp, key = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return datetime.fromisoformat(timestamp), key
+    except Exception as e:
+        raise ValueError("Invalid cursor") from e
 
 chat_history_service = ChatHistoryService()
@@ -0,0 +1,215 @@
+import os
+import re
+import time
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import Scheme
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# In values wale schemes sabke liye open hain (us dimension pe koi restriction nahi)
+UNIVERSAL_SOCIAL = {"all", "general", "any"}
+UNIVERSAL_SECTOR = {"all", "multi", "cross", "any", "msme", "industry", "business", "enterprises", "micro"}
+SOCIAL_ALIASES = {"obc": "backward", "bc": "backward", "woman": "women", "female": "women"}
+
+# Geography strings -> canonical state keys. Jo value kisi state pe map na ho (Rural, Clusters, India-wide)
+# use geographic restriction nahi maana jaata.
+STATE_ALIASES = {
+    "uttar pradesh": ["uttar pradesh", "up", "noida", "greater noida", "yamuna expressway"],
+    "jammu & kashmir": ["jammu & kashmir", "jammu and kashmir", "j&k", "kashmir"],
+    "kerala": ["kerala"],
+    "tamil nadu": ["tamil nadu", "tn"],
+    "northeast": ["northeast", "north east", "ne region", "assam", "meghalaya", "manipur", "mizoram",
+                  "nagaland", "tripura", "arunachal pradesh", "sikkim"],
+}
+
+# User profile ke alag-alag keys jo ek hi dimension ko describe karte hain. Generic "category"
+# jaan-bujhkar nahi: frontend/business data me wo business category hota hai, caste category nahi
+PROFILE_KEYS = {
+    "social_category": ["social_category", "caste_category"],
+    "geography": ["location", "state", "geography"],
+    "sector": ["sector", "industry"],
+    "age": ["age"],
+}
+
+
+def _tokens(value: Any) -> Set[str]:
+    if isinstance(value, (list, tuple)):
+        value = " ".join(str(v) for v in value)
+    return set(_TOKEN_RE.findall(str(value or "").lower()))
+
+
+def _states(value: Any) -> Set[str]:
+    text = f" {str(value or '').lower()} "
+    found = set()
+    for state, aliases in STATE_ALIASES.items():
+        for alias in aliases:
+            if re.search(r"(?<![a-z])" + re.escape(alias) + r"(?![a-z])", text):
+                found.add(state)
+                break
+    return found
+
+
+def _profile_value(profile: Dict[str, Any], dimension: str) -> Any:
+    for key in PROFILE_KEYS[dimension]:
+        if profile.get(key) not in (None, ""):
+            return profile[key]
+    return None
+
+
+class EligibilityIndex:
+    """
+    In-memory eligibility bitsets built from Scheme.eligibility_criteria.
+    Har dimension (social_category, geography, min_age, sector) ki har value ke liye ek int bitset
+    (bit i = catalog ka i-th scheme). Filter = kuch AND/OR operations, per request microseconds.
+    """
+
+    def __init__(self):
+        self.refresh_seconds = float(os.getenv("ELIGIBILITY_REFRESH_SECONDS", "60"))
+        self.ids: np.ndarray = np.zeros(0, dtype=np.int64)
+        self.all_bits = 0
+        self.social: Dict[str, int] = {}
+        self.social_universal = 0
+        self.geo: Dict[str, int] = {}
+        self.geo_universal = 0
+        self.sector: Dict[str, int] = {}
+        self.sector_universal = 0
+        self.age_thresholds: List[Tuple[int, int]] = []  # (min_age, schemes with exactly this min_age)
+        self._signature: Optional[Tuple] = None
+        self._checked_at = 0.0
+
+    @property
+    def ready(self) -> bool:
+        return self._signature is not None
+
+    def invalidate(self):
+        """Forces a rebuild on the next ensure_fresh() (call after catalog writes)."""
+        self._signature = None
+        self._checked_at = 0.0
+
+    async def ensure_fresh(self, db: AsyncSession):
+        """Rebuilds the index if the schemes table changed (checked at most every refresh_seconds)."""
+        now = time.monotonic()
+        if self.ready and now - self._checked_at < self.refresh_seconds:
+            return
+        self._checked_at = now
+
+        signature = tuple((await db.execute(
+            select(func.count(Scheme.id), func.max(Scheme.id), func.max(Scheme.updated_at))
+        )).one())
+        if signature == self._signature:
+            return
+
+        rows = (await db.execute(select(Scheme.id, Scheme.eligibility_criteria).order_by(Scheme.id))).all()
+        self.build(rows)
+        self._signature = signature
+
+    def build(self, rows: Iterable[Tuple[int, Optional[Dict[str, Any]]]]):
+        rows = list(rows)
+        social: Dict[str, int] = {}
+        geo: Dict[str, int] = {}
+        sector: Dict[str, int] = {}
+        ages: Dict[int, int] = {}
+        social_universal = geo_universal = sector_universal = 0
+
+        for i, (_, criteria) in enumerate(rows):
+            bit = 1 << i
+            criteria = criteria if isinstance(criteria, dict) else {}
+
+            categories = _tokens(criteria.get("social_category"))
+            if not categories or categories & UNIVERSAL_SOCIAL:
+                social_universal |= bit
+            for token in categories:
+                social[token] = social.get(token, 0) | bit
+
+            states = _states(criteria.get("geography"))
+            if not states:
+                geo_universal |= bit
+            for state in states:
+                geo[state] = geo.get(state, 0) | bit
+
+            sectors = _tokens(criteria.get("sector"))
+            if not sectors or sectors & UNIVERSAL_SECTOR:
+                sector_universal |= bit
+            for token in sectors:
+                sector[token] = sector.get(token, 0) | bit
+
+            try:
+                min_age = int(criteria.get("min_age") or 0)
+            except (TypeError, ValueError):
+                min_age = 0
+            ages[min_age] = ages.get(min_age, 0) | bit
+
+        self.ids = np.array([row[0] for row in rows], dtype=np.int64)
+        self.all_bits = (1 << len(rows)) - 1
+        self.social, self.social_universal = social, social_universal
+        self.geo, self.geo_universal = geo, geo_universal
+        self.sector, self.sector_universal = sector, sector_universal
+        self.age_thresholds = sorted(ages.items())
+        print(f"✅ Eligibility index built ({len(rows)} schemes).")
+
+    def mask(self, profile: Optional[Dict[str, Any]]) -> int:
+        """Bitset of schemes the profile is eligible for. Unknown/missing profile values don't filter."""
+        bits = self.all_bits
+        if not profile or not bits:
+            return bits
+
+        categories = {SOCIAL_ALIASES.get(t, t) for t in _tokens(_profile_value(profile, "social_category"))}
+        if str(profile.get("gender", "")).lower() in ("female", "woman", "f"):
+            categories |= {"women"}
+        if categories:
+            allowed = self.social_universal
+            for token in categories:
+                allowed |= self.social.get(token, 0)
+            bits &= allowed
+
+        states = _states(_profile_value(profile, "geography"))
+        if states:
+            allowed = self.geo_universal
+            for state in states:
+                allowed |= self.geo.get(state, 0)
+            bits &= allowed
+
+        # Sector sirf tab filter karta hai jab profile ka sector index me kahin match kare
+        sectors = _tokens(_profile_value(profile, "sector")) - UNIVERSAL_SECTOR
+        known = [self.sector[t] for t in sectors if t in self.sector]
+        if known:
+            allowed = self.sector_universal
+            for sector_bits in known:
+                allowed |= sector_bits
+            bits &= allowed
+
+        age = _profile_value(profile, "age")
+        if age is not None:
+            try:
+                age = int(age)
+                allowed = 0
+                for min_age, age_bits in self.age_thresholds:
+                    if min_age > age:
+                        break
+                    allowed |= age_bits
+                bits &= allowed
+            except (TypeError, ValueError):
+                pass
+
+        return bits
+
+    def eligible_ids(self, profile: Optional[Dict[str, Any]]) -> Optional[List[int]]:
+        """
+        Scheme ids eligible for the profile, or None when nothing is filtered out
+        (caller then skips the SQL pre-filter entirely).
+        """
+        bits = self.mask(profile)
+        if bits == self.all_bits:
+            return None
+        n = len(self.ids)
+        raw = np.frombuffer(bits.to_bytes((n + 7) // 8 or 1, "little"), dtype=np.uint8)
+        selected = np.flatnonzero(np.unpackbits(raw, bitorder="little")[:n])
+        return self.ids[selected].tolist()
+
+
+eligibility_index = EligibilityIndex()
@@ -0,0 +1,168 @@
+import asyncio
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# SQLite ke purane builds 999 bound parameters tak allow karte hain
+SQLITE_MAX_PARAMS = 900
+
+
+class EmbeddingCache:
+    """
+    Two-tier embedding cache keyed by hash(model + text): in-process LRU + optional sqlite file.
+    Disk tier restart ke baad bhi repeated queries / seeding ko network se bachata hai. Sqlite
+    reads/writes ek dedicated thread pe chalte hain (event loop block nahi hota) aur writes
+    flush_seconds window me jama hokar ek transaction (ek commit) me jaate hain.
+    """
+
+    def __init__(self, maxsize: int = 4096, disk_path: Optional[str] = None, flush_seconds: float = 1.0):
+        self.maxsize = maxsize
+        self.disk_path = disk_path
+        self.flush_seconds = flush_seconds
+        self._data: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._db: Optional[sqlite3.Connection] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # Disk pe abhi nahi likhe gaye vectors (key -> float32 bytes); disk thread aur loop dono chhoote hain
+        self._unwritten: Dict[str, bytes] = {}
+        self._write_lock = threading.Lock()
+        self._flush_scheduled = False
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.disk_writes = 0
+
+        if disk_path:
+            try:
+                self._db = sqlite3.connect(disk_path, check_same_thread=False)
+                self._db.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+                self._db.commit()
+                # Ek hi thread: sqlite connection pe koi concurrent access nahi
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="embedding-cache")
+            except sqlite3.Error as e:
+                print(f"⚠️ Embedding disk cache disabled ({disk_path}): {e}")
+                self._db = None
+
+    async def get(self, key: str) -> Optional[List[float]]:
+        return (await self.get_many([key]))[0]
+
+    async def get_many(self, keys: List[str]) -> List[Optional[List[float]]]:
+        """Memory tier first; remaining keys in one disk-thread lookup."""
+        results: List[Optional[List[float]]] = []
+        missing = []
+        for key in keys:
+            vector = self._data.get(key)
+            if vector is not None:
+                self._data.move_to_end(key)
+                self.memory_hits += 1
+            else:
+                missing.append(key)
+            results.append(vector)
+
+        found = {}
+        if missing and self._db is not None:
+            loop = asyncio.get_running_loop()
+            found = await loop.run_in_executor(self._executor, self._read, list(dict.fromkeys(missing)))
+        for i, key in enumerate(keys):
+            if results[i] is not None:
+                continue
+            blob = found.get(key)
+            if blob is None:
+                self.misses += 1
+                continue
+            results[i] = np.frombuffer(blob, dtype=np.float32).tolist()
+            self._remember(key, results[i])
+            self.disk_hits += 1
+        return results
+
+    def set(self, key: str, vector: List[float]):
+        """Memory tier turant; disk write queue hota hai aur flush_seconds baad batch me commit."""
+        self._remember(key, vector)
+        if self._db is None:
+            return
+        with self._write_lock:
+            self._unwritten[key] = np.asarray(vector, dtype=np.float32).tobytes()
+            if self._flush_scheduled:
+                return
+            self._flush_scheduled = True
+        try:
+            asyncio.get_running_loop().call_later(self.flush_seconds, self._submit_write)
+        except RuntimeError:
+            # Event loop ke bahar (sync scripts): seedha likho
+            self._write()
+
+    async def aclose(self):
+        """Writes queued vectors and stops the disk thread (lifespan shutdown)."""
+        if self._executor is None:
+            return
+        await asyncio.get_running_loop().run_in_executor(self._executor, self._write)
+        self._executor.shutdown(wait=True)
+        self._executor = None
+        self._db.close()
+        self._db = None
+
+    def _submit_write(self):
+        if self._executor is not None:  # aclose ke baad queue pehle hi likhi ja chuki hai
+            self._executor.submit(self._write)
+
+    def _read(self, keys: List[str]) -> Dict[str, bytes]:
+        # Disk thread: abhi queue me pade vectors bhi hit hain
+        with self._write_lock:
+            found = {key: self._unwritten[key] for key in keys if key in self._unwritten}
+        rest = [key for key in keys if key not in found]
+        try:
+            for i in range(0, len(rest), SQLITE_MAX_PARAMS):
+                chunk = rest[i:i + SQLITE_MAX_PARAMS]
+                placeholders = ",".join("?" * len(chunk))
+                found.update(self._db.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", chunk
+                ).fetchall())
+        except sqlite3.Error as e:
+            print(f"⚠️ Embedding disk cache read failed: {e}")
+        return found
+
+    def _write(self):
+        # Disk thread: window me jama saare vectors ek transaction me
+        with self._write_lock:
+            rows = list(self._unwritten.items())
+            self._unwritten.clear()
+            self._flush_scheduled = False
+        if not rows or self._db is None:
+            return
+        try:
+            with self._db:
+                self._db.executemany("INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)", rows)
+            self.disk_writes += 1
+        except sqlite3.Error as e:
+            print(f"⚠️ Embedding disk cache write failed ({len(rows)} vectors): {e}")
+
+    def _remember(self, key: str, vector: List[float]):
+        self._data[key] = vector
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def stats(self) -> dict:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "disk_tier": self._db is not None,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "disk_writes": self.disk_writes,
+            "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+        }
+
+
+def embedding_cache_from_env() -> EmbeddingCache:
+    return EmbeddingCache(
+        maxsize=int(os.getenv("EMBEDDING_CACHE_SIZE", "4096")),
+        disk_path=os.getenv("EMBEDDING_CACHE_PATH") or None,
+        flush_seconds=float(os.getenv("EMBEDDING_CACHE_FLUSH_MS", "1000")) / 1000,
+    )
@@ -0,0 +1,179 @@
+import asyncio
+import os
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import AsyncSessionLocal
+from models import AppSetting, Scheme, SchemeEmbedding
+from services.gemini_service import gemini_service
+from services.jina_service import jina_service
+from services.scheme_ingestion import rich_text
+
+# schemes.embedding column isi model ka hai (original Gemini path); baaki models scheme_embeddings me
+LEGACY_MODEL = "gemini/text-embedding-004"
+ACTIVE_MODEL_KEY = "active_embedding_model"
+
+
+class EmbeddingModel:
+    """One embedding model: document (batch) and query embedders. Both return None on failure."""
+
+    def __init__(self, model_id: str, embed_documents: Callable[[List[str]], Awaitable[Optional[List]]],
+                 embed_query: Callable[[str], Awaitable[Optional[List[float]]]]):
+        self.model_id = model_id
+        self.embed_documents = embed_documents
+        self.embed_query = embed_query
+
+
+class EmbeddingVersions:
+    """
+    Embedding model versions for the scheme catalog: registry, background re-embedding job
+    and the active-model cutover flag (app_settings row) that SchemeService reads.
+    """
+
+    def __init__(self):
+        self.cache_seconds = float(os.getenv("EMBEDDING_ACTIVE_MODEL_CACHE_SECONDS", "30"))
+        self.default_model = os.getenv("EMBEDDING_ACTIVE_MODEL", LEGACY_MODEL)
+        self.batch_size = int(os.getenv("REEMBED_BATCH_SIZE", "64"))
+        self.concurrency = int(os.getenv("REEMBED_CONCURRENCY", "2"))
+        self._active: Optional[str] = None
+        self._checked_at = 0.0
+
+        jina_model = f"jina/{jina_service.model}"
+        self.models: Dict[str, EmbeddingModel] = {
+            LEGACY_MODEL: EmbeddingModel(LEGACY_MODEL, gemini_service.get_embeddings_batch, gemini_service.get_embeddings),
+            jina_model: EmbeddingModel(
+                jina_model,
+                lambda texts: jina_service.embed_many(texts, task="retrieval.passage"),
+                lambda text: jina_service.embed_text(text, task="retrieval.query"),
+            ),
+        }
+
+    def require(self, model_id: str) -> EmbeddingModel:
+        """
+        Raises:
+            ValueError: Unknown model id (message lists the registered ids).
+        """
+        model = self.models.get(model_id)
+        if model is None:
+            raise ValueError(f"Unknown embedding model: {model_id} (valid: {', '.join(self.models)})")
+        return model
+
+    def is_legacy(self, model_id: str) -> bool:
+        return model_id == LEGACY_MODEL
+
+    async def active_model(self, db: AsyncSession) -> str:
+        """Currently serving model id (cached for a few seconds; cutover propagates within that window)."""
+        now = time.monotonic()
+        if self._active is not None and now - self._checked_at < self.cache_seconds:
+            return self._active
+        value = (await db.execute(select(AppSetting.value).where(AppSetting.key == ACTIVE_MODEL_KEY))).scalar()
+        self._active = value if value in self.models else self.default_model
+        self._checked_at = now
+        return self._active
+
+    async def embed_query(self, model_id: str, text: str) -> Optional[List[float]]:
+        return await self.require(model_id).embed_query(text)
+
+    async def coverage(self, db: AsyncSession, model_id: str) -> Dict[str, int]:
+        """How many schemes have an up-to-date embedding for model_id."""
+        total = (await db.execute(select(func.count(Scheme.id)))).scalar() or 0
+        if self.is_legacy(model_id):
+            current = (await db.execute(select(func.count(Scheme.id)).where(Scheme.embedding.isnot(None)))).scalar() or 0
+        else:
+            current = (await db.execute(
+                select(func.count(SchemeEmbedding.scheme_id))
+                .join(Scheme, Scheme.id == SchemeEmbedding.scheme_id)
+                .where(SchemeEmbedding.model_id == model_id, SchemeEmbedding.source_hash == Scheme.content_hash)
+            )).scalar() or 0
+        return {"embedded": current, "total": total}
+
+    async def activate(self, db: AsyncSession, model_id: str, force: bool = False):
+        """
+        Atomic cutover: one-row upsert, every worker picks it up on its next active_model() check.
+
+        Raises:
+            ValueError: Unknown model, or model not fully embedded (unless force).
+        """
+        self.require(model_id)
+        stats = await self.coverage(db, model_id)
+        if not force and stats["embedded"] < stats["total"]:
+            raise ValueError(f"{model_id} covers {stats['embedded']}/{stats['total']} schemes; run the re-embed job first")
+
+        stmt = pg_insert(AppSetting).values(key=ACTIVE_MODEL_KEY, value=model_id)
+        stmt = stmt.on_conflict_do_update(index_elements=[AppSetting.key], set_={"value": model_id, "updated_at": func.now()})
+        await db.execute(stmt)
+        await db.commit()
+        self._active = model_id
+        self._checked_at = time.monotonic()
+        print(f"✅ Active embedding model -> {model_id}")
+
+    async def reembed(self, model_id: str) -> Dict[str, int]:
+        """
+        Background job: fills scheme_embeddings for model_id (missing or stale rows only), in
+        concurrent batches. Resumable; the active model keeps serving while it runs.
+
+        Raises:
+            ValueError: Unknown model id, or the legacy model.
+        """
+        model = self.require(model_id)
+        if self.is_legacy(model_id):
+            raise ValueError("The legacy model lives in schemes.embedding; use seed.py for it")
+
+        async with AsyncSessionLocal() as db:
+            stale = (await db.execute(
+                select(Scheme)
+                .outerjoin(SchemeEmbedding, and_(SchemeEmbedding.scheme_id == Scheme.id, SchemeEmbedding.model_id == model_id))
+                .where(or_(SchemeEmbedding.scheme_id.is_(None), SchemeEmbedding.source_hash.is_distinct_from(Scheme.content_hash)))
+                .order_by(Scheme.id)
+            )).scalars().all()
+
+        report = {"embedded": 0, "failed": 0}
+        batches = [stale[i:i + self.batch_size] for i in range(0, len(stale), self.batch_size)]
+        semaphore = asyncio.Semaphore(self.concurrency)
+        print(f"📦 Re-embedding {len(stale)} schemes with {model_id} ({len(batches)} batches)...")
+
+        async def process(batch):
+            async with semaphore:
+                vectors = await model.embed_documents([rich_text(self._source(s)) for s in batch]) or [None] * len(batch)
+                rows = [
+                    {"scheme_id": s.id, "model_id": model_id, "embedding": vector, "source_hash": s.content_hash}
+                    for s, vector in zip(batch, vectors) if vector
+                ]
+                if rows:
+                    stmt = pg_insert(SchemeEmbedding).values(rows)
+                    stmt = stmt.on_conflict_do_update(
+                        index_elements=[SchemeEmbedding.scheme_id, SchemeEmbedding.model_id],
+                        set_={"embedding": stmt.excluded.embedding, "source_hash": stmt.excluded.source_hash,
+                              "updated_at": func.now()},
+                    )
+                    async with AsyncSessionLocal() as db:
+                        await db.execute(stmt)
+                        await db.commit()
+            report["embedded"] += len(rows)
+            report["failed"] += len(batch) - len(rows)
+            print(f"   ✅ [{report['embedded'] + report['failed']}/{len(stale)}] {model_id}")
+
+        await asyncio.gather(*(process(batch) for batch in batches))
+        return report
+
+    async def sync_active(self):
+        """After catalog ingestion: active model agar side table wala hai to naye/badle schemes embed karo."""
+        async with AsyncSessionLocal() as db:
+            model_id = await self.active_model(db)
+        if not self.is_legacy(model_id):
+            await self.reembed(model_id)
+
+    def stats(self) -> dict:
+        return {"active_model": self._active or self.default_model, "models": list(self.models)}
+
+    @staticmethod
+    def _source(scheme: Scheme) -> dict:
+        return {"name": scheme.name, "description": scheme.description,
+                "benefits": scheme.benefits or [], "tags": scheme.tags or []}
+
+
+embedding_versions = EmbeddingVersions()
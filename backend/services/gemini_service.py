@@ -1,6 +1,12 @@
 import os
-from langchain_google_genai import ChatGoogleGenerativeAI, GoogleGenerativeAIEmbeddings
 from dotenv import load_dotenv
+from services.singleflight import SingleFlight, payload_key
+from services.rate_governor import get_governor
+from services.embedding_cache import embedding_cache_from_env
+from services.micro_batcher import MicroBatcher
+from services.startup_profile import lazy_client, client_ready
+from services.metrics import observe_call, record_tokens
+from services.request_trace import trace_span
 
 load_dotenv()
 
@@ -14,43 +20,114 @@ class GeminiService:
         return cls._instance
 
     def _initialize(self):
-        api_key = os.getenv("GOOGLE_API_KEY") or os.getenv("GEMINI_API_KEY")
-        if not api_key:
+        self.api_key = os.getenv("GOOGLE_API_KEY") or os.getenv("GEMINI_API_KEY")
+        if not self.api_key:
             print("❌ Error: Google API Key not found.")
-        
-        # 1. Chat Model: Gemini 1.5 Flash (Perfect for your Agent)
-        self.llm = ChatGoogleGenerativeAI(
-            model="gemini-flash-latest", 
-            google_api_key=api_key,
-            temperature=0.7
+
+        # LangChain Google clients (llm, embeddings_model) pehli use pe bante hain, taaki
+        # langchain_google_genai ka ~1s import worker boot me na lage
+        self.embedding_model_name = "models/text-embedding-004"
+
+        # Same text ke concurrent embedding calls ek hi request share karte hain
+        self.inflight = SingleFlight("gemini_embeddings")
+        # Shared Gemini governor: 429 pe None return karne ki jagah request queue/retry hoti hai
+        self.governor = get_governor("gemini")
+        # Embedding cache (LRU + optional sqlite tier) aur micro-batcher: concurrent single-text
+        # requests ek aembed_documents call me jaati hain
+        self.embedding_cache = embedding_cache_from_env()
+        self.embedding_batcher = MicroBatcher(
+            "gemini_embeddings",
+            self._embed_documents,
+            window_seconds=float(os.getenv("EMBEDDING_BATCH_WINDOW_MS", "10")) / 1000,
+            max_batch=int(os.getenv("EMBEDDING_BATCH_SIZE", "100")),
+        )
+
+    @lazy_client
+    def llm(self):
+        """Chat Model: Gemini Flash (Perfect for your Agent)"""
+        from langchain_google_genai import ChatGoogleGenerativeAI
+        # max_retries=0: SDK ka internal retry band, 429 governor tak pahunche (AIMD back-off + retry wahi)
+        return ChatGoogleGenerativeAI(
+            model="gemini-flash-latest",
+            google_api_key=self.api_key,
+            temperature=0.7,
+            max_retries=0
         )
 
-        # 2. Embedding Model: text-embedding-004 (More stable than 001)
-        # Yeh 768 dimensions hi return karega.
-        self.embeddings_model = GoogleGenerativeAIEmbeddings(
-            model="models/text-embedding-004", # UPDATED
-            google_api_key=api_key,
+    @lazy_client
+    def embeddings_model(self):
+        """Embedding Model: text-embedding-004 (768 dimensions, embedding_model_name ke saath sync rakhein)"""
+        # google-genai client bina retry_options ke single attempt karta hai; retries governor me
+        from langchain_google_genai import GoogleGenerativeAIEmbeddings
+        return GoogleGenerativeAIEmbeddings(
+            model=self.embedding_model_name,
+            google_api_key=self.api_key,
             task_type="retrieval_document" # Document storage ke liye
         )
 
     async def generate_response(self, prompt: str) -> str:
         """Generates text response for MAYA-AI Agent"""
         try:
-            response = await self.llm.ainvoke(prompt)
-            return response.content
+            return await self.complete_chat(prompt)
         except Exception as e:
             print(f"❌ Gemini Generation Error: {e}")
             return "MAYA is currently unavailable. Please try again later."
 
+    async def complete_chat(self, prompt: str, system_prompt: str = None) -> str:
+        """
+        Raw chat completion for the LLM provider pool (raises on failure instead of
+        returning the fallback string).
+        """
+        messages = [("system", system_prompt), ("human", prompt)] if system_prompt else prompt
+        llm = await client_ready(self, "llm")
+        response = await self.governor.run(lambda: observe_call("gemini", "chat", llm.ainvoke(messages)))
+        usage = getattr(response, "usage_metadata", None) or {}
+        record_tokens("gemini", usage.get("input_tokens"), usage.get("output_tokens"))
+        return response.content
+
     async def get_embeddings(self, text: str):
-        """Generates 768-dim vector for semantic search"""
+        """Generates 768-dim vector for semantic search (cached, micro-batched)"""
+        key = payload_key(self.embedding_model_name, text)
+        cached = await self.embedding_cache.get(key)
+        if cached is not None:
+            return cached
         try:
-            # LangChain uses aembed_query for a single string
-            embedding = await self.embeddings_model.aembed_query(text)
-            return embedding
+            # Request timeline: batch window + shared batch call ka wait (batch khud detached chalta hai)
+            with trace_span("embedding"):
+                embedding = await self.inflight.do(key, lambda: self.embedding_batcher.submit(text))
         except Exception as e:
             print(f"❌ Gemini Embedding Error (429/Other): {e}")
             return None
+        self.embedding_cache.set(key, embedding)
+        return embedding
+
+    async def get_embeddings_batch(self, texts: list):
+        """Generates 768-dim vectors for many texts; cached ones skip the network"""
+        if not texts:
+            return []
+        keys = [payload_key(self.embedding_model_name, t) for t in texts]
+        results = await self.embedding_cache.get_many(keys)
+
+        # Missing texts (deduplicated) ek hi batch request me
+        missing = {}
+        for key, text, vector in zip(keys, texts, results):
+            if vector is None:
+                missing.setdefault(key, text)
+        if missing:
+            try:
+                vectors = await self._embed_documents(list(missing.values()))
+            except Exception as e:
+                print(f"❌ Gemini Batch Embedding Error (429/Other): {e}")
+                return None
+            fresh = dict(zip(missing.keys(), vectors))
+            for key, vector in fresh.items():
+                self.embedding_cache.set(key, vector)
+            results = [vector if vector is not None else fresh[key] for key, vector in zip(keys, results)]
+        return results
+
+    async def _embed_documents(self, texts: list):
+        embeddings_model = await client_ready(self, "embeddings_model")
+        return await self.governor.run(lambda: observe_call("gemini", "embed", embeddings_model.aembed_documents(texts)))
 
 # Instance for easy import
 gemini_service = GeminiService()
\ No newline at end of file
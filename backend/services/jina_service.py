@@ -1,27 +1,124 @@
+import asyncio
 import os
+from typing import List, Optional
+
 import httpx
+from dotenv import load_dotenv
+from services.metrics import observe_call
+
+load_dotenv()
+
 
 class JinaService:
+    """
+    Jina embeddings over one long-lived pooled httpx client (keep-alive, optional HTTP/2).
+    Har call pe naya TCP+TLS handshake nahi hota; embed_many ek request me kai texts bhejta hai.
+    """
+
     def __init__(self):
         self.api_key = os.getenv("JINA_API_KEY")
         self.url = "https://api.jina.ai/v1/embeddings"
+        self.model = os.getenv("JINA_MODEL", "jina-embeddings-v2-base-en")
+        self.batch_size = int(os.getenv("JINA_BATCH_SIZE", "128"))  # Jina max 2048 inputs/request
+        self.max_concurrency = int(os.getenv("JINA_MAX_CONCURRENCY", "4"))
+        self.http2 = os.getenv("JINA_HTTP2", "false").lower() == "true"
+        self.timeout = httpx.Timeout(
+            float(os.getenv("JINA_TIMEOUT", "30")),
+            connect=float(os.getenv("JINA_CONNECT_TIMEOUT", "5")),
+        )
+        self.limits = httpx.Limits(
+            max_connections=int(os.getenv("JINA_MAX_CONNECTIONS", "10")),
+            max_keepalive_connections=int(os.getenv("JINA_MAX_KEEPALIVE", "10")),
+            keepalive_expiry=float(os.getenv("JINA_KEEPALIVE_EXPIRY", "60")),
+        )
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        # Lazily banta hai taaki running event loop pe bind ho
+        if self._client is None or self._client.is_closed:
+            http2 = self.http2
+            if http2:
+                try:
+                    import h2  # noqa: F401
+                except ImportError:
+                    print("⚠️ JINA_HTTP2=true but 'h2' is not installed (pip install httpx[http2]). Using HTTP/1.1.")
+                    http2 = False
+            self._client = httpx.AsyncClient(
+                http2=http2,
+                timeout=self.timeout,
+                limits=self.limits,
+                headers={
+                    "Content-Type": "application/json",
+                    "Authorization": f"Bearer {self.api_key}",
+                },
+            )
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+
+    def _payload(self, texts: List[str], task: Optional[str]) -> dict:
+        data = {"model": self.model, "input": texts}
+        # task (retrieval.query / retrieval.passage / ...) sirf v3+ models samajhte hain
+        if task and "-v2-" not in self.model:
+            data["task"] = task
+        return data
+
+    async def _post(self, texts: List[str], task: Optional[str]) -> Optional[List[List[float]]]:
+        try:
+            response = await observe_call("jina", "embed", self._get_client().post(self.url, json=self._payload(texts, task)))
+        except httpx.HTTPError as e:
+            print(f"❌ Jina API Error: {e!r}")
+            return None
+        if response.status_code != 200:
+            print(f"❌ Jina API Error: {response.status_code} - {response.text}")
+            return None
+        data = sorted(response.json()["data"], key=lambda item: item.get("index", 0))
+        return [item["embedding"] for item in data]
+
+    async def embed_text(self, text: str, task: Optional[str] = None):
+        """
+        Embeds a single text.
+
+        Args:
+            text (str): Text to embed.
+            task (str): Jina task type, e.g. "retrieval.query" or "retrieval.passage" (v3 models).
+
+        Returns:
+            list: Embedding vector, or None on failure.
+        """
+        result = await self._post([text], task)
+        return result[0] if result else None
+
+    async def embed_many(self, texts: List[str], task: Optional[str] = None,
+                         batch_size: Optional[int] = None) -> List[Optional[List[float]]]:
+        """
+        Embeds many texts, packing up to batch_size inputs per request (batches run concurrently).
+
+        Args:
+            texts (list): Texts to embed.
+            task (str): Jina task type (see embed_text).
+            batch_size (int): Inputs per request; defaults to JINA_BATCH_SIZE.
+
+        Returns:
+            list: One embedding per input text (None for texts whose batch failed).
+        """
+        size = batch_size or self.batch_size
+        batches = [texts[i:i + size] for i in range(0, len(texts), size)]
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def run(batch):
+            async with semaphore:
+                return await self._post(batch, task)
+
+        results = await asyncio.gather(*(run(batch) for batch in batches))
+        embeddings: List[Optional[List[float]]] = []
+        for batch, result in zip(batches, results):
+            embeddings.extend(result if result and len(result) == len(batch) else [None] * len(batch))
+        return embeddings
 
-    async def embed_text(self, text: str):
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {self.api_key}"
-        }
-        data = {
-            "model": "jina-embeddings-v2-base-en", # Default 1024 dimensions
-            "input": [text]
-        }
-        async with httpx.AsyncClient() as client:
-            response = await client.post(self.url, headers=headers, json=data)
-            if response.status_code == 200:
-                return response.json()['data'][0]['embedding']
-            else:
-                print(f"❌ Jina API Error: {response.status_code} - {response.text}")
-                return None
 
 # --- YE LINE ADD KARNA SABSE ZAROORI HAI ---
-jina_service = JinaService()
\ No newline at end of file
+jina_service = JinaService()
@@ -0,0 +1,211 @@
+import asyncio
+import bisect
+import os
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence
+
+# Latency buckets (seconds) for the per-provider histograms
+LATENCY_BUCKETS = [0.25, 0.5, 1, 1.5, 2, 3, 4, 6, 8, 12, 16, 24, 32, 48, 64]
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram; quantiles are bucket upper bounds (cheap, good enough for hedging)."""
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = list(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last = overflow
+        self.total = 0
+        self.sum = 0.0
+
+    def record(self, seconds: float):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.total += 1
+        self.sum += seconds
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self.total:
+            return None
+        target = q * self.total
+        running = 0
+        for i, count in enumerate(self.counts):
+            running += count
+            if running >= target:
+                return self.buckets[i] if i < len(self.buckets) else self.buckets[-1] * 2
+        return self.buckets[-1] * 2
+
+    def stats(self) -> dict:
+        return {
+            "count": self.total,
+            "avg_ms": round(self.sum / self.total * 1000, 2) if self.total else 0.0,
+            "p50_ms": _ms(self.quantile(0.5)),
+            "p95_ms": _ms(self.quantile(0.95)),
+            "p99_ms": _ms(self.quantile(0.99)),
+        }
+
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    return round(seconds * 1000, 2) if seconds is not None else None
+
+
+class LLMProvider:
+    """One completion backend: raw `complete(prompt) -> str` (must raise on failure) + its latency stats."""
+
+    def __init__(self, name: str, complete: Callable[[str], Awaitable[str]], timeout: float):
+        self.name = name
+        self.complete = complete
+        self.timeout = timeout
+        self.latency = LatencyHistogram()
+        self.successes = 0
+        self.failures = 0
+        self.timeouts = 0
+
+    async def call(self, prompt: str) -> str:
+        started = time.perf_counter()
+        try:
+            response = await asyncio.wait_for(self.complete(prompt), timeout=self.timeout)
+            if not response:
+                raise ValueError(f"{self.name} returned an empty response")
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise
+        except asyncio.CancelledError:
+            # Hedge ka loser cancel hua - failure nahi gina jaata
+            raise
+        except Exception:
+            self.failures += 1
+            raise
+        self.successes += 1
+        self.latency.record(time.perf_counter() - started)
+        return response
+
+    def stats(self) -> dict:
+        return {
+            "successes": self.successes,
+            "failures": self.failures,
+            "timeouts": self.timeouts,
+            "latency": self.latency.stats(),
+        }
+
+
+class ProviderPool:
+    """
+    Ordered LLM providers with failover + optional hedging.
+    Failover: error/timeout pe list ka agla provider try hota hai.
+    Hedging: primary p95 (histogram se) tak jawab na de to agle provider ko duplicate request jaati hai,
+    jo pehle answer kare wahi jeet-ta hai aur doosra cancel ho jaata hai.
+    """
+
+    def __init__(self, providers: List[LLMProvider], hedging: bool = False, hedge_quantile: float = 0.95,
+                 hedge_default_delay: float = 4.0, hedge_min_delay: float = 0.5, hedge_min_samples: int = 20):
+        self.providers = providers
+        self.hedging = hedging
+        self.hedge_quantile = hedge_quantile
+        self.hedge_default_delay = hedge_default_delay
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_min_samples = hedge_min_samples
+        self.failovers = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def hedge_delay(self, provider: LLMProvider) -> float:
+        """Delay before the duplicate request: provider ka p95, warm-up tak default."""
+        if provider.latency.total < self.hedge_min_samples:
+            return self.hedge_default_delay
+        return max(self.hedge_min_delay, provider.latency.quantile(self.hedge_quantile))
+
+    async def complete(self, prompt: str, skip: Sequence[str] = ()) -> str:
+        """
+        Runs the prompt through the pool.
+
+        Args:
+            prompt (str): Full user prompt (system prompt is added by each provider).
+            skip (Sequence[str]): Provider names to leave out (e.g. one that already failed while streaming).
+
+        Returns:
+            str: First successful response.
+
+        Raises:
+            RuntimeError: If every provider failed.
+        """
+        candidates = [p for p in self.providers if p.name not in skip]
+        errors = []
+        i = 0
+        while i < len(candidates):
+            primary = candidates[i]
+            backup = candidates[i + 1] if self.hedging and i + 1 < len(candidates) else None
+            try:
+                if backup is None:
+                    return await primary.call(prompt)
+                return await self._hedged(prompt, primary, backup)
+            except Exception as e:
+                label = primary.name if backup is None else f"{primary.name}+{backup.name}"
+                errors.append(f"{label}: {e!r}")
+                print(f"⚠️ LLM provider {label} failed ({e!r}), failing over...")
+            self.failovers += 1
+            # Hedged pair dono fail hue to dono skip
+            i += 2 if backup is not None else 1
+
+        raise RuntimeError("All LLM providers failed: " + "; ".join(errors))
+
+    async def _hedged(self, prompt: str, primary: LLMProvider, backup: LLMProvider) -> str:
+        first = asyncio.create_task(primary.call(prompt))
+        try:
+            done, _ = await asyncio.wait({first}, timeout=self.hedge_delay(primary))
+            if done:
+                if not first.exception():
+                    return first.result()
+                # Primary jaldi fail hua - hedge ki jagah seedha backup
+                try:
+                    return await backup.call(prompt)
+                except Exception as e:
+                    raise RuntimeError(f"{primary.name}: {first.exception()!r}; {backup.name}: {e!r}") from e
+
+            self.hedges += 1
+            second = asyncio.create_task(backup.call(prompt))
+            pending = {first, second}
+            errors = []
+            try:
+                while pending:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        if task.exception() is None:
+                            if task is second:
+                                self.hedge_wins += 1
+                            return task.result()
+                        errors.append(repr(task.exception()))
+                raise RuntimeError("; ".join(errors))
+            finally:
+                for task in pending:
+                    task.cancel()
+        finally:
+            if not first.done():
+                first.cancel()
+
+    def stats(self) -> dict:
+        return {
+            "order": [p.name for p in self.providers],
+            "hedging": self.hedging,
+            "hedge_delays_ms": {p.name: _ms(self.hedge_delay(p)) for p in self.providers},
+            "failovers": self.failovers,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "providers": {p.name: p.stats() for p in self.providers},
+        }
+
+
+def pool_from_env(backends: Dict[str, Callable[[str], Awaitable[str]]]) -> ProviderPool:
+    """
+    Builds the pool from LLM_PROVIDERS (comma-separated order, e.g. "openrouter,gemini").
+    Unknown names ignore ho jaate hain; list khaali ho to saare backends given order me.
+    """
+    order = [name.strip() for name in os.getenv("LLM_PROVIDERS", ",".join(backends)).split(",")]
+    timeout = float(os.getenv("LLM_PROVIDER_TIMEOUT", "30"))
+    providers = [LLMProvider(name, backends[name], timeout) for name in order if name in backends]
+    if not providers:
+        providers = [LLMProvider(name, fn, timeout) for name, fn in backends.items()]
+    return ProviderPool(
+        providers,
+        hedging=os.getenv("LLM_HEDGING", "false").lower() == "true",
+        hedge_quantile=float(os.getenv("LLM_HEDGE_QUANTILE", "0.95")),
+        hedge_default_delay=float(os.getenv("LLM_HEDGE_DEFAULT_DELAY", "4")),
+    )
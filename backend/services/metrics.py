@@ -0,0 +1,251 @@
+import bisect
+import functools
+import os
+import time
+from typing import Awaitable, Callable, Dict, List, Sequence, Tuple
+
+from services.request_trace import REQUEST_TRACE_ENABLED, record_span
+
+# Prometheus text exposition (format 0.0.4) bina extra dependency ke: counters, gauges, histograms
+# process memory me, /metrics scrape pe render. Multi-worker deploy me har worker alag scrape target hai.
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
+# Seconds; graph nodes ms se lekar LLM ke kai seconds tak
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40, 80)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], object] = {}
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                for key, value in self._values.items()]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = list(buckets)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        series = self._values.get(key)
+        if series is None:
+            # [per-bucket counts (+ overflow), sum, count]
+            series = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = []
+        for key, (counts, total, count) in self._values.items():
+            running = 0
+            for bound, bucket_count in zip(self.buckets + [float("inf")], counts):
+                running += bucket_count
+                le = f'le="{_format_value(float(bound))}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {running}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Metrics + scrape-time collectors (existing service counters ko bina duplicate kiye expose karte hain)."""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Callable[[], List[_Metric]]] = []
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def _register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def collector(self, fn: Callable[[], List[_Metric]]):
+        """fn() -> freshly filled metrics, called on every scrape."""
+        self._collectors.append(fn)
+        return fn
+
+    def render(self) -> str:
+        lines = []
+        metrics = list(self._metrics)
+        for collect in self._collectors:
+            try:
+                metrics.extend(collect())
+            except Exception as e:
+                print(f"⚠️ Metrics collector failed: {e}")
+        for metric in metrics:
+            lines.extend(metric.header())
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+NODE_LATENCY = metrics.histogram("maya_graph_node_duration_seconds", "LangGraph node latency.", ["node"])
+NODE_INFLIGHT = metrics.gauge("maya_graph_node_inflight", "LangGraph node executions in progress.", ["node"])
+NODE_ERRORS = metrics.counter("maya_graph_node_errors_total", "LangGraph node executions that raised.", ["node"])
+
+CALL_LATENCY = metrics.histogram("maya_external_call_duration_seconds",
+                                 "Latency of one external service call attempt.", ["service", "operation"])
+CALL_INFLIGHT = metrics.gauge("maya_external_call_inflight", "External service calls in progress.", ["service"])
+CALL_ERRORS = metrics.counter("maya_external_call_errors_total", "External service calls that raised.",
+                              ["service", "operation"])
+
+LLM_TOKENS = metrics.counter("maya_llm_tokens_total", "LLM tokens reported by the provider.", ["provider", "kind"])
+
+DB_LATENCY = metrics.histogram("maya_db_query_duration_seconds", "SQL statement execution time.", ["engine"])
+DB_ERRORS = metrics.counter("maya_db_errors_total", "SQL statements that raised.", ["engine"])
+
+
+def instrument_node(name: str, fn: Callable[..., Awaitable]) -> Callable[..., Awaitable]:
+    """
+    Wraps an async graph node with latency/in-flight/error metrics + a request trace span.
+    functools.wraps signature preserve karta hai, isliye LangGraph config/writer injection pehle jaisa chalta hai.
+    """
+    if not METRICS_ENABLED and not REQUEST_TRACE_ENABLED:
+        return fn
+
+    @functools.wraps(fn)
+    async def wrapped(*args, **kwargs):
+        NODE_INFLIGHT.inc(node=name)
+        started = time.perf_counter()
+        try:
+            return await fn(*args, **kwargs)
+        except BaseException:
+            NODE_ERRORS.inc(node=name)
+            raise
+        finally:
+            ended = time.perf_counter()
+            NODE_LATENCY.observe(ended - started, node=name)
+            NODE_INFLIGHT.dec(node=name)
+            record_span(f"node.{name}", started, ended)
+
+    return wrapped
+
+
+async def observe_call(service: str, operation: str, awaitable: Awaitable):
+    """Awaits one external call (a single attempt; governor retries are timed separately)."""
+    if not METRICS_ENABLED and not REQUEST_TRACE_ENABLED:
+        return await awaitable
+    CALL_INFLIGHT.inc(service=service)
+    started = time.perf_counter()
+    try:
+        return await awaitable
+    except BaseException:
+        CALL_ERRORS.inc(service=service, operation=operation)
+        raise
+    finally:
+        ended = time.perf_counter()
+        CALL_LATENCY.observe(ended - started, service=service, operation=operation)
+        CALL_INFLIGHT.dec(service=service)
+        record_span(f"{service}.{operation}", started, ended)
+
+
+def record_tokens(provider: str, prompt_tokens, completion_tokens):
+    if prompt_tokens:
+        LLM_TOKENS.inc(prompt_tokens, provider=provider, kind="prompt")
+    if completion_tokens:
+        LLM_TOKENS.inc(completion_tokens, provider=provider, kind="completion")
+
+
+def instrument_engine(engine, label: str):
+    """SQL timing via SQLAlchemy cursor events (every query of the engine, incl. history writes)."""
+    if not METRICS_ENABLED and not REQUEST_TRACE_ENABLED:
+        return
+    from sqlalchemy import event
+
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_started", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["metrics_started"].pop()
+        ended = time.perf_counter()
+        DB_LATENCY.observe(ended - started, engine=label)
+        record_span("db", started, ended)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _error(context):
+        DB_ERRORS.inc(engine=label)
+        pending = context.connection.info.get("metrics_started") if context.connection is not None else None
+        if pending:
+            pending.pop()
+
+
+def cache_metrics(caches: Dict[str, Callable[[], Tuple[int, int]]]) -> List[_Metric]:
+    """caches: name -> () -> (hits, misses). Returns hit/miss counters + hit ratio gauges."""
+    hits = Counter("maya_cache_hits_total", "Cache hits.", ["cache"])
+    misses = Counter("maya_cache_misses_total", "Cache misses.", ["cache"])
+    ratio = Gauge("maya_cache_hit_ratio", "Cache hit ratio since start.", ["cache"])
+    for name, read in caches.items():
+        hit_count, miss_count = read()
+        hits.inc(hit_count, cache=name)
+        misses.inc(miss_count, cache=name)
+        lookups = hit_count + miss_count
+        ratio.set(hit_count / lookups if lookups else 0.0, cache=name)
+    return [hits, misses, ratio]
@@ -0,0 +1,70 @@
+import asyncio
+from typing import Any, Awaitable, Callable, List, Optional, Tuple
+
+from services.request_trace import detach_trace
+
+
+class MicroBatcher:
+    """
+    Collects concurrent single-item calls for a short window and sends them as one batch call.
+    E.g. 20 parallel get_embeddings() -> ek aembed_documents() request.
+    """
+
+    def __init__(self, name: str, batch_fn: Callable[[List[Any]], Awaitable[List[Any]]],
+                 window_seconds: float = 0.01, max_batch: int = 100):
+        self.name = name
+        self.batch_fn = batch_fn
+        self.window_seconds = window_seconds
+        self.max_batch = max_batch
+        self._pending: List[Tuple[Any, asyncio.Future]] = []
+        self._flusher: Optional[asyncio.Task] = None
+        self.batches = 0
+        self.items = 0
+
+    async def submit(self, item: Any) -> Any:
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush_now()
+        elif self._flusher is None:
+            self._flusher = asyncio.create_task(self._flush_later())
+        return await future
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.window_seconds)
+        self._flusher = None
+        self._flush_now()
+
+    def _flush_now(self):
+        if self._flusher is not None:
+            self._flusher.cancel()
+            self._flusher = None
+        batch, self._pending = self._pending, []
+        if batch:
+            asyncio.create_task(self._run(batch))
+
+    async def _run(self, batch: List[Tuple[Any, asyncio.Future]]):
+        # Batch kai requests ka hai; callers apna wait time khud span karte hain
+        detach_trace()
+        self.batches += 1
+        self.items += len(batch)
+        try:
+            results = await self.batch_fn([item for item, _ in batch])
+            if len(results) != len(batch):
+                raise ValueError(f"{self.name}: batch returned {len(results)} results for {len(batch)} items")
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "pending": len(self._pending),
+        }
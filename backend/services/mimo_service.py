@@ -1,9 +1,20 @@
 import os
-from openai import AsyncOpenAI
+import time
 from dotenv import load_dotenv
+from services.gemini_service import gemini_service
+from services.semantic_cache import semantic_cache
+from services.singleflight import SingleFlight, payload_key
+from services.rate_governor import get_governor
+from services.llm_pool import pool_from_env
+from services.startup_profile import lazy_client, client_ready
+from services.metrics import observe_call, record_tokens
 
 load_dotenv()
 
+ERROR_RESPONSE = "I apologize, but I encountered an error while processing your request."
+
+SYSTEM_PROMPT = "You are MAYA, a helpful AI assistant for MSMEs in India. Provide direct, professional, and actionable advice. Do not include unnecessary greetings or self-introductions unless specifically asked who you are."
+
 class MimoService:
     _instance = None
 
@@ -14,42 +25,163 @@ class MimoService:
         return cls._instance
 
     def _initialize(self):
-        api_key = os.getenv("OPENROUTER_API_KEY")
-        if not api_key:
+        self.api_key = os.getenv("OPENROUTER_API_KEY")
+        if not self.api_key:
             print("Warning: OPENROUTER_API_KEY not found in environment variables.")
-        
-        # OpenRouter requires these extra headers to avoid 401 errors
-        self.client = AsyncOpenAI(
-            api_key=api_key,
+
+        self.model = "xiaomi/mimo-v2-flash:free"
+        # Same prompt ke concurrent calls ek hi OpenRouter request share karte hain
+        self.inflight = SingleFlight("mimo")
+        # Shared OpenRouter governor: rate limit + adaptive concurrency, 429 pe queue + retry
+        self.governor = get_governor("openrouter")
+        # Provider pool: OpenRouter fail/timeout ho to Gemini (failover, optional hedging via LLM_HEDGING)
+        self.pool = pool_from_env({
+            "openrouter": self._complete,
+            "gemini": lambda prompt: gemini_service.complete_chat(prompt, SYSTEM_PROMPT),
+        })
+
+    @lazy_client
+    def client(self):
+        """OpenRouter client (openai SDK import pehli call pe, boot me nahi)."""
+        from openai import AsyncOpenAI
+        # OpenRouter requires these extra headers to avoid 401 errors.
+        # max_retries=0: SDK 429 khud absorb na kare, retry/back-off sirf governor (AIMD) karta hai
+        return AsyncOpenAI(
+            api_key=self.api_key,
             base_url="https://openrouter.ai/api/v1",
+            max_retries=0,
             default_headers={
                 "HTTP-Referer": "http://localhost:3000", # Aapka site URL
                 "X-Title": "MAYA-AI-Local"               # Aapke app ka naam
             }
         )
-        self.model = "xiaomi/mimo-v2-flash:free"
 
-    async def generate_text(self, prompt: str) -> str:
+    async def generate_text(self, prompt: str, cache_scope: str = None, cache_query: str = None,
+                            cache_embedding=None, bypass_cache: bool = False) -> str:
         """
-        Generates text using the Xiaomi Mimo V2 Flash model via OpenRouter.
+        Generates text using the Xiaomi Mimo V2 Flash model via OpenRouter,
+        failing over (or hedging) to the other providers in the pool.
         
         Args:
             prompt (str): The input prompt for the model.
+            cache_scope (str): Agent name for the semantic cache; None disables caching.
+            cache_query (str): User query the cache is keyed on (embedded if cache_embedding is missing).
+            cache_embedding (list): Precomputed embedding of cache_query (e.g. from the router).
+            bypass_cache (bool): Skip the cache lookup for this request (fresh answer is still stored).
             
         Returns:
             str: The generated text response.
         """
+        embedding = await self._cache_embedding(cache_scope, cache_query, cache_embedding)
+        if embedding is not None:
+            if bypass_cache:
+                semantic_cache.record_bypass()
+            else:
+                cached = semantic_cache.lookup(cache_scope, embedding)
+                if cached is not None:
+                    return cached
+
+        started = time.perf_counter()
         try:
-            completion = await self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are MAYA, a helpful AI assistant for MSMEs in India. Provide direct, professional, and actionable advice. Do not include unnecessary greetings or self-introductions unless specifically asked who you are."},
-                    {"role": "user", "content": prompt}
-                ]
+            response = await self.inflight.do(
+                payload_key(self.model, SYSTEM_PROMPT, prompt),
+                lambda: self.pool.complete(prompt)
             )
-            return completion.choices[0].message.content
         except Exception as e:
             print(f"Error generating text with MimoService: {e}")
-            return "I apologize, but I encountered an error while processing your request."
+            return ERROR_RESPONSE
+
+        if embedding is not None and response:
+            semantic_cache.store(cache_scope, embedding, response, time.perf_counter() - started)
+        return response
+
+    async def stream_text(self, prompt: str, cache_scope: str = None, cache_query: str = None,
+                          cache_embedding=None, bypass_cache: bool = False):
+        """
+        Streaming variant of generate_text: yields the response token by token.
+        Semantic cache hit pe poora cached answer ek hi chunk me aata hai.
+        
+        Args:
+            prompt (str): The input prompt for the model.
+            cache_scope, cache_query, cache_embedding, bypass_cache: same as generate_text.
+            
+        Yields:
+            str: Text deltas as they arrive from OpenRouter.
+        """
+        embedding = await self._cache_embedding(cache_scope, cache_query, cache_embedding)
+        if embedding is not None:
+            if bypass_cache:
+                semantic_cache.record_bypass()
+            else:
+                cached = semantic_cache.lookup(cache_scope, embedding)
+                if cached is not None:
+                    yield cached
+                    return
+
+        started = time.perf_counter()
+        chunks = []
+        emitted = False
+        try:
+            client = await client_ready(self, "client")
+            # Latency = stream open hone tak (time to first byte); tokens aakhri chunk ke usage se.
+            # Governor slot stream khatam/close hone tak held rehta hai (lambe streams bhi max_in_flight me)
+            async with self.governor.hold(lambda: observe_call("openrouter", "chat_stream", client.chat.completions.create(
+                model=self.model,
+                messages=self._build_messages(prompt),
+                stream=True
+            ))) as stream, stream:
+                async for chunk in stream:
+                    usage = getattr(chunk, "usage", None)
+                    if usage:
+                        record_tokens("openrouter", usage.prompt_tokens, usage.completion_tokens)
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta.content
+                    if delta:
+                        emitted = True
+                        chunks.append(delta)
+                        yield delta
+        except Exception as e:
+            print(f"Error streaming text with MimoService: {e}")
+            # Partial answer already sent ho chuka ho to apology append nahi karte
+            if emitted:
+                return
+            # Pehle token se pehle fail hua to baaki providers se poora answer ek chunk me
+            try:
+                response = await self.pool.complete(prompt, skip=("openrouter",))
+            except Exception as fallback_error:
+                print(f"Error generating text with MimoService: {fallback_error}")
+                yield ERROR_RESPONSE
+                return
+            chunks.append(response)
+            yield response
+
+        if embedding is not None and chunks:
+            semantic_cache.store(cache_scope, embedding, "".join(chunks), time.perf_counter() - started)
+
+    async def _cache_embedding(self, cache_scope, cache_query, cache_embedding):
+        if not cache_scope or not semantic_cache.enabled:
+            return None
+        if cache_embedding is not None:
+            return cache_embedding
+        if not cache_query:
+            return None
+        return await gemini_service.get_embeddings(cache_query)
+
+    async def _complete(self, prompt: str) -> str:
+        client = await client_ready(self, "client")
+        completion = await self.governor.run(lambda: observe_call("openrouter", "chat", client.chat.completions.create(
+            model=self.model,
+            messages=self._build_messages(prompt)
+        )))
+        if completion.usage:
+            record_tokens("openrouter", completion.usage.prompt_tokens, completion.usage.completion_tokens)
+        return completion.choices[0].message.content
+
+    def _build_messages(self, prompt: str) -> list:
+        return [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ]
 
 mimo_service = MimoService()
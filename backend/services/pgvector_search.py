@@ -0,0 +1,154 @@
+import os
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import JSON, text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+
+from services.scheme_cards import card_with_id
+
+# ANN index on schemes.embedding: hnsw | ivfflat | none
+PGVECTOR_INDEX_TYPE = os.getenv("PGVECTOR_INDEX_TYPE", "hnsw").lower()
+HNSW_M = int(os.getenv("HNSW_M", "16"))
+HNSW_EF_CONSTRUCTION = int(os.getenv("HNSW_EF_CONSTRUCTION", "64"))
+IVFFLAT_LISTS = int(os.getenv("IVFFLAT_LISTS", "100"))  # ~ rows/1000 (rows > 1M: sqrt(rows))
+
+# Query-time recall/speed knobs (per transaction, via set_config)
+HNSW_EF_SEARCH = int(os.getenv("HNSW_EF_SEARCH", "40"))
+IVFFLAT_PROBES = int(os.getenv("IVFFLAT_PROBES", "10"))
+
+# RRF constant: score = sum(1 / (k + rank)) over the vector and full-text rankings
+RRF_K = int(os.getenv("HYBRID_RRF_K", "60"))
+
+# Full-text document over name/description/tags. Index aur query me exactly same expression
+# hona chahiye, tabhi planner GIN index use karta hai.
+FTS_DOCUMENT = (
+    "to_tsvector('english'::regconfig, coalesce(name, '') || ' ' || coalesce(description, '') "
+    "|| ' ' || coalesce(tags::text, ''))"
+)
+
+_INDEX_NAMES = {"hnsw": "schemes_embedding_hnsw_idx", "ivfflat": "schemes_embedding_ivfflat_idx"}
+
+
+async def ensure_search_indexes(conn: AsyncConnection):
+    """
+    Creates the configured ANN index on schemes.embedding (dropping the other type) and the
+    GIN full-text index. Idempotent; startup aur seeding ke baad call hota hai.
+    IVFFlat lists data pe train hote hain, isliye use catalog load hone ke baad banana behtar hai.
+    """
+    for index_type, name in _INDEX_NAMES.items():
+        if index_type != PGVECTOR_INDEX_TYPE:
+            await conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+
+    if PGVECTOR_INDEX_TYPE == "hnsw":
+        await conn.execute(text(
+            f"CREATE INDEX IF NOT EXISTS {_INDEX_NAMES['hnsw']} ON schemes "
+            f"USING hnsw (embedding vector_cosine_ops) WITH (m = {HNSW_M}, ef_construction = {HNSW_EF_CONSTRUCTION})"
+        ))
+    elif PGVECTOR_INDEX_TYPE == "ivfflat":
+        await conn.execute(text(
+            f"CREATE INDEX IF NOT EXISTS {_INDEX_NAMES['ivfflat']} ON schemes "
+            f"USING ivfflat (embedding vector_cosine_ops) WITH (lists = {IVFFLAT_LISTS})"
+        ))
+
+    await conn.execute(text(
+        f"CREATE INDEX IF NOT EXISTS schemes_fts_idx ON schemes USING gin ({FTS_DOCUMENT})"
+    ))
+
+
+async def tune_ann_search(db: AsyncSession, ef_search: Optional[int] = None, probes: Optional[int] = None):
+    """
+    Sets ef_search / probes for the current transaction only (set_config(..., true) = SET LOCAL).
+    None = env default (HNSW_EF_SEARCH / IVFFLAT_PROBES); caller per query recall vs latency choose kar sakta hai.
+    """
+    if PGVECTOR_INDEX_TYPE == "hnsw":
+        await db.execute(text("SELECT set_config('hnsw.ef_search', :value, true)"),
+                         {"value": str(ef_search or HNSW_EF_SEARCH)})
+    elif PGVECTOR_INDEX_TYPE == "ivfflat":
+        await db.execute(text("SELECT set_config('ivfflat.probes', :value, true)"),
+                         {"value": str(probes or IVFFLAT_PROBES)})
+
+
+def _vector_literal(embedding) -> str:
+    return "[" + ",".join(repr(float(x)) for x in embedding) + "]"
+
+
+async def hybrid_search(db: AsyncSession, query: str, query_embedding, k: int,
+                        eligible_ids: Optional[List[int]] = None, model_id: Optional[str] = None,
+                        ef_search: Optional[int] = None, probes: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Vector (ANN) + full-text search fused with reciprocal rank fusion, in one SQL statement.
+
+    Args:
+        db (AsyncSession): Database session.
+        query (str): User query for websearch_to_tsquery.
+        query_embedding (list): Query vector.
+        k (int): Number of fused results (each side fetches k candidates).
+        eligible_ids (list): Restrict to these scheme ids (None = whole catalog).
+        model_id (str): Versioned embedding model in scheme_embeddings; None = schemes.embedding.
+        ef_search (int): HNSW ef_search for this query (None = env default).
+        probes (int): IVFFlat probes for this query (None = env default).
+
+    Returns:
+        list: Card dicts best first, with vector_score (cosine similarity) and rrf_score.
+    """
+    id_filter = "AND id = ANY(:eligible_ids)" if eligible_ids is not None else ""
+    if model_id is None:
+        vector_source = "schemes"
+        vector_join = ""
+        vector_column = "s.embedding"
+    else:
+        # Versioned model: vectors scheme_embeddings se (exact scan, ANN index sirf schemes.embedding pe hai)
+        vector_source = "(SELECT scheme_id AS id, embedding FROM scheme_embeddings WHERE model_id = :model_id) versioned"
+        vector_join = "LEFT JOIN scheme_embeddings e ON e.scheme_id = s.id AND e.model_id = :model_id"
+        vector_column = "e.embedding"
+    sql = text(f"""
+        WITH vec AS (
+            SELECT id, row_number() OVER (ORDER BY distance) AS rank
+            FROM (
+                SELECT id, embedding <=> CAST(:embedding AS vector) AS distance
+                FROM {vector_source}
+                WHERE embedding IS NOT NULL {id_filter}
+                ORDER BY distance
+                LIMIT :k
+            ) nearest
+        ),
+        fts AS (
+            SELECT id, row_number() OVER (ORDER BY score DESC) AS rank
+            FROM (
+                SELECT id, ts_rank_cd({FTS_DOCUMENT}, q) AS score
+                FROM schemes, websearch_to_tsquery('english'::regconfig, :query) q
+                WHERE {FTS_DOCUMENT} @@ q {id_filter}
+                ORDER BY score DESC
+                LIMIT :k
+            ) matched
+        ),
+        fused AS (
+            SELECT coalesce(vec.id, fts.id) AS id,
+                   coalesce(1.0 / (:rrf_k + vec.rank), 0) + coalesce(1.0 / (:rrf_k + fts.rank), 0) AS rrf_score
+            FROM vec FULL OUTER JOIN fts ON vec.id = fts.id
+        )
+        SELECT s.id, s.card,
+               1 - ({vector_column} <=> CAST(:embedding AS vector)) AS vector_score,
+               fused.rrf_score
+        FROM fused JOIN schemes s ON s.id = fused.id
+        {vector_join}
+        WHERE s.card IS NOT NULL
+        ORDER BY fused.rrf_score DESC, vector_score DESC NULLS LAST
+        LIMIT :k
+    """).columns(card=JSON)
+    params = {"embedding": _vector_literal(query_embedding), "query": query, "k": k, "rrf_k": RRF_K}
+    if eligible_ids is not None:
+        params["eligible_ids"] = list(eligible_ids)
+    if model_id is not None:
+        params["model_id"] = model_id
+
+    await tune_ann_search(db, ef_search, probes)
+    rows = (await db.execute(sql, params)).mappings().all()
+    return [
+        card_with_id(
+            row["id"], row["card"],
+            vector_score=round(float(row["vector_score"]), 4) if row["vector_score"] is not None else None,
+            rrf_score=round(float(row["rrf_score"]), 6),
+        )
+        for row in rows
+    ]
@@ -0,0 +1,204 @@
+import asyncio
+import os
+import re
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+
+def rate_limit_info(exc: Exception) -> Tuple[bool, Optional[float]]:
+    """
+    Detects provider throttling (HTTP 429 / RESOURCE_EXHAUSTED) in an exception.
+
+    Returns:
+        tuple: (is_rate_limited, retry_after_seconds or None)
+    """
+    response = getattr(exc, "response", None)
+    status = getattr(exc, "status_code", None) or getattr(response, "status_code", None) or getattr(exc, "code", None)
+    text = str(exc)
+    limited = (
+        status == 429
+        or re.search(r"\b429\b", text) is not None
+        or "RESOURCE_EXHAUSTED" in text
+        or "rate limit" in text.lower()
+        or "quota" in text.lower()
+    )
+    if not limited:
+        return False, None
+
+    retry_after = None
+    headers = getattr(response, "headers", None)
+    if headers is not None:
+        value = headers.get("retry-after") or headers.get("Retry-After")
+        try:
+            retry_after = float(value) if value is not None else None
+        except (TypeError, ValueError):
+            retry_after = None
+    if retry_after is None:
+        # Gemini errors me "retry in 12.5s" / "retry_delay { seconds: 12 }" aata hai
+        match = re.search(r"retry(?:_delay)?\D{0,20}?(\d+(?:\.\d+)?)\s*s", text, re.IGNORECASE)
+        if match:
+            retry_after = float(match.group(1))
+    return True, retry_after
+
+
+class ProviderGovernor:
+    """
+    Client-side governor for one upstream provider: token bucket (requests/sec) + adaptive
+    max-in-flight limit. AIMD: success pe limit/rate dheere badhte hain, 429 pe aadhe ho jaate hain
+    aur Retry-After tak bucket pause rehta hai. Requests fail hone ki jagah queue me wait karti hain.
+    Provider SDK clients max_retries=0 pe bane hote hain: 429 seedha yahan aata hai, retry sirf governor karta hai.
+    """
+
+    def __init__(self, name: str, rate: float, burst: float, max_in_flight: int, max_retries: int = 5):
+        self.name = name
+        self.max_rate = rate
+        self.min_rate = max(rate / 20, 0.05)
+        self.rate = rate
+        self.burst = burst
+        self.max_in_flight = max_in_flight
+        self.limit = float(max_in_flight)
+        self.max_retries = max_retries
+
+        self.tokens = burst
+        self._last_refill = time.monotonic()
+        self.paused_until = 0.0
+        self.in_flight = 0
+        self.waiting = 0
+        self._cond = asyncio.Condition()
+
+        self.completed = 0
+        self.throttled = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    async def run(self, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Runs fn() under the governor, retrying throttled attempts after backing off."""
+        result = await self._run_holding(fn)
+        await self._release()
+        return result
+
+    @asynccontextmanager
+    async def hold(self, fn: Callable[[], Awaitable[Any]]):
+        """
+        run() for streaming responses: fn() opens the stream (retried like run()), and the
+        in-flight slot stays taken until the with-block exits (stream exhausted or closed).
+        """
+        result = await self._run_holding(fn)
+        try:
+            yield result
+        finally:
+            await self._release()
+
+    async def _run_holding(self, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Retry loop; on success the caller owns one in-flight slot and must _release() it."""
+        attempt = 0
+        while True:
+            await self._acquire()
+            try:
+                result = await fn()
+            except BaseException as e:
+                # Cancel (client disconnect) pe bhi slot wapas
+                await self._release()
+                if not isinstance(e, Exception):
+                    raise
+                limited, retry_after = rate_limit_info(e)
+                if not limited or attempt >= self.max_retries:
+                    raise
+                self._on_throttled(retry_after, attempt)
+                attempt += 1
+                continue
+            self._on_success()
+            return result
+
+    async def _acquire(self):
+        self.waiting += 1
+        started = time.monotonic()
+        try:
+            async with self._cond:
+                await self._cond.wait_for(lambda: self.in_flight < max(1, int(self.limit)))
+                self.in_flight += 1
+            try:
+                await self._take_token()
+            except BaseException:
+                await self._release()
+                raise
+        finally:
+            self.waiting -= 1
+        waited = time.monotonic() - started
+        self.total_wait += waited
+        self.max_wait = max(self.max_wait, waited)
+
+    async def _release(self):
+        async with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    async def _take_token(self):
+        while True:
+            now = time.monotonic()
+            if now < self.paused_until:
+                await asyncio.sleep(self.paused_until - now)
+                continue
+            self.tokens = min(self.burst, self.tokens + (now - self._last_refill) * self.rate)
+            self._last_refill = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def _on_success(self):
+        self.completed += 1
+        # Additive increase (~ +1 slot per `limit` successes)
+        self.limit = min(self.max_in_flight, self.limit + 1 / max(self.limit, 1))
+        self.rate = min(self.max_rate, self.rate + self.max_rate / 50)
+
+    def _on_throttled(self, retry_after: Optional[float], attempt: int):
+        self.throttled += 1
+        # Multiplicative decrease
+        self.limit = max(1.0, self.limit / 2)
+        self.rate = max(self.min_rate, self.rate / 2)
+        backoff = retry_after if retry_after is not None else min(60.0, 2.0 ** attempt)
+        self.paused_until = max(self.paused_until, time.monotonic() + backoff)
+        self.tokens = 0
+        print(f"⚠️ {self.name} throttled (429). Backing off {backoff:.1f}s, limit={self.limit:.1f}, rate={self.rate:.2f}/s")
+
+    def stats(self) -> dict:
+        acquired = self.completed + self.throttled
+        return {
+            "rate_per_sec": round(self.rate, 3),
+            "in_flight_limit": int(self.limit),
+            "in_flight": self.in_flight,
+            "queue_depth": self.waiting,
+            "paused_for_seconds": round(max(0.0, self.paused_until - time.monotonic()), 2),
+            "completed": self.completed,
+            "throttled": self.throttled,
+            "avg_wait_ms": round(self.total_wait / acquired * 1000, 2) if acquired else 0.0,
+            "max_wait_ms": round(self.max_wait * 1000, 2),
+        }
+
+
+def _governor_from_env(name: str, rate: float, burst: float, max_in_flight: int) -> ProviderGovernor:
+    prefix = f"GOVERNOR_{name.upper()}_"
+    return ProviderGovernor(
+        name,
+        rate=float(os.getenv(prefix + "RPS", rate)),
+        burst=float(os.getenv(prefix + "BURST", burst)),
+        max_in_flight=int(os.getenv(prefix + "MAX_IN_FLIGHT", max_in_flight)),
+        max_retries=int(os.getenv(prefix + "MAX_RETRIES", 5)),
+    )
+
+
+# Shared per-provider governors (saare services isi registry se lete hain)
+governors: Dict[str, ProviderGovernor] = {
+    "openrouter": _governor_from_env("openrouter", rate=5, burst=10, max_in_flight=8),
+    "gemini": _governor_from_env("gemini", rate=10, burst=20, max_in_flight=16),
+}
+
+
+def get_governor(name: str) -> ProviderGovernor:
+    return governors[name]
+
+
+def governor_stats() -> dict:
+    return {name: g.stats() for name, g in governors.items()}
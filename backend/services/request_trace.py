@@ -0,0 +1,177 @@
+import asyncio
+import os
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, List, Optional
+
+# Per-request span timeline (routing, embedding, DB, LLM calls, history save). Spans existing
+# instrumentation points (graph node wrapper, observe_call, DB cursor events) se aate hain.
+REQUEST_TRACE_ENABLED = os.getenv("REQUEST_TRACE_ENABLED", "true").lower() == "true"
+TRACE_MAX_SPANS = int(os.getenv("TRACE_MAX_SPANS", "200"))
+
+_current: ContextVar[Optional["RequestTrace"]] = ContextVar("request_trace", default=None)
+
+
+class RequestTrace:
+    """Spans of one request, relative to its start (ms). Nested spans overlap (node > LLM call)."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.started = time.perf_counter()
+        self.started_at = datetime.now(timezone.utc)
+        self.spans: List[Dict[str, Any]] = []
+        self.dropped = 0
+        self.total_ms: Optional[float] = None
+        self.meta: Dict[str, Any] = {}
+
+    @property
+    def finished(self) -> bool:
+        return self.total_ms is not None
+
+    def add(self, name: str, started: float, ended: float):
+        if self.finished:
+            return
+        if len(self.spans) >= TRACE_MAX_SPANS:
+            self.dropped += 1
+            return
+        self.spans.append({
+            "name": name,
+            "start_ms": round((started - self.started) * 1000, 2),
+            "duration_ms": round((ended - started) * 1000, 2),
+        })
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Total duration + count per span name (Server-Timing aur slow log ke liye)."""
+        totals: Dict[str, Dict[str, float]] = {}
+        for span in self.spans:
+            entry = totals.setdefault(span["name"], {"duration_ms": 0.0, "count": 0})
+            entry["duration_ms"] = round(entry["duration_ms"] + span["duration_ms"], 2)
+            entry["count"] += 1
+        return totals
+
+    def server_timing(self) -> str:
+        """Server-Timing header value: one metric per span name + total."""
+        parts = []
+        for name, entry in self.summary().items():
+            desc = f';desc="{entry["count"]} calls"' if entry["count"] > 1 else ""
+            parts.append(f"{name};dur={entry['duration_ms']}{desc}")
+        parts.append(f"total;dur={self.total_ms}")
+        return ", ".join(parts)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "started_at": self.started_at.isoformat(),
+            "total_ms": self.total_ms,
+            **self.meta,
+            "summary": self.summary(),
+            "spans": self.spans,
+            "dropped_spans": self.dropped,
+        }
+
+
+def start_trace(name: str) -> Optional[RequestTrace]:
+    """Starts a trace for the current request (context me set; graph node tasks ise inherit karte hain)."""
+    if not REQUEST_TRACE_ENABLED:
+        return None
+    trace = RequestTrace(name)
+    _current.set(trace)
+    return trace
+
+
+def detach_trace():
+    """
+    Background tasks (write-behind flusher, micro-batcher, enrichment) request ka context copy
+    karke bante hain; unka kaam us request ki timeline me na jaaye, isliye task ke start pe call karo.
+    """
+    _current.set(None)
+
+
+def record_span(name: str, started: float, ended: float):
+    trace = _current.get()
+    if trace is not None:
+        trace.add(name, started, ended)
+
+
+@contextmanager
+def trace_span(name: str):
+    """Times a block as one span of the current request (no-op outside a traced request)."""
+    if _current.get() is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_span(name, started, time.perf_counter())
+
+
+class SlowRequestLog:
+    """
+    Bounded ring buffer of requests slower than SLOW_REQUEST_MS (newest last). SLOW_REQUEST_PERSIST=true
+    pe slow_requests table me bhi likha jaata hai (background, request path block nahi hota).
+    """
+
+    def __init__(self):
+        self.threshold_ms = float(os.getenv("SLOW_REQUEST_MS", "3000"))
+        self.persist = os.getenv("SLOW_REQUEST_PERSIST", "false").lower() == "true"
+        self.entries: Deque[Dict[str, Any]] = deque(maxlen=int(os.getenv("SLOW_REQUEST_LOG_SIZE", "100")))
+        self.finished = 0
+        self.slow = 0
+
+    def finish(self, trace: Optional[RequestTrace], **meta) -> Optional[RequestTrace]:
+        """Closes the trace (idempotent) and logs it if it crossed the threshold."""
+        if trace is None or trace.finished:
+            return trace
+        trace.total_ms = round((time.perf_counter() - trace.started) * 1000, 2)
+        trace.meta.update({key: value for key, value in meta.items() if value is not None})
+        self.finished += 1
+        if trace.total_ms >= self.threshold_ms:
+            self.slow += 1
+            entry = trace.to_dict()
+            self.entries.append(entry)
+            print(f"🐢 Slow request {trace.name}: {trace.total_ms}ms")
+            if self.persist:
+                self._schedule_persist(entry)
+        return trace
+
+    def recent(self, limit: int = 20) -> List[Dict[str, Any]]:
+        return list(reversed(self.entries))[:limit]
+
+    def _schedule_persist(self, entry: Dict[str, Any]):
+        try:
+            asyncio.get_running_loop().create_task(self._persist(entry))
+        except RuntimeError:
+            pass
+
+    async def _persist(self, entry: Dict[str, Any]):
+        detach_trace()
+        # Lazy import: database -> services.metrics -> request_trace cycle se bachne ke liye
+        from database import AsyncSessionLocal
+        from models import SlowRequest
+        try:
+            async with AsyncSessionLocal() as db:
+                db.add(SlowRequest(
+                    name=entry["name"],
+                    session_id=entry.get("session_id"),
+                    total_ms=entry["total_ms"],
+                    timeline=entry,
+                ))
+                await db.commit()
+        except Exception as e:
+            print(f"⚠️ Could not persist slow request: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "threshold_ms": self.threshold_ms,
+            "finished": self.finished,
+            "slow": self.slow,
+            "buffered": len(self.entries),
+            "persist": self.persist,
+        }
+
+
+slow_request_log = SlowRequestLog()
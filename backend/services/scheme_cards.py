@@ -0,0 +1,59 @@
+import json
+from typing import Any, Dict
+
+from sqlalchemy import bindparam, select
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from models import Scheme
+
+# Scheme card = frontend (SchemeCard UI) payload. Ingest pe ek baar ban ke schemes.card me store hota hai;
+# retrieval sirf (id, card, distance) select karta hai, request path pe koi per-field parsing nahi.
+CARD_FIELDS = [
+    "name", "description", "category", "benefits", "eligibility_criteria",
+    "required_documents", "application_mode", "link", "tags",
+]
+
+
+def _parse(value: Any) -> Any:
+    # Purane rows me JSON kabhi string ke roop me store hua tha
+    if value is None or isinstance(value, (dict, list)):
+        return value
+    try:
+        return json.loads(value)
+    except (TypeError, ValueError):
+        return value
+
+
+def scheme_card(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Normalized card payload (without id) from a scheme record or row mapping."""
+    return {
+        "name": data.get("name"),
+        "category": data.get("category") or "Business",
+        "description": data.get("description"),
+        "benefits": _parse(data.get("benefits")) or [],
+        "eligibility_criteria": _parse(data.get("eligibility_criteria")),
+        "required_documents": _parse(data.get("required_documents")) or [],
+        "application_mode": str(data.get("application_mode") or "Online/Offline"),
+        "link": data.get("link"),
+        "tags": _parse(data.get("tags")) or [],
+    }
+
+
+def card_with_id(scheme_id: int, card: Dict[str, Any], **scores) -> Dict[str, Any]:
+    """Stored card + id (string, jaisa frontend expect karta hai) + search scores; always a fresh dict."""
+    return {"id": str(scheme_id), **card, **scores}
+
+
+async def backfill_cards(conn: AsyncConnection) -> int:
+    """Fills schemes.card for rows written before the column existed (one-time, idempotent)."""
+    columns = [getattr(Scheme, field) for field in CARD_FIELDS]
+    rows = (await conn.execute(select(Scheme.id, *columns).where(Scheme.card.is_(None)))).mappings().all()
+    if not rows:
+        return 0
+    table = Scheme.__table__
+    await conn.execute(
+        table.update().where(table.c.id == bindparam("scheme_id")).values(card=bindparam("card_payload")),
+        [{"scheme_id": row["id"], "card_payload": scheme_card(row)} for row in rows],
+    )
+    print(f"✅ Precomputed cards for {len(rows)} schemes.")
+    return len(rows)
@@ -0,0 +1,195 @@
+import asyncio
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from services.mimo_service import mimo_service, ERROR_RESPONSE
+from services.chat_history_service import chat_history_service
+from services.request_trace import detach_trace
+
+# 'hybrid' = local ranking + LLM chat_summary, 'fast' = local ranking + template summary (no LLM call)
+SCHEME_RANKING_MODE = os.getenv("SCHEME_RANKING_MODE", "hybrid").lower()
+
+# Final summary persist karne se pehle turn ke graph run / history record ka max wait
+ENRICHMENT_PERSIST_WAIT_SECONDS = 10
+
+
+class SchemeEnrichmentService:
+    """
+    Second phase of the scheme response: the chat_summary for the ranked cards.
+    Two-phase mode me cards pehle client ko jaate hain, ye enrichment background me chalta hai
+    aur session_id se fetch hota hai. Ready summary checkpoint (template message ki jagah, same id)
+    aur chat history row me likhi jaati hai, isliye reload/agla turn aur doosre workers bhi use dekhte hain.
+    """
+
+    def __init__(self, max_sessions: int = 1000, ttl_seconds: int = 900):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self._results: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._tasks: Dict[str, asyncio.Task] = {}
+        # session -> assistant history row ka timestamp (chat endpoint record ke baad attach_history karta hai)
+        self._history: Dict[str, asyncio.Future] = {}
+
+    async def enrich(self, query: str, schemes_data: List[Dict[str, Any]], requested_count: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Writes the friendly chat_summary for cards already ranked by SchemeService.
+        LLM sirf text likhta hai; ordering aur relevance_score local hybrid ranker ke hain.
+
+        Returns:
+            dict: {"chat_summary": str, "schemes": [cards, best first]}
+        """
+        display_schemes = schemes_data[:requested_count] if requested_count else list(schemes_data)
+        if not self.use_llm:
+            return {"chat_summary": self.template_summary(display_schemes), "schemes": display_schemes}
+
+        analysis_input = [{"name": x["name"], "desc": x["description"]} for x in display_schemes]
+        prompt = f"""
+        The user asked: "{query}"
+        These government schemes were found (best match first): {json.dumps(analysis_input)}
+
+        Write a friendly 1-2 sentence overview of how these schemes help with the query.
+        Return ONLY the overview text.
+        """
+
+        ai_response = await mimo_service.generate_text(prompt)
+        chat_text = (ai_response or "").strip()
+        if not chat_text or chat_text == ERROR_RESPONSE:
+            chat_text = self.template_summary(display_schemes)
+        return {"chat_summary": chat_text, "schemes": display_schemes}
+
+    @property
+    def use_llm(self) -> bool:
+        return SCHEME_RANKING_MODE != "fast"
+
+    @staticmethod
+    def template_summary(schemes: List[Dict[str, Any]]) -> str:
+        if not schemes:
+            return "I found these schemes in our database:"
+        names = ", ".join(x["name"] for x in schemes[:3] if x.get("name"))
+        return f"I found {len(schemes)} relevant scheme{'s' if len(schemes) > 1 else ''} for you, led by {names}."
+
+    def start(self, session_id: str, query: str, schemes_data: List[Dict[str, Any]],
+              requested_count: Optional[int] = None, message_id: Optional[str] = None):
+        """
+        Schedules enrichment in the background; result is kept per session for the follow-up fetch.
+        message_id = checkpointed template AIMessage, jise ready summary replace karti hai.
+        """
+        previous = self._tasks.pop(session_id, None)
+        if previous and not previous.done():
+            previous.cancel()
+
+        self._store(session_id, {"status": "pending", "query": query})
+        self._history[session_id] = asyncio.get_running_loop().create_future()
+        self._tasks[session_id] = asyncio.create_task(
+            self._run(session_id, query, schemes_data, requested_count, message_id)
+        )
+
+    def attach_history(self, session_id: str, timestamp):
+        """Chat endpoint: the assistant history row of this turn (its timestamp) that gets the final summary."""
+        future = self._history.get(session_id)
+        if future is not None and not future.done():
+            future.set_result(timestamp)
+
+    async def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Local result, warna checkpoint se (enrichment kisi aur worker ne chalaya ho)."""
+        entry = self._results.get(session_id)
+        if entry is not None and time.monotonic() - entry["_created"] > self.ttl_seconds:
+            self._results.pop(session_id, None)
+            entry = None
+        if entry is None:
+            return await self._load(session_id)
+        return {k: v for k, v in entry.items() if k != "_created"}
+
+    async def _run(self, session_id: str, query: str, schemes_data: List[Dict[str, Any]],
+                   requested_count: Optional[int], message_id: Optional[str]):
+        # Response ke baad chalta hai, request timeline ka hissa nahi
+        detach_trace()
+        history = self._history.get(session_id)
+        try:
+            try:
+                result = await self.enrich(query, schemes_data, requested_count)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Checkpoint/history me template summary reh jaati hai
+                print(f"❌ Background Enrichment Error: {e}")
+                self._store(session_id, {"status": "failed", "query": query})
+                return
+            self._store(session_id, {"status": "ready", "query": query, **result})
+            try:
+                await self._persist(session_id, message_id, history, result)
+            except Exception as e:
+                print(f"❌ Enrichment persist error ({session_id}): {e}")
+        finally:
+            if self._tasks.get(session_id) is asyncio.current_task():
+                self._tasks.pop(session_id, None)
+                self._history.pop(session_id, None)
+
+    async def _persist(self, session_id: str, message_id: Optional[str],
+                       history: Optional[asyncio.Future], result: Dict[str, Any]):
+        """Writes the ready summary over this turn's assistant history row and checkpointed template message."""
+        summary = result["chat_summary"]
+        if history is not None:
+            try:
+                timestamp = await asyncio.wait_for(asyncio.shield(history), timeout=ENRICHMENT_PERSIST_WAIT_SECONDS)
+                await chat_history_service.update_message(session_id, "assistant", timestamp, summary)
+            except asyncio.TimeoutError:
+                pass  # Caller ne history record nahi ki (scripts/tests)
+
+        # Lazy import: agents.graph is module ko (scheme node ke through) import karta hai
+        from agents.graph import get_graph
+        graph = get_graph()
+        if graph.checkpointer is None or not message_id:
+            return
+        config = {"configurable": {"thread_id": session_id}}
+        # Thread ka run abhi chal raha ho to uska agla checkpoint ye update overwrite kar dega: idle tak ruko
+        deadline = time.monotonic() + ENRICHMENT_PERSIST_WAIT_SECONDS
+        snapshot = await graph.aget_state(config)
+        while snapshot.next:
+            if time.monotonic() > deadline:
+                return
+            await asyncio.sleep(0.1)
+            snapshot = await graph.aget_state(config)
+        if not any(m.id == message_id for m in snapshot.values.get("messages", [])):
+            return  # Memory summariser ne turn fold kar diya
+        await graph.aupdate_state(
+            config,
+            {"messages": [AIMessage(content=summary, id=message_id, response_metadata={"enrichment": "ready"})]},
+            as_node="memory",
+        )
+
+    async def _load(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Enrichment state from the checkpoint. Shared checkpointer (postgres) pe follow-up fetch kisi bhi
+        worker pe chal sakta hai; CHECKPOINTER_BACKEND=memory ke saath single worker hi chalao.
+        """
+        from agents.graph import get_graph
+        graph = get_graph()
+        if graph.checkpointer is None:
+            return None
+        snapshot = await graph.aget_state({"configurable": {"thread_id": session_id}})
+        messages = list(snapshot.values.get("messages", []))
+        if not messages or not isinstance(messages[-1], AIMessage):
+            return None
+        status = messages[-1].response_metadata.get("enrichment")
+        if status is None:
+            return None
+        query = next((m.content for m in reversed(messages) if isinstance(m, HumanMessage)), None)
+        if status != "ready":
+            return {"status": status, "query": query}
+        return {"status": status, "query": query, "chat_summary": messages[-1].content,
+                "schemes": snapshot.values.get("schemes", [])}
+
+    def _store(self, session_id: str, entry: Dict[str, Any]):
+        entry["_created"] = time.monotonic()
+        self._results[session_id] = entry
+        self._results.move_to_end(session_id)
+        while len(self._results) > self.max_sessions:
+            self._results.popitem(last=False)
+
+
+scheme_enrichment_service = SchemeEnrichmentService()
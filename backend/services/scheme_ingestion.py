@@ -0,0 +1,181 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+from typing import Any, Dict, List
+
+from sqlalchemy import delete, func, select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from database import AsyncSessionLocal
+from models import Scheme
+from services.gemini_service import gemini_service
+from services.eligibility_index import eligibility_index
+from services.vector_index import vector_index
+from services.scheme_cards import backfill_cards, scheme_card
+
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "50"))
+INGEST_CONCURRENCY = int(os.getenv("INGEST_CONCURRENCY", "4"))
+
+# Scheme fields jo source JSON se table me jaate hain
+SCHEME_FIELDS = [
+    "name", "description", "benefits", "eligibility_criteria", "required_documents",
+    "application_mode", "tags", "category", "link",
+]
+
+
+async def ensure_scheme_columns(conn: AsyncConnection):
+    """
+    Adds ingestion/card columns + the upsert key to existing schemes tables
+    (create_all purani tables ko alter nahi karta), drops the redundant name index and precomputes missing cards.
+    """
+    await conn.execute(text("ALTER TABLE schemes ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64)"))
+    await conn.execute(text("ALTER TABLE schemes ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ DEFAULT now()"))
+    await conn.execute(text("ALTER TABLE schemes ADD COLUMN IF NOT EXISTS card JSON"))
+    await conn.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS uq_schemes_name ON schemes (name)"))
+    # Unique index name lookups bhi serve karta hai; purana non-unique ix_schemes_name sirf write cost hai
+    await conn.execute(text("DROP INDEX IF EXISTS ix_schemes_name"))
+    await backfill_cards(conn)
+
+
+def rich_text(data: Dict[str, Any]) -> str:
+    """Text that gets embedded: name, description, benefits and tags for better semantic search."""
+    benefits_str = ". ".join(data.get("benefits", []))
+    tags_str = ", ".join(data.get("tags", []))
+    return f"{data['name']}. {data['description']}. Benefits: {benefits_str}. Tags: {tags_str}"
+
+
+def content_hash(data: Dict[str, Any], model: str) -> str:
+    """Hash of the stored fields + embedding model; change hone pe hi scheme re-embed hoti hai."""
+    payload = {field: data.get(field) for field in SCHEME_FIELDS}
+    payload["_embedding_model"] = model
+    raw = json.dumps(payload, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def scheme_row(data: Dict[str, Any], embedding: List[float], digest: str) -> Dict[str, Any]:
+    return {
+        "name": data["name"],
+        "description": data["description"],
+        "benefits": data.get("benefits", []),
+        "eligibility_criteria": data.get("eligibility_criteria", {}),
+        "required_documents": data.get("required_documents", []),
+        "application_mode": data.get("application_mode", "Online/Offline"),
+        "tags": data.get("tags", []),
+        "category": data["category"],
+        "link": data["link"],
+        "card": scheme_card(data),
+        "embedding": embedding,
+        "content_hash": digest,
+    }
+
+
+class SchemeIngestionPipeline:
+    """
+    Incremental catalog ingestion: content-hash diff -> batched, governor-paced embeddings ->
+    bulk upsert (INSERT ... ON CONFLICT (name)) per batch. Har batch apni transaction me commit hota hai,
+    isliye beech me ruk jaaye to rerun sirf bache hue schemes process karta hai. Table kabhi khaali nahi hoti.
+    """
+
+    def __init__(self, batch_size: int = INGEST_BATCH_SIZE, concurrency: int = INGEST_CONCURRENCY):
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.model = gemini_service.embedding_model_name
+
+    async def run(self, schemes_data: List[Dict[str, Any]], prune: bool = False) -> Dict[str, int]:
+        """
+        Ingests the given scheme records.
+
+        Args:
+            schemes_data (list): Scheme dicts (data/schemes.json format).
+            prune (bool): Delete schemes whose name is no longer in schemes_data.
+
+        Returns:
+            dict: Counts of inserted/updated/unchanged/failed/pruned schemes.
+        """
+        started = time.perf_counter()
+        # Same name do baar ho to aakhri record jeet-ta hai
+        by_name = {data["name"]: data for data in schemes_data}
+
+        async with AsyncSessionLocal() as db:
+            existing = dict((await db.execute(select(Scheme.name, Scheme.content_hash))).all())
+
+        pending = []
+        report = {"inserted": 0, "updated": 0, "unchanged": 0, "failed": 0, "pruned": 0}
+        for name, data in by_name.items():
+            digest = content_hash(data, self.model)
+            if existing.get(name) == digest:
+                report["unchanged"] += 1
+            else:
+                pending.append((data, digest, name in existing))
+        print(f"📦 {len(by_name)} schemes: {len(pending)} new/changed, {report['unchanged']} unchanged.")
+
+        batches = [pending[i:i + self.batch_size] for i in range(0, len(pending), self.batch_size)]
+        semaphore = asyncio.Semaphore(self.concurrency)
+        done = 0
+
+        async def process(batch):
+            nonlocal done
+            async with semaphore:
+                written = await self._ingest_batch(batch)
+            done += len(batch)
+            for (data, _, is_update), ok in zip(batch, written):
+                if not ok:
+                    report["failed"] += 1
+                elif is_update:
+                    report["updated"] += 1
+                else:
+                    report["inserted"] += 1
+            print(f"   ✅ [{done}/{len(pending)}] batch of {len(batch)} done ({sum(written)} written)")
+
+        await asyncio.gather(*(process(batch) for batch in batches))
+
+        if prune:
+            async with AsyncSessionLocal() as db:
+                result = await db.execute(
+                    delete(Scheme).where(Scheme.name.notin_(list(by_name))).execution_options(synchronize_session=False)
+                )
+                await db.commit()
+                report["pruned"] = result.rowcount or 0
+
+        # Is process ke in-memory indexes turant refresh; baaki workers updated_at signature se pakadte hain
+        vector_index.invalidate()
+        eligibility_index.invalidate()
+        print(f"🔥 Ingestion finished in {time.perf_counter() - started:.1f}s: {report}")
+        return report
+
+    async def _ingest_batch(self, batch) -> List[bool]:
+        embeddings = await gemini_service.get_embeddings_batch([rich_text(data) for data, _, _ in batch])
+        if embeddings is None:
+            embeddings = [None] * len(batch)
+
+        rows = [
+            scheme_row(data, embedding, digest)
+            for (data, digest, _), embedding in zip(batch, embeddings) if embedding
+        ]
+        if rows:
+            stmt = pg_insert(Scheme).values(rows)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[Scheme.name],
+                set_={
+                    **{field: stmt.excluded[field] for field in SCHEME_FIELDS if field != "name"},
+                    "card": stmt.excluded.card,
+                    "embedding": stmt.excluded.embedding,
+                    "content_hash": stmt.excluded.content_hash,
+                    "updated_at": func.now(),
+                },
+            )
+            async with AsyncSessionLocal() as db:
+                await db.execute(stmt)
+                await db.commit()
+        return [bool(embedding) for embedding in embeddings]
+
+
+def load_schemes(path: str = "data/schemes.json") -> List[Dict[str, Any]]:
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+scheme_ingestion = SchemeIngestionPipeline()
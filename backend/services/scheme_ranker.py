@@ -0,0 +1,114 @@
+import os
+import re
+from typing import Any, Dict, List
+
+import numpy as np
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_STOPWORDS = {
+    "a", "an", "and", "are", "any", "for", "the", "of", "to", "in", "on", "is", "me", "my", "i",
+    "what", "which", "how", "can", "get", "give", "tell", "about", "with", "there", "do", "does",
+    "scheme", "schemes", "show", "top", "best", "please", "some", "or", "by", "from", "at", "be",
+}
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in _TOKEN_RE.findall((text or "").lower()) if len(t) > 1 and t not in _STOPWORDS]
+
+
+def _as_text(value: Any) -> str:
+    if isinstance(value, (list, tuple)):
+        return " ".join(str(v) for v in value)
+    return str(value or "")
+
+
+class HybridRanker:
+    """
+    Deterministic local ranking for scheme candidates:
+    cosine similarity + BM25 (name/description/benefits/tags) + tag overlap, vectorized over the candidate set.
+    LLM relevance scoring ki jagah ye use hota hai, isliye ordering reproducible hai.
+    """
+
+    def __init__(self):
+        self.w_cosine = float(os.getenv("RANK_WEIGHT_COSINE", "0.6"))
+        self.w_bm25 = float(os.getenv("RANK_WEIGHT_BM25", "0.3"))
+        self.w_tags = float(os.getenv("RANK_WEIGHT_TAGS", "0.1"))
+        self.k1 = 1.5
+        self.b = 0.75
+
+    def rank(self, query: str, candidates: List[Dict[str, Any]], similarities, limit: int) -> List[Dict[str, Any]]:
+        """
+        Scores candidates and returns the top `limit`, best first, with relevance_score (0-100) and explanation.
+
+        Args:
+            query (str): User query.
+            candidates (list): Scheme card dicts.
+            similarities: Cosine similarity of each candidate to the query embedding.
+            limit (int): Number of schemes to return.
+        """
+        if not candidates:
+            return []
+
+        query_terms = sorted(set(tokenize(query)))
+        cosine = np.clip(np.asarray(similarities, dtype=np.float32), 0.0, 1.0)
+        bm25 = self._bm25(query_terms, candidates)
+        tags = self._tag_overlap(query_terms, candidates)
+
+        scores = self.w_cosine * cosine + self.w_bm25 * bm25 + self.w_tags * tags
+        total_weight = (self.w_cosine + self.w_bm25 + self.w_tags) or 1.0
+        scores = scores / total_weight
+
+        top = np.argsort(-scores, kind="stable")[:limit]
+        ranked = []
+        for idx in top:
+            card = dict(candidates[idx])
+            card["relevance_score"] = int(round(float(scores[idx]) * 100))
+            card["explanation"] = self._explain(query_terms, card)
+            ranked.append(card)
+        return ranked
+
+    def _bm25(self, query_terms: List[str], candidates: List[Dict[str, Any]]) -> np.ndarray:
+        if not query_terms:
+            return np.zeros(len(candidates), dtype=np.float32)
+
+        docs = [
+            tokenize(" ".join([_as_text(c.get("name")), _as_text(c.get("description")),
+                               _as_text(c.get("benefits")), _as_text(c.get("tags"))]))
+            for c in candidates
+        ]
+        term_index = {t: i for i, t in enumerate(query_terms)}
+        tf = np.zeros((len(docs), len(query_terms)), dtype=np.float32)
+        for d, tokens in enumerate(docs):
+            for token in tokens:
+                i = term_index.get(token)
+                if i is not None:
+                    tf[d, i] += 1
+
+        doc_len = np.array([len(tokens) for tokens in docs], dtype=np.float32)
+        avg_len = doc_len.mean() or 1.0
+        df = (tf > 0).sum(axis=0)
+        n = len(docs)
+        idf = np.log(1 + (n - df + 0.5) / (df + 0.5))
+
+        denom = tf + self.k1 * (1 - self.b + self.b * doc_len[:, None] / avg_len)
+        scores = (idf * tf * (self.k1 + 1) / np.where(denom == 0, 1.0, denom)).sum(axis=1)
+        peak = scores.max()
+        return scores / peak if peak > 0 else scores
+
+    def _tag_overlap(self, query_terms: List[str], candidates: List[Dict[str, Any]]) -> np.ndarray:
+        if not query_terms:
+            return np.zeros(len(candidates), dtype=np.float32)
+        terms = set(query_terms)
+        overlap = [len(terms & set(tokenize(_as_text(c.get("tags"))))) / len(terms) for c in candidates]
+        return np.asarray(overlap, dtype=np.float32)
+
+    def _explain(self, query_terms: List[str], card: Dict[str, Any]) -> str:
+        text_terms = set(tokenize(" ".join([_as_text(card.get("name")), _as_text(card.get("description")),
+                                            _as_text(card.get("benefits")), _as_text(card.get("tags"))])))
+        matched = [t for t in query_terms if t in text_terms]
+        if matched:
+            return f"Matches your query on: {', '.join(matched[:5])}."
+        return "Closely related to your query by meaning."
+
+
+hybrid_ranker = HybridRanker()
@@ -1,45 +1,109 @@
+import os
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
-from models import Scheme
+from sqlalchemy import and_
+from models import Scheme, SchemeEmbedding
 from services.gemini_service import gemini_service
+from services.scheme_ranker import hybrid_ranker
+from services.eligibility_index import eligibility_index
+from services.vector_index import vector_index
+from services.pgvector_search import hybrid_search, tune_ann_search
+from services.embedding_versions import embedding_versions
+from services.scheme_cards import card_with_id
+
+# Vector search itne guna candidates laata hai, local hybrid ranker unme se top `limit` chunta hai
+SCHEME_CANDIDATE_MULTIPLIER = int(os.getenv("SCHEME_CANDIDATE_MULTIPLIER", "4"))
+
+# 'vector' = in-process index (Postgres ANN fallback), 'hybrid' = Postgres full-text + vector RRF
+SCHEME_SEARCH_MODE = os.getenv("SCHEME_SEARCH_MODE", "vector").lower()
 
 class SchemeService:
-    async def search_schemes(self, db: AsyncSession, query: str, limit: int = 5):
+    async def search_schemes(self, db: AsyncSession, query: str, limit: int = 5, query_embedding=None, user_profile=None,
+                             ef_search: int = None, probes: int = None):
+        """
+        Eligibility pre-filter (user_profile) + vector retrieval + deterministic local reranking.
+        Returns scheme dicts best first, with vector_score, relevance_score (0-100) and explanation.
+        ef_search / probes is query ke Postgres ANN search ko tune karte hain (None = env defaults).
+        """
         try:
-            # 1. Get Gemini embedding for query
-            query_embedding = await gemini_service.get_embeddings(query)
+            # 1. Query embedding from the active embedding model (cutover flag). Legacy Gemini model ho
+            #    to router ka embedding reuse; naye model ke liye usi model se query embed hoti hai
+            active_model = await embedding_versions.active_model(db)
+            model_id = None if embedding_versions.is_legacy(active_model) else active_model
+            if model_id is not None:
+                query_embedding = await embedding_versions.embed_query(model_id, query)
+            elif query_embedding is None:
+                query_embedding = await gemini_service.get_embeddings(query)
             
             if not query_embedding:
                 print("⚠️ Could not generate embedding for query")
                 return []
 
-            # 2. Vector Similarity Search
-            stmt = select(Scheme).order_by(
-                Scheme.embedding.cosine_distance(query_embedding)
-            ).limit(limit)
-            
-            result = await db.execute(stmt)
-            schemes = result.scalars().all()
+            # 2. Eligibility pre-filter (in-memory bitsets, ineligible schemes top-k slots nahi lete)
+            eligible_ids = None
+            if user_profile:
+                await eligibility_index.ensure_fresh(db)
+                eligible_ids = eligibility_index.eligible_ids(user_profile)
+                if eligible_ids == []:
+                    print("⚠️ No scheme matches the profile filters, searching the full catalog")
+                    eligible_ids = None
+
+            # 3. Retrieval: hybrid (full-text + vector, one SQL statement) ya vector
+            #    (in-process index, Postgres fallback)
+            candidate_count = limit * SCHEME_CANDIDATE_MULTIPLIER
+            if SCHEME_SEARCH_MODE == "hybrid":
+                formatted_results = await hybrid_search(db, query, query_embedding, candidate_count, eligible_ids, model_id,
+                                                        ef_search=ef_search, probes=probes)
+            else:
+                formatted_results = await self._search_index(db, query_embedding, candidate_count, eligible_ids, model_id)
+                if formatted_results is None:
+                    formatted_results = await self._search_postgres(db, query_embedding, candidate_count, eligible_ids, model_id,
+                                                                    ef_search=ef_search, probes=probes)
             
-            # 3. Clean Dictionary Formatting
-            formatted_results = []
-            for s in schemes:
-                formatted_results.append({
-                    "id": s.id,
-                    "name": s.name,
-                    "description": s.description,
-                    "category": s.category,
-                    "benefits": s.benefits,
-                    "eligibility_criteria": s.eligibility_criteria,
-                    "required_documents": s.required_documents,
-                    "application_mode": s.application_mode,
-                    "link": s.link,
-                    "tags": s.tags
-                })
-            return formatted_results
+            # 4. Local hybrid ranking (cosine + BM25 + tag overlap)
+            similarities = [r["vector_score"] or 0.0 for r in formatted_results]
+            return hybrid_ranker.rank(query, formatted_results, similarities, limit)
             
         except Exception as e:
             print(f"❌ Search Error in MAYA Knowledge Base: {e}")
             return []
 
-scheme_service = SchemeService()
\ No newline at end of file
+    async def _search_index(self, db: AsyncSession, query_embedding, k: int, eligible_ids=None, model_id=None):
+        """Top-k from the in-memory vector index; None means fall back to Postgres."""
+        if not vector_index.enabled:
+            return None
+        try:
+            await vector_index.ensure_fresh(db, model_id)
+            if not vector_index.ready:
+                return None
+            return vector_index.search(query_embedding, k, eligible_ids)
+        except Exception as e:
+            print(f"⚠️ Vector index unavailable, using Postgres: {e}")
+            return None
+
+    async def _search_postgres(self, db: AsyncSession, query_embedding, k: int, eligible_ids=None, model_id=None,
+                               ef_search: int = None, probes: int = None):
+        # Slim projection: id + precomputed card + distance (embedding/raw columns wire pe nahi aate)
+        if model_id is None:
+            distance = Scheme.embedding.cosine_distance(query_embedding).label("distance")
+            stmt = select(Scheme.id, Scheme.card, distance)
+        else:
+            distance = SchemeEmbedding.embedding.cosine_distance(query_embedding).label("distance")
+            stmt = select(Scheme.id, Scheme.card, distance).join(
+                SchemeEmbedding, and_(SchemeEmbedding.scheme_id == Scheme.id, SchemeEmbedding.model_id == model_id)
+            )
+        stmt = stmt.where(Scheme.card.isnot(None))
+        if eligible_ids is not None:
+            stmt = stmt.where(Scheme.id.in_(eligible_ids))
+        stmt = stmt.order_by(distance).limit(k)
+        
+        await tune_ann_search(db, ef_search, probes)
+        rows = (await db.execute(stmt)).all()
+        
+        # vector_score = cosine similarity, best first
+        return [
+            card_with_id(scheme_id, card, vector_score=round(1 - float(dist), 4) if dist is not None else None)
+            for scheme_id, card, dist in rows
+        ]
+
+scheme_service = SchemeService()
@@ -0,0 +1,125 @@
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+class _ScopeCache:
+    """One agent's entries: LRU order + a lazily rebuilt matrix of normalized query embeddings."""
+
+    def __init__(self):
+        self.entries: "OrderedDict[int, dict]" = OrderedDict()
+        self.next_id = 0
+        self._matrix: Optional[np.ndarray] = None
+        self._keys: List[int] = []
+
+    def matrix(self):
+        if self._matrix is None:
+            self._keys = list(self.entries.keys())
+            self._matrix = (
+                np.stack([self.entries[k]["vector"] for k in self._keys]) if self._keys else None
+            )
+        return self._matrix, self._keys
+
+    def invalidate(self):
+        self._matrix = None
+
+
+class SemanticCache:
+    """
+    Response cache keyed on query embeddings: near-identical questions ("how to register MSME")
+    same agent scope me cached answer paate hain, OpenRouter call skip hoti hai.
+    """
+
+    def __init__(self):
+        self.enabled = os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() == "true"
+        self.threshold = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))
+        self.max_entries = int(os.getenv("SEMANTIC_CACHE_SIZE", "500"))  # per scope
+        self.ttl_seconds = float(os.getenv("SEMANTIC_CACHE_TTL", "86400"))
+        self._scopes: Dict[str, _ScopeCache] = {}
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.saved_seconds = 0.0
+
+    @staticmethod
+    def _normalize(embedding) -> np.ndarray:
+        vec = np.asarray(embedding, dtype=np.float32)
+        return vec / (np.linalg.norm(vec) or 1.0)
+
+    def lookup(self, scope: str, embedding) -> Optional[str]:
+        """Returns a cached response if a stored query in this scope is similar enough."""
+        cache = self._scopes.get(scope)
+        if cache is None or not cache.entries:
+            self.misses += 1
+            return None
+
+        matrix, keys = cache.matrix()
+        sims = matrix @ self._normalize(embedding)
+        idx = int(np.argmax(sims))
+        key = keys[idx]
+        entry = cache.entries.get(key)
+
+        if entry is None or sims[idx] < self.threshold:
+            self.misses += 1
+            return None
+        if time.monotonic() - entry["created"] > self.ttl_seconds:
+            del cache.entries[key]
+            cache.invalidate()
+            self.misses += 1
+            return None
+
+        cache.entries.move_to_end(key)
+        self.hits += 1
+        self.saved_seconds += entry["latency"]
+        return entry["response"]
+
+    def store(self, scope: str, embedding, response: str, latency: float):
+        cache = self._scopes.setdefault(scope, _ScopeCache())
+        vector = self._normalize(embedding)
+
+        # Near-duplicate query pehle se stored ho (e.g. bypass ke baad) to wahi entry refresh karo
+        matrix, keys = cache.matrix()
+        if matrix is not None:
+            sims = matrix @ vector
+            idx = int(np.argmax(sims))
+            if sims[idx] >= self.threshold:
+                cache.entries.pop(keys[idx], None)
+
+        cache.entries[cache.next_id] = {
+            "vector": vector,
+            "response": response,
+            "created": time.monotonic(),
+            "latency": latency,
+        }
+        cache.next_id += 1
+        while len(cache.entries) > self.max_entries:
+            cache.entries.popitem(last=False)
+        cache.invalidate()
+
+    def record_bypass(self):
+        self.bypassed += 1
+
+    def clear(self, scope: Optional[str] = None):
+        if scope is None:
+            self._scopes.clear()
+        else:
+            self._scopes.pop(scope, None)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "threshold": self.threshold,
+            "entries": {scope: len(c.entries) for scope, c in self._scopes.items()},
+            "hits": self.hits,
+            "misses": self.misses,
+            "bypassed": self.bypassed,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "saved_latency_seconds": round(self.saved_seconds, 3),
+        }
+
+
+semantic_cache = SemanticCache()
@@ -0,0 +1,67 @@
+import asyncio
+import hashlib
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+def payload_key(*parts: Any) -> str:
+    """Stable key for an upstream payload (whitespace-normalized)."""
+    normalized = "\x00".join(" ".join(str(p).split()) for p in parts)
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+class _Call:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical upstream calls: same key ke saare callers ek hi task ka result paate hain.
+    Ek caller disconnect/cancel ho to shared call chalta rehta hai; sirf tab cancel hota hai jab koi waiter na bache.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Hashable, _Call] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.create_task(fn()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda task, key=key: self._finish(key, task))
+            self.leaders += 1
+        else:
+            self.coalesced += 1
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                # Map se turant hatao: cancel ho rahe task pe koi naya caller join karke CancelledError na paaye
+                if self._calls.get(key) is call:
+                    del self._calls[key]
+                call.task.cancel()
+
+    def _finish(self, key: Hashable, task: asyncio.Task):
+        if self._calls.get(key) is not None and self._calls[key].task is task:
+            del self._calls[key]
+        # Cancelled-without-waiters tasks ka exception consume karo (warning na aaye)
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> dict:
+        total = self.leaders + self.coalesced
+        return {
+            "in_flight": len(self._calls),
+            "upstream_calls": self.leaders,
+            "coalesced": self.coalesced,
+            "coalesced_rate": round(self.coalesced / total, 4) if total else 0.0,
+        }
@@ -0,0 +1,148 @@
+import asyncio
+import builtins
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+# Process ke sabse pehle imports me se ek (main.py ki pehli line), isliye boot clock yahin se
+_BOOT_STARTED = time.perf_counter()
+
+# Inke andar se hone wale imports time hote hain (third-party libs kaun sa module kheench raha hai)
+PROJECT_MODULES = ("__main__", "main", "database", "models", "services", "agents")
+
+
+class StartupProfile:
+    """
+    Boot profile: per-module import time (first import only, inclusive like -X importtime),
+    per-service lazy init time and lifespan phases. report() boot pe ek table print karta hai;
+    stats() /api/stats me jaata hai.
+    """
+
+    def __init__(self):
+        self.enabled = os.getenv("STARTUP_PROFILE", "true").lower() == "true"
+        self.top = int(os.getenv("STARTUP_PROFILE_TOP", "12"))
+        self.imports: Dict[str, dict] = {}
+        self.inits: Dict[str, float] = {}
+        self.phases: Dict[str, float] = {}
+        self.ready_seconds: Optional[float] = None
+        self._original_import = None
+
+    def track_imports(self):
+        """Wraps builtins.__import__ until stop_tracking() (call before the app's imports)."""
+        if not self.enabled or self._original_import is not None:
+            return
+        original = self._original_import = builtins.__import__
+
+        def timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+            importer = (globals or {}).get("__name__") or ""
+            if level or name in sys.modules or not importer.startswith(PROJECT_MODULES):
+                return original(name, globals, locals, fromlist, level)
+            started = time.perf_counter()
+            try:
+                return original(name, globals, locals, fromlist, level)
+            finally:
+                self.imports.setdefault(name, {"seconds": time.perf_counter() - started, "by": importer})
+
+        builtins.__import__ = timed_import
+
+    def stop_tracking(self):
+        if self._original_import is not None:
+            builtins.__import__ = self._original_import
+            self._original_import = None
+        self.phases["imports"] = time.perf_counter() - _BOOT_STARTED
+
+    @contextmanager
+    def phase(self, name: str):
+        """Times one boot step (lifespan schema init, checkpointer, ...)."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = time.perf_counter() - started
+
+    def record_init(self, name: str, seconds: float):
+        self.inits[name] = seconds
+        if self.enabled:
+            print(f"⚙️ Lazy init {name} in {seconds * 1000:.0f}ms")
+
+    def mark_ready(self):
+        """Lifespan yield se just pehle: worker requests lene ke liye ready."""
+        self.ready_seconds = time.perf_counter() - _BOOT_STARTED
+        if self.enabled:
+            self.report()
+
+    def report(self):
+        print(f"⏱️ Startup profile: ready in {self.ready_seconds * 1000:.0f}ms")
+        for name, seconds in self.phases.items():
+            print(f"   phase  {name:<40} {seconds * 1000:8.1f}ms")
+        slowest = sorted(self.imports.items(), key=lambda item: item[1]["seconds"], reverse=True)[:self.top]
+        for name, entry in slowest:
+            print(f"   import {name:<40} {entry['seconds'] * 1000:8.1f}ms  ({entry['by']})")
+        for name, seconds in self.inits.items():
+            print(f"   init   {name:<40} {seconds * 1000:8.1f}ms")
+
+    def stats(self) -> dict:
+        slowest = sorted(self.imports.items(), key=lambda item: item[1]["seconds"], reverse=True)[:self.top]
+        return {
+            "ready_ms": round(self.ready_seconds * 1000, 1) if self.ready_seconds is not None else None,
+            "phases_ms": {name: round(seconds * 1000, 1) for name, seconds in self.phases.items()},
+            "imports_ms": {name: round(entry["seconds"] * 1000, 1) for name, entry in slowest},
+            "inits_ms": {name: round(seconds * 1000, 1) for name, seconds in self.inits.items()},
+        }
+
+
+startup_profile = StartupProfile()
+
+
+_MISSING = object()
+
+
+class lazy_client:
+    """
+    cached_property jaisa descriptor for heavy clients (SDK import + construction pehli access pe).
+    Build time startup_profile me record hota hai. Build lock ke andar hota hai (ek hi client banta hai);
+    event loop pe attribute ki jagah `await client_ready(obj, name)` use karo, jo build (ya warm-up thread
+    ka chal raha build) worker thread me wait karta hai, loop pe nahi.
+    """
+
+    def __init__(self, factory):
+        self.factory = factory
+        self.__doc__ = factory.__doc__
+        self._lock = threading.Lock()
+
+    def __set_name__(self, owner, name):
+        self.attr = name
+        self.label = f"{owner.__name__}.{name}"
+
+    def __get__(self, obj, owner=None):
+        if obj is None:
+            return self
+        # Double-checked: bana hua client bina lock ke
+        value = obj.__dict__.get(self.attr, _MISSING)
+        if value is not _MISSING:
+            return value
+        with self._lock:
+            value = obj.__dict__.get(self.attr, _MISSING)
+            if value is not _MISSING:
+                return value
+            started = time.perf_counter()
+            value = self.factory(obj)
+            # Instance dict non-data descriptor ko shadow karta hai: agli access plain attribute lookup
+            obj.__dict__[self.attr] = value
+        startup_profile.record_init(self.label, time.perf_counter() - started)
+        return value
+
+    async def aget(self, obj):
+        value = obj.__dict__.get(self.attr, _MISSING)
+        if value is not _MISSING:
+            return value
+        # SDK import/construction (ya warm-up ke build ka lock/import lock wait) thread me, loop free rehta hai
+        return await asyncio.to_thread(self.__get__, obj)
+
+
+async def client_ready(obj, name: str):
+    """Event-loop access to a lazy_client attribute (never blocks the loop on the first build)."""
+    return await getattr(type(obj), name).aget(obj)
@@ -1,6 +1,11 @@
+import asyncio
 import os
-from tavily import TavilyClient
+import re
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
+from services.ttl_cache import TTLCache
+from services.startup_profile import lazy_client, client_ready
+from services.metrics import observe_call
 
 load_dotenv()
 
@@ -14,16 +19,42 @@ class TavilyService:
         return cls._instance
 
     def _initialize(self):
-        api_key = os.getenv("TAVILY_API_KEY")
-        if not api_key:
+        self.api_key = os.getenv("TAVILY_API_KEY")
+        self.max_concurrency = int(os.getenv("TAVILY_MAX_CONCURRENCY", "4"))
+        self.cache = TTLCache(
+            maxsize=int(os.getenv("TAVILY_CACHE_SIZE", "256")),
+            ttl_seconds=float(os.getenv("TAVILY_CACHE_TTL", "1800"))
+        )
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._executor = None
+
+        if not self.api_key:
             print("Warning: TAVILY_API_KEY not found in environment variables.")
-            self.client = None
-        else:
-            self.client = TavilyClient(api_key=api_key)
+
+    @lazy_client
+    def client(self):
+        """Sync Tavily client (SDK import pehli search pe)."""
+        if not self.api_key:
+            return None
+        from tavily import TavilyClient
+        return TavilyClient(api_key=self.api_key)
+
+    @lazy_client
+    def async_client(self):
+        """Async Tavily client; None on tavily-python < 0.5 (sync client on a bounded executor)."""
+        if not self.api_key:
+            return None
+        try:
+            from tavily import AsyncTavilyClient
+        except ImportError:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="tavily")
+            return None
+        return AsyncTavilyClient(api_key=self.api_key)
 
     def search(self, query: str, max_results: int = 5) -> str:
         """
         Performs a web search using Tavily API.
+        Blocking call - async code (graph nodes) should use asearch instead.
         
         Args:
             query (str): The search query.
@@ -32,23 +63,82 @@ class TavilyService:
         Returns:
             str: A formatted string containing the search results.
         """
-        if not self.client:
+        if not self.api_key:
             return "Web search is currently unavailable (API Key missing)."
 
+        key = self._cache_key(query, max_results, "advanced")
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
         try:
             response = self.client.search(query, search_depth="advanced", max_results=max_results)
-            results = response.get("results", [])
-            
-            formatted_results = []
-            for result in results:
-                title = result.get("title", "No Title")
-                url = result.get("url", "#")
-                content = result.get("content", "No Content")
-                formatted_results.append(f"Source: {title} ({url})\nContent: {content}\n")
+            formatted = self._format_results(response)
+            self.cache.set(key, formatted)
+            return formatted
+        except Exception as e:
+            print(f"Error searching with TavilyService: {e}")
+            return f"Error performing web search: {str(e)}"
+
+    async def asearch(self, query: str, max_results: int = 5, search_depth: str = "advanced") -> str:
+        """
+        Non-blocking web search (event loop block nahi hota), backed by a TTL cache.
+        
+        Args:
+            query (str): The search query.
+            max_results (int): Maximum number of results to return.
+            search_depth (str): Tavily search depth ('basic' or 'advanced').
             
-            return "\n".join(formatted_results) if formatted_results else "No relevant information found."
+        Returns:
+            str: A formatted string containing the search results.
+        """
+        if not self.api_key:
+            return "Web search is currently unavailable (API Key missing)."
+
+        key = self._cache_key(query, max_results, search_depth)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        try:
+            async_client = await client_ready(self, "async_client")
+            async with self._semaphore:
+                if async_client is not None:
+                    response = await observe_call("tavily", "search", async_client.search(
+                        query, search_depth=search_depth, max_results=max_results
+                    ))
+                else:
+                    loop = asyncio.get_running_loop()
+                    response = await observe_call("tavily", "search", loop.run_in_executor(
+                        self._executor,
+                        lambda: self.client.search(query, search_depth=search_depth, max_results=max_results)
+                    ))
+            formatted = self._format_results(response)
+            self.cache.set(key, formatted)
+            return formatted
         except Exception as e:
             print(f"Error searching with TavilyService: {e}")
             return f"Error performing web search: {str(e)}"
 
+    def cache_stats(self) -> dict:
+        return self.cache.stats()
+
+    @staticmethod
+    def _cache_key(query: str, max_results: int, search_depth: str) -> tuple:
+        normalized = re.sub(r"\s+", " ", query.strip().lower()).rstrip("?!.")
+        return (normalized, max_results, search_depth)
+
+    @staticmethod
+    def _format_results(response: dict) -> str:
+        results = response.get("results", [])
+
+        formatted_results = []
+        for result in results:
+            title = result.get("title", "No Title")
+            url = result.get("url", "#")
+            content = result.get("content", "No Content")
+            formatted_results.append(f"Source: {title} ({url})\nContent: {content}\n")
+
+        return "\n".join(formatted_results) if formatted_results else "No relevant information found."
+
 tavily_service = TavilyService()
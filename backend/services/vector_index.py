@@ -0,0 +1,209 @@
+import json
+import os
+import re
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from sqlalchemy import and_, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import Scheme, SchemeEmbedding
+from services.scheme_cards import card_with_id
+
+# Persisted meta (cards) ka format; badle to purani mmap files reuse nahi hoti
+INDEX_FORMAT = "cards/v1"
+
+
+class SchemeVectorIndex:
+    """
+    In-process copy of the scheme catalog for retrieval: contiguous float32 matrix of normalized
+    embeddings + precomputed card dicts (schemes.card). Top-k = ek matmul + argpartition (microseconds).
+    VECTOR_INDEX_PATH set ho to matrix .npy file se memory-map hota hai, taaki saare workers
+    same pages share karein. Postgres source of truth rehta hai; index na ho to wahi fallback hai.
+    """
+
+    def __init__(self):
+        self.enabled = os.getenv("VECTOR_INDEX_ENABLED", "true").lower() == "true"
+        self.path = os.getenv("VECTOR_INDEX_PATH") or None
+        self.refresh_seconds = float(os.getenv("VECTOR_INDEX_REFRESH_SECONDS", "60"))
+        self.matrix: Optional[np.ndarray] = None
+        self.ids: np.ndarray = np.zeros(0, dtype=np.int64)
+        self.cards: List[Dict[str, Any]] = []
+        self.source: Optional[str] = None
+        self.model_id: Optional[str] = None  # None = legacy schemes.embedding column
+        self._signature: Optional[list] = None
+        self._checked_at = 0.0
+        self.searches = 0
+        self.search_seconds = 0.0
+
+    @property
+    def ready(self) -> bool:
+        return self.matrix is not None and len(self.cards) > 0
+
+    def invalidate(self):
+        """Forces a signature check on the next ensure_fresh() (call after catalog writes)."""
+        self._signature = None
+        self._checked_at = 0.0
+
+    async def ensure_fresh(self, db: AsyncSession, model_id: Optional[str] = None):
+        """
+        Reloads the index if the schemes table (or the model's embeddings) changed, or the
+        active model switched. Checked at most every refresh_seconds.
+
+        Args:
+            db (AsyncSession): Database session.
+            model_id (str): Versioned model in scheme_embeddings; None = schemes.embedding.
+        """
+        now = time.monotonic()
+        if (self._signature is not None and model_id == self.model_id
+                and now - self._checked_at < self.refresh_seconds):
+            return
+        self._checked_at = now
+
+        # updated_at in-place upserts (ingestion) bhi pakadta hai; str() taaki meta JSON me save ho sake
+        signature = [INDEX_FORMAT, str(model_id)] + [str(value) for value in (await db.execute(
+            select(func.count(Scheme.id), func.max(Scheme.id), func.max(Scheme.updated_at))
+        )).one()]
+        if model_id is not None:
+            signature += [str(value) for value in (await db.execute(
+                select(func.count(SchemeEmbedding.scheme_id), func.max(SchemeEmbedding.updated_at))
+                .where(SchemeEmbedding.model_id == model_id)
+            )).one()]
+        if signature == self._signature:
+            return
+
+        # Reload fail ho to agli call dobara try kare (purana matrix kabhi naye model ke naam se serve na ho)
+        self._signature = None
+        self.model_id = model_id
+        if self.path and self._load(signature):
+            self._signature = signature
+            return
+
+        # Slim projection: id + precomputed card + vector (baaki columns nahi)
+        if model_id is None:
+            stmt = select(Scheme.id, Scheme.card, Scheme.embedding).where(Scheme.embedding.isnot(None))
+        else:
+            stmt = (
+                select(Scheme.id, Scheme.card, SchemeEmbedding.embedding)
+                .join(SchemeEmbedding, and_(SchemeEmbedding.scheme_id == Scheme.id, SchemeEmbedding.model_id == model_id))
+            )
+        rows = (await db.execute(stmt.where(Scheme.card.isnot(None)).order_by(Scheme.id))).all()
+        self.build(rows)
+        self._signature = signature
+        if self.path:
+            self._save(signature)
+
+    def build(self, rows: Sequence[Sequence[Any]]):
+        """rows: (id, card, embedding) tuples."""
+        cards, vectors = [], []
+        for scheme_id, card, embedding in rows:
+            cards.append(card_with_id(scheme_id, card))
+            vectors.append(np.asarray(embedding, dtype=np.float32))
+
+        if vectors:
+            matrix = np.ascontiguousarray(np.stack(vectors), dtype=np.float32)
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            matrix /= norms
+        else:
+            matrix = None
+
+        self.matrix = matrix
+        self.ids = np.array([int(card["id"]) for card in cards], dtype=np.int64)
+        self.cards = cards
+        self.source = "memory"
+        print(f"✅ Scheme vector index built ({len(cards)} schemes).")
+
+    def search(self, query_embedding, k: int, eligible_ids: Optional[List[int]] = None) -> List[Dict[str, Any]]:
+        """
+        Top-k schemes by cosine similarity.
+
+        Args:
+            query_embedding (list): Query vector (any norm).
+            k (int): Number of candidates to return.
+            eligible_ids (list): Restrict to these scheme ids (None = whole catalog).
+
+        Returns:
+            list: Card dict copies with vector_score, best first.
+        """
+        started = time.perf_counter()
+        query = np.asarray(query_embedding, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1.0)
+        sims = self.matrix @ query
+
+        if eligible_ids is not None:
+            sims = np.where(np.isin(self.ids, eligible_ids), sims, -np.inf)
+
+        k = min(k, len(sims))
+        if k <= 0:
+            return []
+        top = np.argpartition(-sims, k - 1)[:k] if k < len(sims) else np.arange(len(sims))
+        top = top[np.argsort(-sims[top], kind="stable")]
+
+        results = [
+            dict(self.cards[i], vector_score=round(float(sims[i]), 4))
+            for i in top if np.isfinite(sims[i])
+        ]
+        self.searches += 1
+        self.search_seconds += time.perf_counter() - started
+        return results
+
+    def _files(self) -> Dict[str, str]:
+        slug = re.sub(r"[^a-z0-9]+", "_", self.model_id.lower()) if self.model_id else "legacy"
+        return {
+            "matrix": os.path.join(self.path, f"schemes_{slug}_matrix.npy"),
+            "meta": os.path.join(self.path, f"schemes_{slug}_meta.json"),
+        }
+
+    def _load(self, signature: list) -> bool:
+        files = self._files()
+        try:
+            with open(files["meta"], "r") as f:
+                meta = json.load(f)
+            if meta.get("signature") != signature:
+                return False
+            matrix = np.load(files["matrix"], mmap_mode="r")
+        except (OSError, ValueError):
+            return False
+
+        self.matrix = matrix
+        self.cards = meta["cards"]
+        self.ids = np.array([int(card["id"]) for card in self.cards], dtype=np.int64)
+        self.source = "mmap"
+        print(f"✅ Scheme vector index mapped from {files['matrix']} ({len(self.cards)} schemes).")
+        return True
+
+    def _save(self, signature: list):
+        if self.matrix is None:
+            return
+        files = self._files()
+        try:
+            os.makedirs(self.path, exist_ok=True)
+            # Temp file + rename: doosra worker kabhi aadhi likhi file map nahi karta
+            tmp_matrix = files["matrix"] + f".{os.getpid()}.tmp.npy"
+            np.save(tmp_matrix, self.matrix)
+            os.replace(tmp_matrix, files["matrix"])
+            tmp_meta = files["meta"] + f".{os.getpid()}.tmp"
+            with open(tmp_meta, "w") as f:
+                json.dump({"signature": signature, "cards": self.cards}, f)
+            os.replace(tmp_meta, files["meta"])
+        except OSError as e:
+            print(f"⚠️ Could not persist vector index to {self.path}: {e}")
+            return
+        # Apni copy bhi mapped file pe switch karo (page cache workers me shared)
+        self._load(signature)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "ready": self.ready,
+            "source": self.source,
+            "model": self.model_id or "legacy",
+            "size": len(self.cards),
+            "searches": self.searches,
+            "avg_search_us": round(self.search_seconds / self.searches * 1e6, 2) if self.searches else 0.0,
+        }
+
+
+vector_index = SchemeVectorIndex()
@@ -0,0 +1,104 @@
+import asyncio
+import os
+import sys
+import time
+
+# Add backend directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.chat_history_service import ChatHistoryService
+
+# Offline: _write stub hai (DB nahi), sirf write-behind queue ka shutdown behaviour
+
+
+def make_service(delay: float = 0.0, error: Exception = None):
+    service = ChatHistoryService()
+    service.sync = False
+    service.flush_interval = 0.01
+    service.batch_size = 1
+    written = []
+
+    async def write(rows):
+        await asyncio.sleep(delay)
+        if error:
+            raise error
+        written.extend(row["content"] for row in rows)
+
+    async def reachable():
+        return False
+
+    service._write = write
+    service._db_reachable = reachable
+    return service, written
+
+
+def test_stop_waits_for_inflight_write():
+    print("\n--- ChatHistoryService: stop() during a slow write ---")
+
+    async def run():
+        service, written = make_service(delay=0.05)
+        for i in range(4):
+            service.enqueue("s1", "user", f"m{i}")
+        await asyncio.sleep(0.03)  # writer ab pehle batch ke beech me hai
+        await service.stop()
+        assert written == ["m0", "m1", "m2", "m3"]
+        assert service.stats()["pending"] == 0
+
+    asyncio.run(run())
+    print("✅ No queued message lost on shutdown")
+
+
+def test_stop_drains_during_backoff():
+    print("\n--- ChatHistoryService: stop() while backing off ---")
+
+    async def run():
+        service, written = make_service()
+        service.enqueue("s1", "user", "queued")
+        service._retry_at = time.monotonic() + 60
+        await service.flush()
+        assert written == [], "regular flush honours the back-off"
+        await service.stop()
+        assert written == ["queued"]
+
+    asyncio.run(run())
+    print("✅ Final drain ignores the back-off window")
+
+
+def test_cancelled_write_requeues_batch():
+    print("\n--- ChatHistoryService: writer cancelled mid-write ---")
+
+    async def run():
+        service, written = make_service(delay=1.0)
+        service.enqueue("s1", "user", "a")
+        service.enqueue("s1", "assistant", "b")
+        await asyncio.sleep(0.03)  # background writer "a" likh raha hai
+        service._writer.cancel()
+        try:
+            await service._writer
+        except asyncio.CancelledError:
+            pass
+        assert [row["content"] for row in service._pending] == ["a", "b"]
+
+    asyncio.run(run())
+    print("✅ Batch goes back to the front of the queue")
+
+
+def test_unwritten_messages_stay_queued_when_db_down():
+    print("\n--- ChatHistoryService: stop() with the DB down ---")
+
+    async def run():
+        service, written = make_service(error=ConnectionError("db down"))
+        service.enqueue("s1", "user", "lost?")
+        await service.stop()
+        assert written == [] and service.stats()["pending"] == 1
+        assert service.dead_lettered == 0
+
+    asyncio.run(run())
+    print("✅ Not dead-lettered, reported as unwritten")
+
+
+if __name__ == "__main__":
+    test_stop_waits_for_inflight_write()
+    test_stop_drains_during_backoff()
+    test_cancelled_write_requeues_batch()
+    test_unwritten_messages_stay_queued_when_db_down()
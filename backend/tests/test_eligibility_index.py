@@ -0,0 +1,87 @@
+import json
+import os
+import sys
+
+# Add backend directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.eligibility_index import EligibilityIndex
+
+# Offline: synthetic criteria + seed catalog (data/schemes.json), koi DB nahi
+CATALOG_PATH = os.path.join(os.path.dirname(__file__), '..', 'data', 'schemes.json')
+
+ROWS = [
+    (10, {"social_category": ["All"], "geography": "India", "sector": "All Sectors", "min_age": 18}),
+    (11, {"social_category": ["SC", "ST"], "geography": "India", "sector": "Manufacturing", "min_age": 18}),
+    (12, {"social_category": ["Women"], "geography": "Uttar Pradesh", "sector": "Textiles", "min_age": 21}),
+    (13, {"social_category": ["All"], "geography": "Northeast India", "sector": "Multi-sector", "min_age": 15}),
+    (14, None),
+]
+
+
+def build(rows) -> EligibilityIndex:
+    index = EligibilityIndex()
+    index.build(rows)
+    return index
+
+
+def test_bitset_filters():
+    print("\n--- EligibilityIndex: per-dimension filters ---")
+    index = build(ROWS)
+    cases = [
+        ({"social_category": "SC"}, [10, 11, 13, 14]),
+        ({"gender": "female"}, [10, 12, 13, 14]),
+        ({"location": "Noida"}, [10, 11, 12, 14]),
+        ({"state": "Assam"}, [10, 11, 13, 14]),
+        ({"industry": "Textiles"}, [10, 12, 13, 14]),
+        ({"age": 16}, [13, 14]),
+        ({"social_category": "SC", "location": "Assam", "age": 30}, [10, 11, 13, 14]),
+    ]
+    for profile, expected in cases:
+        result = index.eligible_ids(profile)
+        status = "✅" if result == expected else "❌"
+        print(f"{status} {profile} -> {result}")
+        assert result == expected
+
+
+def test_unfiltered_profiles_return_none():
+    print("\n--- EligibilityIndex: nothing excluded -> None (no SQL pre-filter) ---")
+    index = build(ROWS)
+    for profile in (None, {}, {"location": "Mars"}, {"industry": "Quantum Widgets"}, {"age": "unknown"}):
+        assert index.eligible_ids(profile) is None, profile
+    # Generic "category" business category hai, caste category nahi
+    assert index.eligible_ids({"category": "SC"}) is None
+    print("✅ Missing/unknown values and generic 'category' don't filter")
+
+
+def test_seed_catalog_without_profile_keeps_region_schemes():
+    print("\n--- EligibilityIndex: seed catalog ---")
+    with open(CATALOG_PATH, "r", encoding="utf-8") as f:
+        catalog = json.load(f)
+    index = build([(i + 1, scheme.get("eligibility_criteria")) for i, scheme in enumerate(catalog)])
+    ids_by_name = {scheme["name"]: i + 1 for i, scheme in enumerate(catalog)}
+    regional = {
+        name: scheme_id for name, scheme_id in ids_by_name.items()
+        if any(key in name for key in ("UNNATI", "PoK/Chhamb", "Rubber Plantation"))
+    }
+    assert len(regional) == 3
+
+    # Frontend profile nahi bhejta: graph state me koi placeholder profile nahi aana chahiye...
+    from main import ChatRequest, build_initial_state
+    assert build_initial_state(ChatRequest(message="Tell me about UNNATI"))["user_profile"] is None
+
+    # ...aur poora catalog searchable rehna chahiye
+    for profile in (None, {}, {"category": "Manufacturing"}, {"category": "General"}):
+        assert index.eligible_ids(profile) is None, f"{profile} must not exclude schemes"
+
+    # Region wala profile apne region ke schemes rakhta hai
+    by_key = {key: scheme_id for name, scheme_id in regional.items() for key in ("UNNATI", "PoK") if key in name}
+    assert by_key["UNNATI"] in index.eligible_ids({"location": "Assam"})
+    assert by_key["PoK"] in index.eligible_ids({"location": "Jammu and Kashmir"})
+    print(f"✅ {len(catalog)} schemes searchable without a profile, regional schemes kept for their region")
+
+
+if __name__ == "__main__":
+    test_bitset_filters()
+    test_unfiltered_profiles_return_none()
+    test_seed_catalog_without_profile_keeps_region_schemes()
@@ -0,0 +1,65 @@
+import asyncio
+import os
+import sys
+import tempfile
+import threading
+
+# Add backend directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.embedding_cache import EmbeddingCache
+
+# Offline: temp sqlite file, koi embedding API nahi
+
+
+def test_memory_then_disk_tier():
+    print("\n--- EmbeddingCache: LRU -> sqlite -> miss ---")
+
+    async def run():
+        with tempfile.TemporaryDirectory() as path:
+            disk_path = os.path.join(path, "embeddings.db")
+            cache = EmbeddingCache(maxsize=1, disk_path=disk_path, flush_seconds=0.01)
+            cache.set("a", [1.0, 2.0])
+            cache.set("b", [3.0, 4.0])  # "a" LRU se bahar, lekin disk queue me
+            assert await cache.get_many(["b", "a", "c"]) == [[3.0, 4.0], [1.0, 2.0], None]
+            assert (cache.memory_hits, cache.disk_hits, cache.misses) == (1, 1, 1)
+            await cache.aclose()
+
+            # Restart: naya instance disk se padhta hai
+            restarted = EmbeddingCache(disk_path=disk_path)
+            assert await restarted.get("b") == [3.0, 4.0] and restarted.disk_hits == 1
+            await restarted.aclose()
+
+    asyncio.run(run())
+    print("✅ Vectors survive LRU eviction and restarts")
+
+
+def test_writes_batched_off_the_loop():
+    print("\n--- EmbeddingCache: one commit per flush window, on the disk thread ---")
+
+    async def run():
+        with tempfile.TemporaryDirectory() as path:
+            cache = EmbeddingCache(disk_path=os.path.join(path, "embeddings.db"), flush_seconds=0.05)
+            threads = set()
+            original_write = cache._write
+
+            def write():
+                threads.add(threading.current_thread().name)
+                original_write()
+
+            cache._write = write
+            for i in range(50):
+                cache.set(f"k{i}", [float(i)])
+            assert cache.disk_writes == 0, "set() must not write inline"
+            await asyncio.sleep(0.1)
+            assert cache.disk_writes == 1
+            assert all(name.startswith("embedding-cache") for name in threads)
+            await cache.aclose()
+
+    asyncio.run(run())
+    print("✅ 50 sets -> 1 transaction, never on the event loop thread")
+
+
+if __name__ == "__main__":
+    test_memory_then_disk_tier()
+    test_writes_batched_off_the_loop()
@@ -0,0 +1,30 @@
+import asyncio
+import os
+import sys
+
+# Add backend directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agents.intent_classifier import intent_classifier
+from agents.router import ROUTER_CONFIDENCE_THRESHOLD, get_routing_stats
+
+async def test_fast_path():
+    print("\n--- Testing Local Intent Classifier (Keyword Fast Path) ---")
+
+    test_cases = [
+        {"query": "hey", "expected": "general"},
+        {"query": "How do I promote my restaurant on Instagram?", "expected": "marketing"},
+        {"query": "Any government loan schemes for women?", "expected": "scheme"},
+        {"query": "Give me a tagline and logo idea for my brand", "expected": "brand"},
+    ]
+
+    for case in test_cases:
+        result = await intent_classifier.classify(case["query"], ROUTER_CONFIDENCE_THRESHOLD)
+        fast = result["confidence"] >= ROUTER_CONFIDENCE_THRESHOLD
+        status = "✅" if result["category"] == case["expected"] and fast else "❌"
+        print(f"{status} '{case['query']}' -> {result['category']} ({result['source']}, {result['confidence']})")
+
+    print(f"\nRouting stats: {get_routing_stats()}")
+
+if __name__ == "__main__":
+    asyncio.run(test_fast_path())
@@ -0,0 +1,131 @@
+import asyncio
+import os
+import sys
+
+# Add backend directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.llm_pool import LLMProvider, ProviderPool
+from services.mimo_service import mimo_service, ERROR_RESPONSE
+
+# Offline: providers stub coroutines hain (delay + answer ya error), koi API call nahi
+
+
+def stub(answer: str = None, delay: float = 0.0, error: Exception = None, log: list = None):
+    async def complete(prompt: str) -> str:
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            if log is not None:
+                log.append("cancelled")
+            raise
+        if error:
+            raise error
+        return answer
+    return complete
+
+
+def provider(name: str, timeout: float = 5.0, **kwargs) -> LLMProvider:
+    return LLMProvider(name, stub(**kwargs), timeout)
+
+
+def test_hedge_wins():
+    print("\n--- Pool: slow primary, hedge to backup ---")
+
+    async def run():
+        log = []
+        primary = provider("openrouter", answer="slow", delay=1.0, log=log)
+        backup = provider("gemini", answer="fast", delay=0.01)
+        pool = ProviderPool([primary, backup], hedging=True, hedge_default_delay=0.05)
+        assert await pool.complete("hi") == "fast"
+        await asyncio.sleep(0.01)
+        assert pool.hedges == 1 and pool.hedge_wins == 1 and pool.failovers == 0
+        # Loser cancel hota hai aur failure nahi gina jaata
+        assert log == ["cancelled"] and primary.failures == 0
+
+    asyncio.run(run())
+    print("✅ Backup answer returned, primary cancelled")
+
+
+def test_primary_answers_before_hedge_delay():
+    print("\n--- Pool: primary within hedge delay ---")
+
+    async def run():
+        backup = provider("gemini", answer="backup")
+        pool = ProviderPool([provider("openrouter", answer="primary", delay=0.01), backup],
+                            hedging=True, hedge_default_delay=0.5)
+        assert await pool.complete("hi") == "primary"
+        assert pool.hedges == 0 and backup.successes == 0
+
+    asyncio.run(run())
+    print("✅ No duplicate request when primary is fast")
+
+
+def test_primary_error_fails_over():
+    print("\n--- Pool: primary error -> next provider ---")
+
+    async def run():
+        primary = provider("openrouter", error=RuntimeError("502 upstream"))
+        backup = provider("gemini", answer="from gemini")
+        pool = ProviderPool([primary, backup])
+        assert await pool.complete("hi") == "from gemini"
+        assert pool.failovers == 1 and primary.failures == 1 and backup.successes == 1
+
+        # Timeout bhi failover hai
+        slow = provider("openrouter", answer="late", delay=1.0, timeout=0.05)
+        pool = ProviderPool([slow, provider("gemini", answer="on time")])
+        assert await pool.complete("hi") == "on time"
+        assert slow.timeouts == 1
+
+        # Hedged primary jaldi fail ho to backup seedha (hedge delay ka wait nahi)
+        pool = ProviderPool([provider("openrouter", error=RuntimeError("401")), provider("gemini", answer="direct")],
+                            hedging=True, hedge_default_delay=5)
+        assert await asyncio.wait_for(pool.complete("hi"), timeout=1) == "direct"
+
+    asyncio.run(run())
+    print("✅ Errors and timeouts fail over in order")
+
+
+def test_skip_and_empty_response():
+    print("\n--- Pool: skip list, empty answer counts as failure ---")
+
+    async def run():
+        empty = provider("openrouter", answer="")
+        pool = ProviderPool([empty, provider("gemini", answer="ok")])
+        assert await pool.complete("hi") == "ok" and empty.failures == 1
+        assert await pool.complete("hi", skip=("openrouter",)) == "ok"
+        assert empty.failures == 1, "skipped provider must not be called"
+
+    asyncio.run(run())
+    print("✅ Skip honoured, empty completion fails over")
+
+
+def test_all_providers_fail():
+    print("\n--- Pool: every provider fails -> ERROR_RESPONSE ---")
+
+    async def run():
+        pool = ProviderPool([provider("openrouter", error=RuntimeError("429")),
+                             provider("gemini", error=RuntimeError("quota"))])
+        try:
+            await pool.complete("hi")
+            raise AssertionError("pool.complete must raise when every provider fails")
+        except RuntimeError as e:
+            assert "All LLM providers failed" in str(e)
+
+        original_pool = mimo_service.pool
+        mimo_service.pool = pool
+        try:
+            assert await mimo_service.generate_text("all down?") == ERROR_RESPONSE
+        finally:
+            mimo_service.pool = original_pool
+
+    asyncio.run(run())
+    print("✅ RuntimeError from the pool, apology text from MimoService")
+
+
+if __name__ == "__main__":
+    test_hedge_wins()
+    test_primary_answers_before_hedge_delay()
+    test_primary_error_fails_over()
+    test_skip_and_empty_response()
+    test_all_providers_fail()
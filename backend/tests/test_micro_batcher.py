@@ -0,0 +1,105 @@
+import asyncio
+import os
+import sys
+import time
+
+# Add backend directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.micro_batcher import MicroBatcher
+
+# Offline: batch_fn stub jo har batch record karta hai
+
+
+class BatchStub:
+    def __init__(self, error: Exception = None, drop_last: bool = False):
+        self.batches = []
+        self.error = error
+        self.drop_last = drop_last
+
+    async def __call__(self, items):
+        self.batches.append(list(items))
+        await asyncio.sleep(0)
+        if self.error:
+            raise self.error
+        results = [f"vec:{item}" for item in items]
+        return results[:-1] if self.drop_last else results
+
+
+def test_flush_after_window():
+    print("\n--- MicroBatcher: concurrent submits within the window ---")
+
+    async def run():
+        stub = BatchStub()
+        batcher = MicroBatcher("test", stub, window_seconds=0.05, max_batch=100)
+        started = time.perf_counter()
+        results = await asyncio.gather(*(batcher.submit(i) for i in range(5)))
+        elapsed = time.perf_counter() - started
+        assert results == [f"vec:{i}" for i in range(5)]
+        assert stub.batches == [[0, 1, 2, 3, 4]]
+        assert elapsed >= 0.04, "batch must wait for the window"
+        assert batcher.stats()["batches"] == 1 and batcher.stats()["pending"] == 0
+
+    asyncio.run(run())
+    print("✅ One batch call, results in submit order")
+
+
+def test_flush_on_max_batch():
+    print("\n--- MicroBatcher: max_batch reached before the window ---")
+
+    async def run():
+        stub = BatchStub()
+        batcher = MicroBatcher("test", stub, window_seconds=5, max_batch=3)
+        started = time.perf_counter()
+        results = await asyncio.wait_for(asyncio.gather(*(batcher.submit(i) for i in range(3))), timeout=1)
+        assert results == ["vec:0", "vec:1", "vec:2"]
+        assert time.perf_counter() - started < 1, "full batch must not wait for the window"
+
+        # Overflow: 4 items -> ek full batch turant, baaki 1 window ke baad
+        batcher.window_seconds = 0.02
+        await asyncio.gather(*(batcher.submit(i) for i in range(4)))
+        assert stub.batches[1:] == [[0, 1, 2], [3]]
+
+    asyncio.run(run())
+    print("✅ Size-triggered flush cancels the pending timer")
+
+
+def test_batch_error_fails_every_item():
+    print("\n--- MicroBatcher: batch call raises ---")
+
+    async def run():
+        batcher = MicroBatcher("test", BatchStub(error=RuntimeError("quota")), window_seconds=0.01)
+        results = await asyncio.gather(*(batcher.submit(i) for i in range(3)), return_exceptions=True)
+        assert all(isinstance(r, RuntimeError) for r in results)
+
+        short = MicroBatcher("test", BatchStub(drop_last=True), window_seconds=0.01)
+        results = await asyncio.gather(*(short.submit(i) for i in range(2)), return_exceptions=True)
+        assert all(isinstance(r, ValueError) for r in results), "result count mismatch must not mis-assign"
+
+    asyncio.run(run())
+    print("✅ Errors and short results reach every caller")
+
+
+def test_cancelled_submitter_does_not_break_batch():
+    print("\n--- MicroBatcher: one caller cancelled while waiting ---")
+
+    async def run():
+        stub = BatchStub()
+        batcher = MicroBatcher("test", stub, window_seconds=0.03)
+        leaver = asyncio.create_task(batcher.submit("a"))
+        stayer = asyncio.create_task(batcher.submit("b"))
+        await asyncio.sleep(0.01)
+        leaver.cancel()
+        assert await stayer == "vec:b"
+        assert leaver.cancelled()
+        assert stub.batches == [["a", "b"]]
+
+    asyncio.run(run())
+    print("✅ Remaining callers still get their results")
+
+
+if __name__ == "__main__":
+    test_flush_after_window()
+    test_flush_on_max_batch()
+    test_batch_error_fails_every_item()
+    test_cancelled_submitter_does_not_break_batch()
@@ -0,0 +1,70 @@
+import os
+import sys
+
+# Add backend directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.scheme_ranker import HybridRanker
+
+# Offline: ranker sirf numpy hai, koi API/DB call nahi
+CARDS = [
+    {"id": "1", "name": "Stand-Up India", "description": "Bank loans for women and SC/ST entrepreneurs",
+     "benefits": ["Loan 10 lakh to 1 crore"], "tags": ["women", "loan"]},
+    {"id": "2", "name": "PM Vishwakarma", "description": "Support for artisans and craftspeople",
+     "benefits": ["Toolkit grant"], "tags": ["artisans"]},
+    {"id": "3", "name": "Mudra Yojana", "description": "Collateral-free micro loans",
+     "benefits": ["Loan up to 10 lakh"], "tags": ["loan", "micro"]},
+    {"id": "4", "name": "Export Promotion", "description": "Market access for exporters",
+     "benefits": ["Trade fair support"], "tags": ["export"]},
+]
+
+
+def ids(ranked):
+    return [card["id"] for card in ranked]
+
+
+def test_text_match_breaks_equal_similarity():
+    print("\n--- Ranker: equal cosine, BM25 + tags decide ---")
+    ranked = HybridRanker().rank("loan for women entrepreneurs", CARDS, [0.5] * 4, limit=3)
+    print(f"Order: {ids(ranked)} scores: {[c['relevance_score'] for c in ranked]}")
+    assert ids(ranked) == ["1", "3", "2"]
+    assert ranked[0]["explanation"] == "Matches your query on: entrepreneurs, loan, women."
+    print("✅ Full text match ranks first, partial match second")
+
+
+def test_cosine_dominates_without_text_match():
+    print("\n--- Ranker: no query term matches, cosine order ---")
+    ranked = HybridRanker().rank("something unrelated", CARDS, [0.3, 0.8, 0.5, 0.1], limit=4)
+    print(f"Order: {ids(ranked)}")
+    assert ids(ranked) == ["2", "3", "1", "4"]
+    assert all(c["explanation"] == "Closely related to your query by meaning." for c in ranked)
+    print("✅ Pure semantic ordering when BM25/tags are zero")
+
+
+def test_fusion_weights():
+    print("\n--- Ranker: strong cosine vs strong text match ---")
+    ranked = HybridRanker().rank("loan for women entrepreneurs", CARDS, [0.2, 0.9, 0.6, 0.1], limit=3)
+    print(f"Order: {ids(ranked)} scores: {[c['relevance_score'] for c in ranked]}")
+    # 0.6 cosine weight: 0.9 similarity ek weak text-only match se upar rehti hai
+    assert ids(ranked) == ["2", "1", "3"]
+    assert all(0 <= c["relevance_score"] <= 100 for c in ranked)
+    print("✅ Weighted fusion order matches RANK_WEIGHT_* defaults")
+
+
+def test_deterministic_and_non_mutating():
+    print("\n--- Ranker: reproducible, input cards untouched ---")
+    ranker = HybridRanker()
+    first = ranker.rank("micro loan", CARDS, [0.4, 0.4, 0.4, 0.4], limit=4)
+    second = ranker.rank("micro loan", CARDS, [0.4, 0.4, 0.4, 0.4], limit=4)
+    assert ids(first) == ids(second)
+    assert first[0]["id"] == "3"
+    assert "relevance_score" not in CARDS[0]
+    assert ranker.rank("loan", [], [], limit=3) == []
+    print("✅ Same input -> same order, candidates are copied")
+
+
+if __name__ == "__main__":
+    test_text_match_breaks_equal_similarity()
+    test_cosine_dominates_without_text_match()
+    test_fusion_weights()
+    test_deterministic_and_non_mutating()
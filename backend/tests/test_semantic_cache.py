@@ -0,0 +1,84 @@
+import os
+import sys
+import time
+
+# Add backend directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.semantic_cache import SemanticCache
+
+# Offline: chhote hand-made vectors, cosine similarity seedha calculate ho jaati hai
+QUERY = [1.0, 0.0, 0.0]
+NEAR = [1.0, 0.2, 0.0]    # cosine ~0.98
+FAR = [1.0, 0.5, 0.0]     # cosine ~0.89
+OTHER = [0.0, 1.0, 0.0]
+
+
+def make_cache(threshold: float = 0.95, ttl_seconds: float = 60, max_entries: int = 10) -> SemanticCache:
+    cache = SemanticCache()
+    cache.threshold = threshold
+    cache.ttl_seconds = ttl_seconds
+    cache.max_entries = max_entries
+    return cache
+
+
+def test_similarity_threshold():
+    print("\n--- SemanticCache: threshold ---")
+    cache = make_cache(threshold=0.95)
+    cache.store("general", QUERY, "cached answer", latency=2.0)
+    assert cache.lookup("general", [2.0, 0.0, 0.0]) == "cached answer", "norm must not matter"
+    assert cache.lookup("general", NEAR) == "cached answer"
+    assert cache.lookup("general", FAR) is None
+    assert cache.lookup("general", OTHER) is None
+    assert cache.hits == 2 and cache.misses == 2
+    assert cache.stats()["saved_latency_seconds"] == 4.0
+
+    cache.threshold = 0.85
+    assert cache.lookup("general", FAR) == "cached answer"
+    print("✅ Hit at/above threshold, miss below")
+
+
+def test_scopes_are_isolated():
+    print("\n--- SemanticCache: per-agent scopes ---")
+    cache = make_cache()
+    cache.store("brand", QUERY, "brand answer", latency=1.0)
+    assert cache.lookup("finance", QUERY) is None
+    assert cache.lookup("brand", QUERY) == "brand answer"
+    print("✅ Same query, different agent -> miss")
+
+
+def test_ttl_expiry():
+    print("\n--- SemanticCache: TTL ---")
+    cache = make_cache(ttl_seconds=0.05)
+    cache.store("general", QUERY, "stale soon", latency=1.0)
+    assert cache.lookup("general", QUERY) == "stale soon"
+    time.sleep(0.06)
+    assert cache.lookup("general", QUERY) is None
+    assert cache.stats()["entries"]["general"] == 0, "expired entry must be evicted"
+
+    # Fresh store ke baad phir hit
+    cache.store("general", QUERY, "fresh", latency=1.0)
+    assert cache.lookup("general", NEAR) == "fresh"
+    print("✅ Expired entries miss and are dropped")
+
+
+def test_near_duplicate_store_replaces_entry():
+    print("\n--- SemanticCache: bypass refresh + LRU bound ---")
+    cache = make_cache(max_entries=2)
+    cache.store("general", QUERY, "old", latency=1.0)
+    cache.store("general", NEAR, "new", latency=1.0)
+    assert cache.stats()["entries"]["general"] == 1
+    assert cache.lookup("general", QUERY) == "new"
+
+    cache.store("general", OTHER, "other", latency=1.0)
+    cache.store("general", [0.0, 0.0, 1.0], "third", latency=1.0)
+    assert cache.stats()["entries"]["general"] == 2
+    assert cache.lookup("general", QUERY) is None, "least recently used entry is evicted"
+    print("✅ Near-duplicates refresh in place, size stays bounded")
+
+
+if __name__ == "__main__":
+    test_similarity_threshold()
+    test_scopes_are_isolated()
+    test_ttl_expiry()
+    test_near_duplicate_store_replaces_entry()
@@ -0,0 +1,127 @@
+import asyncio
+import os
+import sys
+
+# Add backend directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.singleflight import SingleFlight, payload_key
+
+# Offline: upstream call ki jagah counter wala stub
+
+
+class Upstream:
+    def __init__(self, delay: float = 0.05, result="ok", error: Exception = None):
+        self.delay = delay
+        self.result = result
+        self.error = error
+        self.calls = 0
+        self.cancelled = 0
+
+    async def __call__(self):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.error:
+            raise self.error
+        return self.result
+
+
+def test_identical_calls_coalesce():
+    print("\n--- SingleFlight: 10 identical concurrent calls ---")
+
+    async def run():
+        flight, upstream = SingleFlight("test"), Upstream()
+        results = await asyncio.gather(*(flight.do("k", upstream) for _ in range(10)))
+        assert results == ["ok"] * 10
+        assert upstream.calls == 1
+        assert flight.stats()["coalesced"] == 9 and flight.stats()["in_flight"] == 0
+
+        # Result cache nahi hota: complete hone ke baad same key phir upstream jaati hai
+        await flight.do("k", upstream)
+        assert upstream.calls == 2
+
+    asyncio.run(run())
+    print("✅ One upstream call, all callers get its result")
+
+
+def test_cancelled_waiter_keeps_shared_call():
+    print("\n--- SingleFlight: one of two waiters cancelled ---")
+
+    async def run():
+        flight, upstream = SingleFlight("test"), Upstream()
+        leaver = asyncio.create_task(flight.do("k", upstream))
+        stayer = asyncio.create_task(flight.do("k", upstream))
+        await asyncio.sleep(0.01)
+        leaver.cancel()
+        assert await stayer == "ok"
+        assert leaver.cancelled()
+        assert upstream.calls == 1 and upstream.cancelled == 0
+
+    asyncio.run(run())
+    print("✅ Shared call survives while a waiter remains")
+
+
+def test_last_waiter_leaving_cancels_call():
+    print("\n--- SingleFlight: last waiter cancelled ---")
+
+    async def run():
+        flight, upstream = SingleFlight("test"), Upstream()
+        only = asyncio.create_task(flight.do("k", upstream))
+        await asyncio.sleep(0.01)
+        only.cancel()
+        await asyncio.sleep(0.01)
+        assert upstream.cancelled == 1
+        assert flight.stats()["in_flight"] == 0
+
+    asyncio.run(run())
+    print("✅ Upstream cancelled when nobody waits for it")
+
+
+def test_late_caller_after_cancel_starts_fresh_call():
+    print("\n--- SingleFlight: new caller right after the last waiter left ---")
+
+    async def run():
+        flight, upstream = SingleFlight("test"), Upstream()
+        first = asyncio.create_task(flight.do("k", upstream))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        # Shared task abhi cancel process nahi hua; naya caller usme join nahi karna chahiye
+        late = asyncio.create_task(flight.do("k", upstream))
+        assert await late == "ok"
+        assert upstream.calls == 2
+
+    asyncio.run(run())
+    print("✅ Late caller gets its own call instead of a CancelledError")
+
+
+def test_error_reaches_every_waiter():
+    print("\n--- SingleFlight: upstream error ---")
+
+    async def run():
+        flight, upstream = SingleFlight("test"), Upstream(error=RuntimeError("429"))
+        results = await asyncio.gather(*(flight.do("k", upstream) for _ in range(3)), return_exceptions=True)
+        assert all(isinstance(r, RuntimeError) for r in results)
+        assert upstream.calls == 1 and flight.stats()["in_flight"] == 0
+
+    asyncio.run(run())
+    print("✅ Error shared, key released for the next attempt")
+
+
+def test_payload_key_normalizes_whitespace():
+    print("\n--- payload_key ---")
+    assert payload_key("model", "loan  for\nwomen") == payload_key("model", "loan for women")
+    assert payload_key("model-a", "x") != payload_key("model-b", "x")
+    print("✅ Whitespace-insensitive, model-scoped keys")
+
+
+if __name__ == "__main__":
+    test_identical_calls_coalesce()
+    test_cancelled_waiter_keeps_shared_call()
+    test_last_waiter_leaving_cancels_call()
+    test_late_caller_after_cancel_starts_fresh_call()
+    test_error_reaches_every_waiter()
+    test_payload_key_normalizes_whitespace()
@@ -12,9 +12,12 @@ interface SidebarProps {
   currentSessionId?: string | null;
   onSelectSession?: (id: string) => void;
   onNewChat?: () => void;
+  hasMoreSessions?: boolean;        // Backend next_cursor diya ho to "Load more"
+  onLoadMoreSessions?: () => void;
+  isLoadingMore?: boolean;
 }
 
-export function Sidebar({ isOpen, onClose, sessions = [], currentSessionId, onSelectSession, onNewChat }: SidebarProps) {
+export function Sidebar({ isOpen, onClose, sessions = [], currentSessionId, onSelectSession, onNewChat, hasMoreSessions, onLoadMoreSessions, isLoadingMore }: SidebarProps) {
   const [isMenuOpen, setIsMenuOpen] = useState(false);
 
   return (
@@ -67,6 +70,15 @@ export function Sidebar({ isOpen, onClose, sessions = [], currentSessionId, onSe
                 </button>
               ))
           )}
+          {hasMoreSessions && (
+              <button
+                  onClick={onLoadMoreSessions}
+                  disabled={isLoadingMore}
+                  className="w-full p-2 rounded-lg text-xs text-text-secondary hover:text-white hover:bg-white/5 transition-colors disabled:opacity-40"
+              >
+                {isLoadingMore ? 'Loading...' : 'Load more'}
+              </button>
+          )}
         </div>
         
         {/* User Settings Popover */}
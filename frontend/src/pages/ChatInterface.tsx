@@ -1,11 +1,26 @@
 import React, { useState, useEffect, useRef, useCallback } from 'react';
 import { Send, Sparkles, Menu, ChevronDown, PlusCircle, Square } from 'lucide-react';
-import { Message } from '../types';
+import { Message, HistoryMessage } from '../types';
 import { Message as MessageComponent } from '../components/Message';
 import { Sidebar } from '../components/Sidebar';
-import { chatService } from '../services/api';
+import { chatService, SessionSummary } from '../services/api';
 import { ThinkingWithText } from '../components/ThinkingIndicator';
 
+const toSessionItem = ({ id, title }: SessionSummary) => {
+  let label = title || `Session ${id.slice(0, 8)}`;
+  if (label.length > 35) label = label.substring(0, 35) + '...';
+  return { id, title: label };
+};
+
+const toMessage = (msg: HistoryMessage): Message => ({
+  id: msg.id.toString(),
+  role: msg.role,
+  content: msg.content,
+  timestamp: new Date(msg.timestamp),
+  type: msg.role === 'assistant' && msg.schemes && msg.schemes.length > 0 ? 'scheme-list' : 'text',
+  schemes: msg.schemes || []
+});
+
 export function ChatInterface() {
   // --- States ---
   const [messages, setMessages] = useState<Message[]>([]);
@@ -15,10 +30,16 @@ export function ChatInterface() {
   const [isHistoryLoading, setIsHistoryLoading] = useState(false);
   const [currentSessionId, setCurrentSessionId] = useState<string | null>(null);
   const [sessions, setSessions] = useState<{ id: string; title: string }[]>([]);
+  // Keyset cursors: sidebar ka agla page aur current chat ke purane messages
+  const [sessionsCursor, setSessionsCursor] = useState<string | null>(null);
+  const [historyCursor, setHistoryCursor] = useState<string | null>(null);
+  const [isLoadingMore, setIsLoadingMore] = useState(false);
   
   // Ref for AbortController to stop generation
   const abortControllerRef = useRef<AbortController | null>(null);
   const messagesEndRef = useRef<HTMLDivElement>(null);
+  // Purane messages upar jodne pe bottom tak scroll nahi karna
+  const skipScrollRef = useRef(false);
 
   // --- 1. Session Management ---
   useEffect(() => {
@@ -27,39 +48,35 @@ export function ChatInterface() {
 
   const loadSessions = async () => {
     try {
-      const sessionIds = await chatService.getSessions();
-      const sessionsWithTitles = await Promise.all(
-        sessionIds.map(async (id: string) => {
-          try {
-            const history = await chatService.getSessionHistory(id);
-            const firstUserMsg = history.find((msg: any) => msg.role === 'user');
-            let title = firstUserMsg ? firstUserMsg.content : `Session ${id.slice(0, 8)}`;
-            if (title.length > 35) title = title.substring(0, 35) + '...';
-            return { id, title };
-          } catch (e) {
-            return { id, title: `Chat ${id.slice(0, 5)}` };
-          }
-        })
-      );
-      setSessions(sessionsWithTitles);
+      // Titles summary table se aate hain - per-session history fetch nahi
+      const { sessions: summaries, next_cursor } = await chatService.getSessions();
+      setSessions(summaries.map(toSessionItem));
+      setSessionsCursor(next_cursor);
     } catch (error) {
       console.error("Failed to load sessions", error);
     }
   };
 
+  const loadMoreSessions = async () => {
+    if (!sessionsCursor || isLoadingMore) return;
+    try {
+      setIsLoadingMore(true);
+      const { sessions: summaries, next_cursor } = await chatService.getSessions(sessionsCursor);
+      setSessions(prev => [...prev, ...summaries.map(toSessionItem)]);
+      setSessionsCursor(next_cursor);
+    } catch (error) {
+      console.error("Failed to load more sessions", error);
+    } finally {
+      setIsLoadingMore(false);
+    }
+  };
+
   const loadSessionHistory = async (sessionId: string) => {
     try {
       setIsHistoryLoading(true);
-      const history = await chatService.getSessionHistory(sessionId);
-      const formattedMessages: Message[] = history.map((msg: any) => ({
-        id: msg.id.toString(),
-        role: msg.role,
-        content: msg.content,
-        timestamp: new Date(msg.timestamp),
-        type: msg.role === 'assistant' && msg.schemes?.length > 0 ? 'scheme-list' : 'text',
-        schemes: msg.schemes || []
-      }));
-      setMessages(formattedMessages);
+      const { history, next_cursor } = await chatService.getSessionHistory(sessionId);
+      setMessages(history.map(toMessage));
+      setHistoryCursor(next_cursor);
       setCurrentSessionId(sessionId);
     } catch (error) {
       console.error("Failed to load history", error);
@@ -68,9 +85,25 @@ export function ChatInterface() {
     }
   };
 
+  const loadOlderMessages = async () => {
+    if (!currentSessionId || !historyCursor || isLoadingMore) return;
+    try {
+      setIsLoadingMore(true);
+      const { history, next_cursor } = await chatService.getSessionHistory(currentSessionId, historyCursor);
+      skipScrollRef.current = true;
+      setMessages(prev => [...history.map(toMessage), ...prev]);
+      setHistoryCursor(next_cursor);
+    } catch (error) {
+      console.error("Failed to load older messages", error);
+    } finally {
+      setIsLoadingMore(false);
+    }
+  };
+
   const handleNewChat = () => {
     handleStop(); // Stop any ongoing generation
     setMessages([]);
+    setHistoryCursor(null);
     setCurrentSessionId(null);
     setInput('');
   };
@@ -81,6 +114,10 @@ export function ChatInterface() {
   };
 
   useEffect(() => {
+    if (skipScrollRef.current) {
+      skipScrollRef.current = false;
+      return;
+    }
     scrollToBottom();
   }, [messages, isLoading]);
 
@@ -173,6 +210,9 @@ const handleSend = async (forcedInput?: string) => {
         currentSessionId={currentSessionId}
         onSelectSession={loadSessionHistory}
         onNewChat={handleNewChat}
+        hasMoreSessions={!!sessionsCursor}
+        onLoadMoreSessions={loadMoreSessions}
+        isLoadingMore={isLoadingMore}
       />
 
       <div className="flex-1 flex flex-col relative w-full h-full border-l border-white/5">
@@ -229,6 +269,17 @@ const handleSend = async (forcedInput?: string) => {
           ) : (
             /* Active Chat State */
             <div className="max-w-[850px] mx-auto w-full px-4 md:px-8 py-10 space-y-8">
+              {historyCursor && (
+                <div className="flex justify-center">
+                  <button
+                    onClick={loadOlderMessages}
+                    disabled={isLoadingMore}
+                    className="px-4 py-1.5 rounded-full bg-white/5 border border-white/10 text-xs text-text-secondary hover:text-white hover:bg-white/10 transition-all disabled:opacity-40"
+                  >
+                    {isLoadingMore ? 'Loading...' : 'Load earlier messages'}
+                  </button>
+                </div>
+              )}
               {messages.map((msg) => (
                 <MessageComponent key={msg.id} message={msg} />
               ))}
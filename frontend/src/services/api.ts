@@ -1,4 +1,5 @@
 import api from '../api/axios';
+import { HistoryMessage } from '../types';
 
 // 1. Updated Scheme Interface (Matches your Neon DB + AI Analyst)
 export interface Scheme {
@@ -22,6 +23,25 @@ export interface ChatResponse {
     schemes: Scheme[]; // <--- CRITICAL FIX: TypeScript now knows about schemes
 }
 
+// 3. Sidebar sessions (backend chat_sessions summary, keyset paginated)
+export interface SessionSummary {
+    id: string;
+    title: string | null;
+    message_count: number;
+    last_activity: string;
+}
+
+export interface SessionPage {
+    sessions: SessionSummary[];
+    next_cursor: string | null;
+}
+
+// 4. Chat history page: newest messages first page, next_cursor = older messages
+export interface HistoryPage {
+    history: HistoryMessage[];
+    next_cursor: string | null;
+}
+
 export const chatService = {
     // Agent Chat - The primary endpoint for MAYA Multi-Agent system
     chatAgent: async (message: string, session_id?: string, signal?: AbortSignal): Promise<ChatResponse> => {
@@ -50,21 +70,23 @@ export const chatService = {
     },
     
     // Sessions Management
-    getSessions: async (): Promise<string[]> => {
+    getSessions: async (cursor?: string): Promise<SessionPage> => {
         try {
-            const response = await api.get<{ sessions: string[] }>('/api/history/sessions');
-            return response.data.sessions;
+            const response = await api.get<SessionPage>('/api/history/sessions', { params: { cursor } });
+            return response.data;
         } catch (error) {
             console.error("Error fetching sessions:", error);
             throw error;
         }
     },
 
-    // History for a specific chat
-    getSessionHistory: async (session_id: string) => {
+    // History for a specific chat (newest page; cursor = next_cursor of the previous page for older messages)
+    getSessionHistory: async (session_id: string, cursor?: string): Promise<HistoryPage> => {
         try {
-            const response = await api.get(`/api/history/${session_id}`);
-            return response.data.history || response.data; // Handles both list and object formats
+            const response = await api.get(`/api/history/${session_id}`, { params: { cursor } });
+            // Handles both list (old API) and paged object formats
+            if (Array.isArray(response.data)) return { history: response.data, next_cursor: null };
+            return { history: response.data.history, next_cursor: response.data.next_cursor ?? null };
         } catch (error) {
             console.error("Error fetching history:", error);
             throw error;